@@ -0,0 +1,129 @@
+"""Synthetic large-DAG benchmark for helpers.argo_utils.
+
+    python -m benchmarks.bench_dag [--sizes 1000 10000 100000] [--width 50]
+
+Builds layered candidate texts ("k.j Module-i", one layer per step number,
+per-UE module instances as distinct nodes), then times parsing to a graph,
+the topological sort, dependency verification and workflow generation. A
+single deep chain checks that validation does not recurse. Before timing,
+the edges of a few mixed-numbering answers are checked against the
+original parser.
+"""
+import argparse
+import contextlib
+import io
+import re
+import time
+
+import config
+from helpers.argo_utils import (generate_argo_yaml, is_dag, parse_to_graph,
+                                topological_order, verify_dependencies)
+
+
+def legacy_parse_to_graph(cand_text: str):
+    """helpers.argo_utils.parse_to_graph before the shared candidate IR."""
+    nodes = []
+    edges = []
+    step_map = {}
+    for line in cand_text.strip().splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = re.match(r"([\d\.]+)\s+(.+)", line)
+        if not match:
+            continue
+        step, name = match.groups()
+        name = name.strip()
+        nodes.append(name)
+        step_map[step] = name
+
+    for step, module in step_map.items():
+        if '.' in step:
+            parent_step_prefix = step.split('.')[0]
+            potential_parents = [s for s in step_map if s.startswith(parent_step_prefix) and s != step and '.' not in s]
+            if not potential_parents:
+                parent_major_num = int(parent_step_prefix) - 1
+                parent_steps = [s for s in step_map if s.startswith(str(parent_major_num))]
+                for ps in parent_steps:
+                    edges.append((step_map[ps], module))
+            else:
+                for ps in potential_parents:
+                    edges.append((step_map[ps], module))
+
+    return list(dict.fromkeys(nodes)), edges
+
+
+# Mixed numbering styles, all below 10 steps (where the legacy string-prefix
+# match of step numbers still agrees with the numeric one).
+LEGACY_CASES = [
+    "1. UE-Monitor\n2. LSTM-Predictor\n3. Wireless-Controller",
+    "1. UE-Monitor\n2. LSTM-Predictor\n2.1 YOLO\n2.2 Semantic-Codec\n3. Wireless-Controller",
+    "1.1 UE-Monitor\n1.2 Wireless-Monitor\n2. LSTM-Predictor\n3. Wireless-Controller",
+    "1 UE-Monitor\n2 YOLO\n2.1 Semantic-Codec\n2.2 LSTM-Predictor\n3. Wireless-Controller",
+    "1. UE-Monitor\n2.1 YOLO\n2.2 Server-Status-Monitor\n3. Split-Computing-Ctrl\n4 Wireless-Controller",
+]
+
+
+def check_legacy():
+    for text in LEGACY_CASES:
+        new, old = parse_to_graph(text), legacy_parse_to_graph(text)
+        if new != old:
+            raise SystemExit(f"parsers disagree on:\n{text}\n new {new}\n old {old}")
+    print(f"edges match the legacy parser on {len(LEGACY_CASES)} mixed-numbering answers")
+
+
+def layered_candidate(n: int, width: int) -> str:
+    lines = []
+    for i in range(n):
+        layer, slot = divmod(i, width)
+        lines.append(f"{layer + 1}.{slot + 1} Module-{i}")
+    return "\n".join(lines)
+
+
+def _timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t0
+
+
+def run(sizes, width: int, yaml_limit: int):
+    print(f"{'nodes':>8} {'edges':>9} {'parse':>8} {'toposort':>9} {'is_dag':>8} "
+          f"{'verify':>8} {'yaml':>8}")
+    for n in sizes:
+        text = layered_candidate(n, width)
+        (nodes, edges), t_parse = _timed(parse_to_graph, text)
+        # Every instance requires one node of the previous layer, as a realistic check load.
+        for i in range(width, len(nodes)):
+            config.MODULE_DEPENDENCIES[nodes[i]] = [nodes[i - width]]
+        order, t_topo = _timed(topological_order, nodes, edges)
+        ok, t_dag = _timed(is_dag, nodes, edges)
+        deps_ok, t_verify = _timed(verify_dependencies, nodes, edges)
+        assert order is not None and ok and deps_ok
+        t_yaml = float("nan")
+        if n <= yaml_limit:
+            _, t_yaml = _timed(generate_argo_yaml, "bench", nodes, edges)
+        for v in nodes:
+            config.MODULE_DEPENDENCIES.pop(v, None)
+        print(f"{n:>8} {len(edges):>9} {t_parse:>7.3f}s {t_topo:>8.3f}s {t_dag:>7.3f}s "
+              f"{t_verify:>7.3f}s {t_yaml:>7.3f}s")
+
+    depth = max(sizes)
+    chain = [f"M-{i}" for i in range(depth)]
+    ok, t = _timed(is_dag, chain, list(zip(chain, chain[1:])))
+    print(f"deep chain of {depth} nodes: is_dag={ok} in {t:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--width", type=int, default=10, help="nodes per layer")
+    parser.add_argument("--yaml-limit", type=int, default=10_000,
+                        help="skip workflow generation above this many nodes")
+    args = parser.parse_args()
+    check_legacy()
+    run(args.sizes, args.width, args.yaml_limit)
+
+
+if __name__ == "__main__":
+    main()
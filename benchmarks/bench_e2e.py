@@ -0,0 +1,219 @@
+"""Offline end-to-end benchmark of the main.py decision loop.
+
+    python -m benchmarks.bench_e2e [--intents 6] [--max-t 30] [--emb-dim 1536] [--save] [--check]
+
+Runs the train loop (retrieval, LLM, parsing, embedding, bandit, evaluation,
+feedback, verification, YAML generation and submission) over the config.GOLD
+intents with the fakes from benchmarks.fake_services, an in-memory vector
+store and a seeded bandit per intent. State files go to a temporary
+directory, so the real bandit state, blacklist and RAG log are untouched.
+
+Reports rounds/s, per-stage p50/p95 over all rounds, peak RSS and ATS.
+--save appends the result to benchmarks/results/bench_e2e.jsonl and
+compares it with the last saved run with the same parameters; --check
+exits non-zero when a stage or the throughput regressed beyond --tolerance.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import config
+import main
+from benchmarks.fake_services import CandidateLLM, HashEmbeddings, NoopSubmitter
+from helpers.argo_utils import generate_argo_yaml
+from helpers.bandit import load_bandit_state
+from helpers.rag_chain import build_chain
+from helpers.tracing import Tracer, set_tracer, span, stage_callback_handler
+from langchain_core.documents import Document
+from langchain_core.vectorstores import InMemoryVectorStore
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "bench_e2e.jsonl")
+MIN_COMPARE_S = 1e-4  # stages faster than this are too noisy to flag
+
+
+def _stage_stats(records: list[dict]) -> dict[str, dict[str, float]]:
+    per_stage: dict[str, list[float]] = {}
+    for rec in records:
+        totals: dict[str, float] = {"round": rec["dur_s"]}
+        for s in rec["spans"]:
+            totals[s["name"]] = totals.get(s["name"], 0.0) + s["dur_s"]
+        for name, dur in totals.items():
+            per_stage.setdefault(name, []).append(dur)
+    return {name: {"n": len(d), "p50": float(np.percentile(d, 50)), "p95": float(np.percentile(d, 95))}
+            for name, d in per_stage.items()}
+
+
+def _peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(RESULTS_PATH)).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(params: dict, verbose: bool = False) -> dict:
+    workdir = tempfile.mkdtemp(prefix="bench-e2e-")
+    try:
+        return _run_in(workdir, params, verbose)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run_in(workdir: str, params: dict, verbose: bool) -> dict:
+    """One benchmark run with the bandit state, feedback log and blacklist kept in `workdir`."""
+    config.BANDIT_STATE_PATH = os.path.join(workdir, "bandit_state.pkl")
+    config.RAG_FEEDBACK_PATH = os.path.join(workdir, "rag_feedback.txt")
+    config.BL_PATH = os.path.join(workdir, "blacklist.json")
+    config.BLACKLIST = {}
+    config.MAX_T = params["max_t"]
+    config.EMB_DIM = 2 * params["emb_dim"]
+
+    embed = HashEmbeddings(params["emb_dim"])
+    main._EMB = embed
+    main._emb.cache_clear()
+
+    store = InMemoryVectorStore(embed)
+    store.add_documents([Document(page_content=f"{m}: {d}", metadata={"type": "core"})
+                         for m, d in config.MODULES_INFO.items()])
+    retriever = store.as_retriever(search_type="similarity", search_kwargs={"k": 50})
+    all_intents = list(config.GOLD)
+    llm = CandidateLLM(k=params["k"], seed=params["seed"], p_perfect=params["p_perfect"],
+                       p_partial=params["p_partial"], latency_s=params["llm_latency"])
+    chain = build_chain(retriever, all_intents, k=params["k"], llm=llm)
+
+    submitter = NoopSubmitter()
+
+    def deploy(intent, nodes, edges):
+        yaml_content = generate_argo_yaml("bench", nodes, edges, wait_for_dependencies=False)
+        with span("submit", mode="noop"):
+            submitter.submit(yaml_content)
+
+    tracer = Tracer(keep=True)
+    set_tracer(tracer)
+    ctx = main.RunContext(chain, store, tracer, [stage_callback_handler()], deploy)
+
+    rows = []
+    out = io.StringIO()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stdout if verbose else out):
+        # run_phase's per-intent loop, with a seeded bandit so ATS is reproducible
+        for i, intent in enumerate(all_intents[:params["intents"]]):
+            bandit = load_bandit_state(config.EMB_DIM)
+            bandit.rng = np.random.default_rng([params["seed"], i])
+            row, _, _ = main.run_intent_loop(intent, "train", ctx, update_bandit=True,
+                                             bandit=bandit, run_id=str(params["seed"]))
+            rows.append(row)
+    elapsed = time.perf_counter() - t0
+    set_tracer(None)
+
+    rounds = len(tracer.records)
+    return {
+        "ts": time.time(),
+        "commit": _commit(),
+        "params": params,
+        "elapsed_s": elapsed,
+        "rounds": rounds,
+        "rounds_per_s": rounds / elapsed if elapsed else 0.0,
+        "stages": _stage_stats(tracer.records),
+        "peak_rss_mib": _peak_rss_mib(),
+        "ats": {row["intent"]: row["ATS"] for row in rows},
+        "deployments": len(submitter.submitted),
+    }
+
+
+def report(result: dict):
+    p = result["params"]
+    print(f"{result['rounds']} rounds over {p['intents']} intents in {result['elapsed_s']:.2f}s "
+          f"-> {result['rounds_per_s']:.2f} rounds/s (emb dim {p['emb_dim']}, k={p['k']}, seed {p['seed']})")
+    print(f"peak RSS {result['peak_rss_mib']:.0f} MiB, {result['deployments']} deployments")
+    print(f"\n{'stage':<14}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, s in sorted(result["stages"].items(), key=lambda kv: -kv[1]["p50"]):
+        print(f"{name:<14}{s['n']:>6}{s['p50'] * 1e3:>10.2f}{s['p95'] * 1e3:>10.2f}")
+    print(f"\n{'ATS':>5}  intent")
+    for intent, ats in result["ats"].items():
+        print(f"{ats:>5}  {intent[:70]}")
+
+
+def _previous(path: str, params: dict) -> dict | None:
+    if not os.path.exists(path):
+        return None
+    last = None
+    with open(path) as f:
+        for line in f:
+            rec = json.loads(line)
+            if rec.get("params") == params:
+                last = rec
+    return last
+
+
+def compare(result: dict, prev: dict, tolerance: float) -> list[str]:
+    """Regressions of `result` against `prev`: slower stages (p50) and lower throughput."""
+    regressions = []
+    print(f"\nvs {prev.get('commit') or 'previous run'}:")
+    for name, s in sorted(result["stages"].items()):
+        old = prev["stages"].get(name)
+        if old is None or max(old["p50"], s["p50"]) < MIN_COMPARE_S:
+            continue
+        ratio = s["p50"] / old["p50"]
+        flag = "  ⚠" if ratio > 1 + tolerance else ""
+        print(f"  {name:<14}{old['p50'] * 1e3:>10.2f} -> {s['p50'] * 1e3:>8.2f} ms ({ratio:5.2f}x){flag}")
+        if flag:
+            regressions.append(f"{name} p50 {ratio:.2f}x")
+    ratio = result["rounds_per_s"] / prev["rounds_per_s"] if prev["rounds_per_s"] else 1.0
+    print(f"  {'rounds/s':<14}{prev['rounds_per_s']:>10.2f} -> {result['rounds_per_s']:>8.2f}    ({ratio:5.2f}x)")
+    if ratio < 1 / (1 + tolerance):
+        regressions.append(f"rounds/s {ratio:.2f}x")
+    if result["ats"] != prev["ats"]:
+        print("  ATS changed:", {k: (prev["ats"].get(k), v) for k, v in result["ats"].items()
+                                 if prev["ats"].get(k) != v})
+    return regressions
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--intents", type=int, default=len(config.GOLD),
+                    help="how many config.GOLD intents to run")
+    ap.add_argument("--max-t", type=int, default=30, help="round limit per intent (config.MAX_T)")
+    ap.add_argument("--k", type=int, default=5, help="candidates per LLM answer")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--p-perfect", type=float, default=0.3)
+    ap.add_argument("--p-partial", type=float, default=0.3)
+    ap.add_argument("--emb-dim", type=int, default=1536,
+                    help="dimension per embedded text; the bandit sees twice this (1536 matches production)")
+    ap.add_argument("--llm-latency", type=float, default=0.0, help="seconds of simulated LLM latency per call")
+    ap.add_argument("--verbose", action="store_true", help="show the loop's own output")
+    ap.add_argument("--save", nargs="?", const=RESULTS_PATH, default=None, metavar="PATH",
+                    help=f"append the result to PATH (default {os.path.relpath(RESULTS_PATH)}) "
+                         "and compare with the last run with the same parameters")
+    ap.add_argument("--check", action="store_true", help="exit 1 if --save found a regression")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging (0.2 = 20%%)")
+    a = ap.parse_args()
+
+    params = {"intents": a.intents, "max_t": a.max_t, "k": a.k, "seed": a.seed,
+              "p_perfect": a.p_perfect, "p_partial": a.p_partial,
+              "emb_dim": a.emb_dim, "llm_latency": a.llm_latency}
+    result = run(params, verbose=a.verbose)
+    report(result)
+    if a.save:
+        prev = _previous(a.save, params)
+        regressions = compare(result, prev, a.tolerance) if prev else []
+        os.makedirs(os.path.dirname(a.save) or ".", exist_ok=True)
+        with open(a.save, "a") as f:
+            f.write(json.dumps(result) + "\n")
+        print(f"\nsaved to {a.save}")
+        if regressions and a.check:
+            sys.exit("regressions: " + ", ".join(regressions))
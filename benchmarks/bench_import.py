@@ -0,0 +1,70 @@
+"""Import-time budget for main.py and the helpers it pulls in.
+
+    python -m benchmarks.bench_import [--budget-ms 1500] [--repeat 3] [--top 15] [--check]
+
+Imports each module in a fresh interpreter under `python -X importtime`,
+takes the best of --repeat runs, and lists the modules with the largest
+self time. Importing must not load the heavy clients main.py only needs
+on first use (LangChain, OpenAI, Chroma, Kubernetes, psutil, Wikipedia,
+FireCrawl); --check exits non-zero if one of them is loaded or a module
+exceeds the budget.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["main", "helpers.rag_chain", "helpers.data_loaders", "helpers.feedback"]
+LAZY = ["langchain_openai", "openai", "langchain_chroma", "chromadb", "langchain_community",
+        "langchain", "langchain_core", "langsmith", "kubernetes", "urllib3", "psutil",
+        "wikipediaapi", "docx"]
+
+
+def import_profile(module: str) -> dict[str, tuple[int, int]]:
+    """{imported module: (self µs, cumulative µs)} for `import module` in a fresh interpreter."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, cwd=ROOT)
+    if proc.returncode:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = (f.strip() for f in line[len("import time:"):].split("|"))
+        times[name.strip()] = (int(self_us), int(cum_us))
+    return times
+
+
+def run(modules: list[str], repeat: int, top: int, budget_ms: float) -> list[str]:
+    problems = []
+    for module in modules:
+        runs = [import_profile(module) for _ in range(repeat)]
+        best = min(runs, key=lambda t: t[module][1])
+        total_ms = best[module][1] / 1e3
+        loaded = [m for m in LAZY if any(name == m or name.startswith(m + ".") for name in best)]
+        flag = "  ⚠ over budget" if total_ms > budget_ms else ""
+        print(f"\nimport {module}: {total_ms:.0f} ms, {len(best)} modules{flag}")
+        for name, (self_us, cum_us) in sorted(best.items(), key=lambda kv: -kv[1][0])[:top]:
+            print(f"  {self_us / 1e3:>8.1f} ms self {cum_us / 1e3:>8.1f} ms cum  {name}")
+        if loaded:
+            print("  ⚠ loaded eagerly:", ", ".join(loaded))
+            problems.append(f"{module} loads {', '.join(loaded)}")
+        if flag:
+            problems.append(f"{module} {total_ms:.0f} ms > {budget_ms:.0f} ms")
+    return problems
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("modules", nargs="*", default=MODULES)
+    ap.add_argument("--budget-ms", type=float, default=1500.0,
+                    help="cumulative import time allowed per module")
+    ap.add_argument("--repeat", type=int, default=3, help="fresh interpreters per module; the fastest counts")
+    ap.add_argument("--top", type=int, default=15, help="slowest modules (self time) to list")
+    ap.add_argument("--check", action="store_true", help="exit 1 on an eager heavy import or a blown budget")
+    a = ap.parse_args()
+
+    problems = run(a.modules, a.repeat, a.top, a.budget_ms)
+    if problems and a.check:
+        sys.exit("import budget: " + "; ".join(problems))
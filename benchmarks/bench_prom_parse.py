@@ -0,0 +1,126 @@
+"""Monitor.parse_metrics vs the previous line-by-line parser.
+
+    python -m benchmarks.bench_prom_parse [--node FILE] [--kepler FILE] [--dcgm FILE] [--repeat 20]
+
+Without files, synthetic payloads from benchmarks.fake_exporters are used
+(--filler unrelated series each). To use recorded payloads, save them with
+e.g. `curl -s http://<node>:9100/metrics > node.prom`. Both parsers must
+agree on the result before timings are printed.
+"""
+import argparse
+import math
+import re
+import statistics
+import time
+
+import monitoring
+from benchmarks.fake_exporters import dcgm_payload, kepler_payload, node_exporter_payload
+
+
+def legacy_parse(node_metrics, kepler_metrics, kepler_match_name, dcgm_metrics):
+    """The parsing half of Monitor.parse_metrics before helpers.prom_parser."""
+    parsed = {}
+    if node_metrics:
+        for line in node_metrics.split('\n'):
+            if line.startswith('#'):
+                continue
+            if 'node_memory_MemAvailable_bytes' in line:
+                parsed['free_memory'] = float(line.split(' ')[1])
+            elif 'node_memory_MemTotal_bytes' in line:
+                parsed['total_memory'] = float(line.split(' ')[1])
+            elif 'node_network_transmit_bytes_total' in line:
+                parsed['tx_bytes'] = float(line.split(' ')[1])
+            elif 'node_network_receive_bytes_total' in line:
+                parsed['rx_bytes'] = float(line.split(' ')[1])
+            elif 'node_cpu_seconds_total' in line:
+                if 'idle_cpu_seconds' not in parsed:
+                    parsed['idle_cpu_seconds'] = 0
+                if 'mode="idle"' in line:
+                    parsed['idle_cpu_seconds'] += float(line.split(' ')[1])
+                if 'total_cpu_seconds' not in parsed:
+                    parsed['total_cpu_seconds'] = 0
+                parsed['total_cpu_seconds'] += float(line.split(' ')[1])
+
+    if kepler_metrics:
+        parsed['node_cpu_power'] = 0
+        for line in kepler_metrics.split('\n'):
+            if line.startswith('#'):
+                continue
+            if 'kepler_vm_cpu_watts' in line:
+                m = re.search(r'vm_name="([^"]+)"', line)
+                if m and m.group(1).lower() == kepler_match_name:
+                    parts = line.split()
+                    if len(parts) >= 2:
+                        parsed['node_cpu_power'] += float(parts[-1])
+
+    if dcgm_metrics:
+        lookup = {
+            'DCGM_FI_DEV_SM_CLOCK': 'gpu_freq',
+            'DCGM_FI_DEV_MEM_CLOCK': 'vram_freq',
+            'DCGM_FI_DEV_ENC_UTIL': 'enc_util',
+            'DCGM_FI_DEV_DEC_UTIL': 'dec_util',
+            'DCGM_FI_DEV_POWER_USAGE': 'power_usage',
+            'DCGM_FI_DEV_GPU_UTIL': 'gpu_util',
+            'DCGM_FI_DEV_MEM_COPY_UTIL': 'vram_util',
+            'DCGM_FI_DEV_FB_FREE': 'vram_free',
+            'DCGM_FI_DEV_FB_USED': 'vram_used',
+        }
+        for line in dcgm_metrics.split('\n'):
+            if line.startswith('#') or not line.strip() or '}' not in line:
+                continue
+            left, right = line.split('}', 1)
+            key = left.split('{', 1)[0].strip()
+            if key in lookup:
+                parsed[lookup[key]] = float(right.strip().split()[0])
+    return parsed
+
+
+def _same(a: dict, b: dict) -> bool:
+    return a.keys() == b.keys() and all(math.isclose(a[k], b[k], rel_tol=1e-9) for k in a)
+
+
+def _time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--node", help="recorded node-exporter payload")
+    parser.add_argument("--kepler", help="recorded Kepler payload")
+    parser.add_argument("--dcgm", help="recorded DCGM payload")
+    parser.add_argument("--node-name", default="worker1",
+                        help="node whose Kepler VM power is summed (via HOSTNAME_MAP)")
+    parser.add_argument("--filler", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    def read(path):
+        with open(path) as f:
+            return f.read()
+
+    vm = (monitoring.HOSTNAME_MAP.get(args.node_name) or args.node_name).lower()
+    node = read(args.node) if args.node else node_exporter_payload(filler=args.filler)
+    kepler = read(args.kepler) if args.kepler else kepler_payload(
+        [f"llmnode{i}" for i in range(1, 7)], filler=args.filler)
+    dcgm = read(args.dcgm) if args.dcgm else dcgm_payload()
+
+    monitor = monitoring.Monitor(kube=False)
+    new = lambda: monitor.parse_metrics(node, kepler, {}, 1.0, args.node_name, dcgm_metrics=dcgm)
+    old = lambda: legacy_parse(node, kepler, vm, dcgm)
+    if not _same(new(), old()):
+        raise SystemExit(f"parsers disagree:\n new {new()}\n old {old()}")
+
+    lines = sum(p.count('\n') for p in (node, kepler, dcgm))
+    t_old, t_new = _time(old, args.repeat), _time(new, args.repeat)
+    print(f"{lines} lines, median of {args.repeat}")
+    print(f"legacy  {t_old * 1e3:8.2f} ms")
+    print(f"new     {t_new * 1e3:8.2f} ms   {t_old / t_new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
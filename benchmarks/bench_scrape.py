@@ -0,0 +1,85 @@
+"""Thread-pool vs asyncio scrape rounds in monitoring.Monitor against fake exporters.
+
+    python -m benchmarks.bench_scrape [--nodes 50 200] [--rounds 5] [--delay 0.02 0.2] [--shared-kepler]
+
+Every fake node serves node-exporter, Kepler and DCGM payloads, each with a
+random response delay; a round scrapes and parses all of them once.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+
+import monitoring
+from benchmarks.fake_exporters import (FakeExporterFarm, dcgm_payload, free_port,
+                                       kepler_payload, node_exporter_payload)
+
+
+def _targets(hosts, shared_kepler=False):
+    return {f"node-{i}": {"node_ip": h, "kepler_ip": hosts[0] if shared_kepler else h, "gpu_ip": h}
+            for i, h in enumerate(hosts)}
+
+
+def bench_threads(monitor, nodes, rounds):
+    times = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        monitor._scrape_round(nodes, 1.0)
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+async def _bench_async(monitor, nodes, rounds):
+    times = []
+    async with monitor._async_session() as session:
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            await monitor._scrape_round_async(session, nodes, 1.0)
+            times.append(time.perf_counter() - t0)
+    return times
+
+
+def run(node_counts, rounds, delay, filler, shared_kepler=False):
+    monitoring.NODE_EXPORTER_PORT = free_port()
+    monitoring.KEPLER_PORT = free_port()
+    monitoring.DCGM_PORT = free_port()
+    print(f"exporter delay {delay[0]*1e3:.0f}-{delay[1]*1e3:.0f} ms, {rounds} rounds each"
+          + (", one Kepler shared by all nodes" if shared_kepler else ""))
+    print(f"{'nodes':>6} {'threads':>10} {'async':>10} {'speed-up':>9}")
+    for n in node_counts:
+        payloads = {
+            monitoring.NODE_EXPORTER_PORT: node_exporter_payload(filler=filler),
+            monitoring.KEPLER_PORT: kepler_payload([f"node-{i}" for i in range(n)], filler=filler),
+            monitoring.DCGM_PORT: dcgm_payload(),
+        }
+        with FakeExporterFarm(n, payloads, delay=delay) as farm:
+            nodes = _targets(farm.hosts, shared_kepler)
+            monitor = monitoring.Monitor(kube=False)
+            monitor._executor = monitoring.ThreadPoolExecutor(max_workers=n)
+            with contextlib.redirect_stdout(io.StringIO()):
+                bench_threads(monitor, nodes, 1)  # warm up connections
+                t_threads = bench_threads(monitor, nodes, rounds)
+                t_async = asyncio.run(_bench_async(monitor, nodes, rounds + 1))[1:]
+            monitor.close()
+        a, b = statistics.median(t_threads), statistics.median(t_async)
+        print(f"{n:>6} {a:>9.3f}s {b:>9.3f}s {a / b:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--delay", type=float, nargs=2, default=[0.02, 0.2],
+                        help="min/max exporter response delay in seconds")
+    parser.add_argument("--filler", type=int, default=500,
+                        help="unrelated series per node-exporter/Kepler payload")
+    parser.add_argument("--shared-kepler", action="store_true",
+                        help="point every node at the first node's Kepler, like the real cluster")
+    args = parser.parse_args()
+    run(args.nodes, args.rounds, tuple(args.delay), args.filler, args.shared_kepler)
+
+
+if __name__ == "__main__":
+    main()
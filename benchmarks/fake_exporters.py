@@ -0,0 +1,137 @@
+"""Synthetic Prometheus exporters for the monitoring benchmarks.
+
+Payload generators mimic node-exporter, Kepler and DCGM exposition text,
+and `FakeExporterFarm` serves them from 127.0.0.x addresses (one address
+per fake node) with a configurable response delay.
+"""
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import urllib.request
+
+from aiohttp import web
+
+
+def node_exporter_payload(n_cpus: int = 32, n_ifaces: int = 8, filler: int = 20_000,
+                          seed: int = 0) -> str:
+    rng = random.Random(seed)
+    out = []
+    out.append("# HELP node_cpu_seconds_total Seconds the CPUs spent in each mode.")
+    out.append("# TYPE node_cpu_seconds_total counter")
+    for c in range(n_cpus):
+        for mode in ("idle", "iowait", "irq", "nice", "softirq", "steal", "system", "user"):
+            out.append(f'node_cpu_seconds_total{{cpu="{c}",mode="{mode}"}} {rng.uniform(0, 1e6):.2f}')
+    out.append("# TYPE node_memory_MemAvailable_bytes gauge")
+    out.append(f"node_memory_MemAvailable_bytes {rng.randint(1 << 30, 1 << 36):.6e}")
+    out.append("# TYPE node_memory_MemTotal_bytes gauge")
+    out.append(f"node_memory_MemTotal_bytes {1 << 37:.6e}")
+    for i in range(n_ifaces):
+        out.append(f'node_network_receive_bytes_total{{device="eth{i}"}} {rng.uniform(0, 1e12):.6e}')
+        out.append(f'node_network_transmit_bytes_total{{device="eth{i}"}} {rng.uniform(0, 1e12):.6e}')
+    # Unrelated series make up the bulk of a real node-exporter payload.
+    for i in range(filler):
+        out.append(f'node_filesystem_avail_bytes{{device="/dev/sd{i % 26}",mountpoint="/mnt/{i}"}} '
+                   f'{rng.uniform(0, 1e12):.6e}')
+    return "\n".join(out) + "\n"
+
+
+def kepler_payload(vm_names: list[str], per_vm: int = 4, filler: int = 20_000, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    out = ["# HELP kepler_vm_cpu_watts VM CPU power", "# TYPE kepler_vm_cpu_watts gauge"]
+    for vm in vm_names:
+        for z in range(per_vm):
+            out.append(f'kepler_vm_cpu_watts{{vm_id="{vm}-{z}",vm_name="{vm}",zone="package-{z}"}} '
+                       f'{rng.uniform(0, 120):.3f}')
+    for i in range(filler):
+        out.append(f'kepler_container_joules_total{{container_id="{i:08x}",container_name="c{i}",'
+                   f'container_namespace="ns{i % 40}",mode="dynamic",zone="package"}} {rng.uniform(0, 1e6):.3f}')
+    return "\n".join(out) + "\n"
+
+
+def dcgm_payload(n_gpus: int = 4, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    names = ["DCGM_FI_DEV_SM_CLOCK", "DCGM_FI_DEV_MEM_CLOCK", "DCGM_FI_DEV_ENC_UTIL",
+             "DCGM_FI_DEV_DEC_UTIL", "DCGM_FI_DEV_POWER_USAGE", "DCGM_FI_DEV_GPU_UTIL",
+             "DCGM_FI_DEV_MEM_COPY_UTIL", "DCGM_FI_DEV_FB_FREE", "DCGM_FI_DEV_FB_USED",
+             "DCGM_FI_DEV_GPU_TEMP", "DCGM_FI_DEV_TOTAL_ENERGY_CONSUMPTION"]
+    out = []
+    for name in names:
+        out.append(f"# HELP {name} {name}")
+        out.append(f"# TYPE {name} gauge")
+        for g in range(n_gpus):
+            out.append(f'{name}{{gpu="{g}",UUID="GPU-{g:04d}",device="nvidia{g}",'
+                       f'modelName="NVIDIA A100",Hostname="dcgm"}} {rng.uniform(0, 2000):.1f}')
+    return "\n".join(out) + "\n"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class FakeExporterFarm:
+    """Serves payloads for `n_nodes` fake nodes at 127.0.0.2 ... on the given ports.
+
+    `payloads` maps port -> exposition text; every response waits a delay
+    drawn uniformly from `delay` (seconds) to stand in for exporter latency.
+    The servers run in a child process so they do not compete with the
+    scraper for the GIL; `hits()` returns request counts per (host, port).
+    """
+
+    def __init__(self, n_nodes: int, payloads: dict[int, str], delay=(0.0, 0.0), seed: int = 0):
+        self.hosts = [f"127.0.0.{i + 2}" for i in range(n_nodes)]
+        self.payloads = payloads
+        self.delay = delay
+        self.seed = seed
+        self._control_port = free_port()
+        self._ready = multiprocessing.Event()
+        self._proc = multiprocessing.Process(target=self._serve, daemon=True)
+
+    def _serve(self):
+        rng = random.Random(self.seed)
+        hits: dict[str, int] = {}
+
+        async def handle(request: web.Request) -> web.Response:
+            host, port = request.transport.get_extra_info("sockname")[:2]
+            key = f"{host}:{port}"
+            hits[key] = hits.get(key, 0) + 1
+            lo, hi = self.delay
+            if hi > 0:
+                await asyncio.sleep(rng.uniform(lo, hi))
+            return web.Response(text=self.payloads[port])
+
+        async def report(request: web.Request) -> web.Response:
+            return web.json_response(hits)
+
+        async def start():
+            app = web.Application()
+            app.router.add_get("/metrics", handle)
+            app.router.add_get("/hits", report)
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            for host in self.hosts:
+                for port in self.payloads:
+                    await web.TCPSite(runner, host, port, backlog=1024).start()
+            await web.TCPSite(runner, "127.0.0.1", self._control_port).start()
+            self._ready.set()
+            await asyncio.Event().wait()
+
+        asyncio.run(start())
+
+    def hits(self) -> dict[tuple[str, int], int]:
+        with urllib.request.urlopen(f"http://127.0.0.1:{self._control_port}/hits") as resp:
+            raw = json.load(resp)
+        return {(k.rsplit(":", 1)[0], int(k.rsplit(":", 1)[1])): v for k, v in raw.items()}
+
+    def __enter__(self):
+        self._proc.start()
+        if not self._ready.wait(timeout=30):
+            raise RuntimeError("fake exporters did not start")
+        return self
+
+    def __exit__(self, *exc):
+        self._proc.terminate()
+        self._proc.join()
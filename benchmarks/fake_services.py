@@ -0,0 +1,498 @@
+"""Deterministic offline stand-ins for the services main.py talks to.
+
+`HashEmbeddings` replaces OpenAI embeddings with a feature-hashed bag of
+words, `CandidateLLM` answers every prompt with "Candidate-N:" pipelines
+built from config.GOLD (a seeded mix of perfect, partial and bad ones), and
+`NoopSubmitter` accepts Argo workflows without a cluster. Together with
+langchain_core's InMemoryVectorStore they run the decision loop without
+OpenAI, Chroma, FireCrawl, Wikipedia or Kubernetes. `FakeKubeAPI` is a
+small local Kubernetes API server for exercising the real API clients
+(see benchmarks/smoke_kube.py).
+"""
+import copy
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+import config
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+class HashEmbeddings(Embeddings):
+    """Signed feature hashing of lower-cased tokens, L2-normalised.
+
+    Texts that share words get similar vectors, so retrieval and nearest-
+    neighbour lookups behave sensibly, and every run embeds identically.
+    """
+
+    def __init__(self, dim: int = 1536):
+        self.dim = dim
+
+    def embed_query(self, text: str) -> list[float]:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for tok in _TOKEN.findall(text.lower()):
+            h = int.from_bytes(hashlib.blake2b(tok.encode(), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if h >> 63 else -1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(t) for t in texts]
+
+
+def gold_steps(intent: str, rng: random.Random, with_opt: bool) -> list[list[str]]:
+    """A pipeline that evaluates as perfect for `intent`, as a list of parallel steps."""
+    steps = []
+    for kind, grp in config.GOLD[intent]:
+        if kind == "opt" and not with_opt:
+            continue
+        mods = sorted(grp)
+        if kind == "any":
+            mods = rng.sample(mods, rng.randint(1, len(mods)))
+        steps.append(mods)
+    return steps
+
+
+def _perturb(intent: str, steps: list[list[str]], rng: random.Random, kind: str) -> list[list[str]]:
+    steps = [list(s) for s in steps]
+    if kind == "partial":
+        allowed = set().union(*(grp for _, grp in config.GOLD[intent]))
+        extra = [m for m in config.MODULES_INFO if m not in allowed]
+        if extra:
+            steps.insert(rng.randint(0, len(steps)), [rng.choice(extra)])
+            return steps
+    # bad: drop a step, or swap two when there is only one to drop
+    if len(steps) > 1 and rng.random() < 0.5:
+        i, j = rng.sample(range(len(steps)), 2)
+        steps[i], steps[j] = steps[j], steps[i]
+    else:
+        steps.pop(rng.randrange(len(steps)))
+        if not steps:
+            steps = [[rng.choice(list(config.MODULES_INFO))]]
+    return steps
+
+
+def format_candidate(i: int, steps: list[list[str]]) -> str:
+    lines = [f"Candidate-{i}:"]
+    for s, mods in enumerate(steps, 1):
+        if len(mods) == 1:
+            lines.append(f"  {s}. {mods[0]}")
+        else:
+            lines.extend(f"  {s}.{j} {m}" for j, m in enumerate(mods, 1))
+    return "\n".join(lines)
+
+
+def candidate_answer(intent: str, k: int, rng: random.Random,
+                     p_perfect: float = 0.3, p_partial: float = 0.3) -> str:
+    """k candidates for a GOLD intent; each is perfect, partial or bad with the given odds."""
+    cands = []
+    for i in range(1, k + 1):
+        steps = gold_steps(intent, rng, with_opt=rng.random() < 0.5)
+        roll = rng.random()
+        if roll >= p_perfect:
+            steps = _perturb(intent, steps, rng, "partial" if roll < p_perfect + p_partial else "bad")
+        cands.append(format_candidate(i, steps))
+    return "\n".join(cands)
+
+
+class CandidateLLM(BaseChatModel):
+    """Chat model that answers the intent in the last message with `candidate_answer`.
+
+    The n-th call for an intent draws from random.Random(f"{seed}|{intent}|{n}"),
+    so a run is reproducible regardless of how intents are interleaved.
+    `latency_s` adds a fixed sleep per call to mimic a remote model.
+    """
+    k: int = 5
+    seed: int = 0
+    p_perfect: float = 0.3
+    p_partial: float = 0.3
+    latency_s: float = 0.0
+    _calls: dict = PrivateAttr(default_factory=dict)
+
+    @property
+    def _llm_type(self) -> str:
+        return "candidate-fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        intent = messages[-1].content
+        n = self._calls[intent] = self._calls.get(intent, 0) + 1
+        rng = random.Random(f"{self.seed}|{intent}|{n}")
+        text = candidate_answer(intent, self.k, rng, self.p_perfect, self.p_partial)
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        usage = {"prompt_tokens": sum(len(str(m.content).split()) for m in messages),
+                 "completion_tokens": len(text.split())}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))],
+                          llm_output={"token_usage": usage})
+
+
+class NoopSubmitter:
+    """Accepts workflows like WorkflowSubmitter and remembers them; nothing is sent."""
+
+    def __init__(self, namespace: str = "default"):
+        self.namespace = namespace
+        self.submitted: list[str] = []
+        self._seq = itertools.count(1)
+
+    def submit(self, workflow, namespace: str | None = None) -> str:
+        self.submitted.append(workflow)
+        return f"noop-{next(self._seq):05d}"
+
+    def phase(self, name: str, namespace: str | None = None) -> str | None:
+        return "Succeeded" if name.startswith("noop-") else None
+
+    def close(self):
+        pass
+
+
+def _status(code: int, reason: str, message: str) -> dict:
+    return {"kind": "Status", "apiVersion": "v1", "metadata": {}, "status": "Failure",
+            "reason": reason, "message": message, "code": code}
+
+
+def _expired(rv: int) -> dict:
+    return _status(410, "Expired", f"too old resource version (compacted at {rv})")
+
+
+def _matches(obj: dict, name: str | None, labels: dict[str, str]) -> bool:
+    meta = obj.get("metadata") or {}
+    if name is not None and meta.get("name") != name:
+        return False
+    have = meta.get("labels") or {}
+    return all(have.get(k) == v for k, v in labels.items())
+
+
+def _selectors(query: dict) -> tuple[str | None, dict[str, str]]:
+    name = None
+    for term in filter(None, query.get("fieldSelector", "").split(",")):
+        key, _, value = term.partition("=")
+        if key == "metadata.name":
+            name = value
+    labels = dict(term.partition("=")[::2] for term in filter(None, query.get("labelSelector", "").split(",")))
+    return name, labels
+
+
+class FakeKubeAPI:
+    """A local Kubernetes API server for Argo Workflows/WorkflowTemplates, nodes, pods and DaemonSets.
+
+    Supports get, list, create (409 when the name exists, `generateName`),
+    delete (404 when missing) and watch streams with resourceVersions and
+    bookmarks, which is what WorkflowSubmitter, TemplateRegistry and
+    TargetWatcher use. `compact()` expires every resourceVersion seen so far:
+    open watches get an ERROR 410 event, and so does any watch started from
+    an older version, like an etcd compaction on a real cluster. A created workflow
+    moves through `phases`, one every `phase_interval` seconds; set
+    `phases = ("Running",)` to have it never finish. `drop_next(n)` closes
+    the next n connections without answering, to exercise client retries;
+    `fail_next(method, path, code)` answers the next matching request with
+    an error Status instead of serving it.
+
+        with FakeKubeAPI() as api:
+            submitter = WorkflowSubmitter(host=api.url)
+    """
+
+    _ROUTES = [
+        (re.compile(r"^/apis/argoproj\.io/v1alpha1/namespaces/([^/]+)/(workflows|workflowtemplates)(?:/([^/]+))?$"),
+         lambda m: (m.group(2), m.group(1), m.group(3))),
+        (re.compile(r"^/api/v1/nodes(?:/([^/]+))?$"), lambda m: ("nodes", None, m.group(1))),
+        (re.compile(r"^/api/v1/namespaces/([^/]+)/pods(?:/([^/]+))?$"),
+         lambda m: ("pods", m.group(1), m.group(2))),
+        (re.compile(r"^/apis/apps/v1/namespaces/([^/]+)/daemonsets(?:/([^/]+))?$"),
+         lambda m: ("daemonsets", m.group(1), m.group(2))),
+    ]
+
+    def __init__(self, phases=("Running", "Succeeded"), phase_interval: float = 0.2):
+        self.phases = tuple(phases)
+        self.phase_interval = phase_interval
+        self.requests: list[tuple[str, str, dict[str, str]]] = []
+        self._cond = threading.Condition()
+        self._rv = 0
+        self._compacted = 0
+        self._store: dict[tuple[str, str | None], dict[str, dict]] = {}
+        self._events: list[tuple[int, str, str | None, str, dict]] = []
+        self._drop = 0
+        self._faults: list[tuple[str, re.Pattern, int]] = []
+        self._closed = False
+        self._streams = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _KubeHandler)
+        self._server.daemon_threads = True
+        self._server.api = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Stop the server, letting open watch streams end cleanly first."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: not self._streams, timeout=5)
+        self._server.shutdown()
+        self._server.server_close()
+
+    # --- state, also used by tests to set the scene ---
+
+    def objects(self, kind: str, namespace: str | None = None) -> dict[str, dict]:
+        with self._cond:
+            return copy.deepcopy(self._store.get((kind, namespace), {}))
+
+    def put(self, kind: str, namespace: str | None, obj: dict) -> dict:
+        """Create or replace an object and notify watchers (ADDED or MODIFIED)."""
+        with self._cond:
+            items = self._store.setdefault((kind, namespace), {})
+            name = obj["metadata"]["name"]
+            event = "MODIFIED" if name in items else "ADDED"
+            self._rv += 1
+            obj = copy.deepcopy(obj)
+            obj["metadata"]["resourceVersion"] = str(self._rv)
+            if namespace is not None:
+                obj["metadata"]["namespace"] = namespace
+            items[name] = obj
+            self._events.append((self._rv, kind, namespace, event, copy.deepcopy(obj)))
+            self._cond.notify_all()
+            return copy.deepcopy(obj)
+
+    def delete(self, kind: str, namespace: str | None, name: str) -> dict | None:
+        with self._cond:
+            obj = self._store.get((kind, namespace), {}).pop(name, None)
+            if obj is not None:
+                self._rv += 1
+                obj["metadata"]["resourceVersion"] = str(self._rv)
+                self._events.append((self._rv, kind, namespace, "DELETED", copy.deepcopy(obj)))
+                self._cond.notify_all()
+            return obj
+
+    def compact(self):
+        """Expire every resourceVersion issued so far; open watches end with an ERROR 410 event."""
+        with self._cond:
+            self._rv += 1
+            self._compacted = self._rv
+            self._events = [(self._rv, None, None, "ERROR", _expired(self._rv))]
+            self._cond.notify_all()
+
+    def add_node(self, name: str, ip: str) -> dict:
+        return self.put("nodes", None, {"metadata": {"name": name},
+                                        "status": {"addresses": [{"type": "InternalIP", "address": ip}]}})
+
+    def add_daemonset(self, namespace: str, name: str, labels: dict[str, str]) -> dict:
+        return self.put("daemonsets", namespace, {
+            "metadata": {"name": name},
+            "spec": {"selector": {"matchLabels": dict(labels)},
+                     "template": {"metadata": {"labels": dict(labels)}}}})
+
+    def add_pod(self, namespace: str, name: str, node: str, ip: str, labels: dict[str, str],
+                phase: str = "Running") -> dict:
+        return self.put("pods", namespace, {
+            "metadata": {"name": name, "labels": dict(labels)},
+            "spec": {"nodeName": node, "containers": [{"name": "exporter"}]},
+            "status": {"phase": phase, "podIP": ip}})
+
+    def drop_next(self, n: int = 1):
+        with self._cond:
+            self._drop += n
+
+    def fail_next(self, method: str, path: str, code: int):
+        """Answer the next `method` request whose path matches the regex `path` with `code`."""
+        with self._cond:
+            self._faults.append((method, re.compile(path), code))
+
+    def _take_drop(self) -> bool:
+        with self._cond:
+            if self._drop:
+                self._drop -= 1
+                return True
+            return False
+
+    def _take_fault(self, method: str, path: str) -> int | None:
+        with self._cond:
+            for i, (m, pattern, code) in enumerate(self._faults):
+                if m == method and pattern.search(path):
+                    del self._faults[i]
+                    return code
+            return None
+
+    def _advance(self, namespace: str, name: str):
+        for phase in self.phases:
+            time.sleep(self.phase_interval)
+            with self._cond:
+                obj = self._store.get(("workflows", namespace), {}).get(name)
+                if obj is None:
+                    return
+                obj = {**obj, "status": {"phase": phase}}
+            self.put("workflows", namespace, obj)
+
+    def create(self, kind: str, namespace: str | None, body: dict) -> tuple[int, dict]:
+        meta = body.setdefault("metadata", {})
+        with self._cond:
+            if not meta.get("name"):
+                prefix = meta.get("generateName") or f"{kind[:-1]}-"
+                meta["name"] = prefix + "".join(random.choices("bcdfghjklmnpqrstvwxz2456789", k=5))
+            if meta["name"] in self._store.get((kind, namespace), {}):
+                return 409, _status(409, "AlreadyExists", f'{kind} "{meta["name"]}" already exists')
+            created = self.put(kind, namespace, body)
+        if kind == "workflows":
+            threading.Thread(target=self._advance, args=(namespace, meta["name"]), daemon=True).start()
+        return 201, created
+
+    def _route(self, path: str):
+        for pattern, parts in self._ROUTES:
+            m = pattern.match(path)
+            if m:
+                return parts(m)
+        return None
+
+    # --- watch ---
+
+    def stream(self, write, kind: str, namespace: str | None, query: dict):
+        """Write watch events for one collection until `timeoutSeconds` or the client goes away."""
+        name, labels = _selectors(query)
+        deadline = time.monotonic() + float(query.get("timeoutSeconds") or 30)
+        rv = query.get("resourceVersion")
+        with self._cond:
+            if rv and int(rv) < self._compacted:
+                expired = _expired(self._compacted)
+            else:
+                expired = None
+            if rv:
+                cursor, initial = int(rv), []
+            else:
+                cursor = self._rv
+                initial = [("ADDED", copy.deepcopy(o)) for o in self._store.get((kind, namespace), {}).values()
+                           if _matches(o, name, labels)]
+        if expired:
+            write({"type": "ERROR", "object": expired})
+            return
+        for event, obj in initial:
+            write({"type": event, "object": obj})
+        if query.get("allowWatchBookmarks", "").lower() == "true":
+            write({"type": "BOOKMARK", "object": {"kind": "Bookmark", "apiVersion": "v1",
+                                                   "metadata": {"resourceVersion": str(cursor)}}})
+        while True:
+            with self._cond:
+                pending = [e for e in self._events if e[0] > cursor and self._wanted(e, kind, namespace)]
+                if not pending:
+                    remaining = deadline - time.monotonic()
+                    if self._closed or remaining <= 0:
+                        return
+                    self._cond.wait(remaining)
+                    continue
+            for rv_, _, _, event, obj in pending:
+                if event == "ERROR" or _matches(obj, name, labels):
+                    write({"type": event, "object": obj})
+                cursor = rv_
+                if event == "ERROR":
+                    return
+
+    @staticmethod
+    def _wanted(event, kind, namespace) -> bool:
+        return event[3] == "ERROR" or (event[1] == kind and event[2] == namespace)
+
+
+class _KubeHandler(BaseHTTPRequestHandler):
+    # watch responses are chunked, like the real API server's, so clients see events as they happen
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self, method: str):
+        api: FakeKubeAPI = self.server.api
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        api.requests.append((method, url.path, query))
+        if api._take_drop():
+            self.close_connection = True
+            return
+        code = api._take_fault(method, url.path)
+        if code is not None:
+            return self._send(code, _status(code, "Injected", f"injected {code} for {method} {url.path}"))
+        route = api._route(url.path)
+        if route is None:
+            return self._send(404, _status(404, "NotFound", f"no route for {url.path}"))
+        kind, namespace, name = route
+
+        if method == "GET" and name is None and query.get("watch", "").lower() in ("true", "1"):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def write(event):
+                line = json.dumps(event).encode() + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+            with api._cond:
+                api._streams += 1
+            try:
+                api.stream(write, kind, namespace, query)
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+            finally:
+                with api._cond:
+                    api._streams -= 1
+                    api._cond.notify_all()
+            return
+        if method == "GET" and name is None:
+            sel_name, labels = _selectors(query)
+            with api._cond:
+                items = [o for o in api.objects(kind, namespace).values() if _matches(o, sel_name, labels)]
+                rv = str(api._rv)
+            return self._send(200, {"apiVersion": "v1", "kind": "List",
+                                    "metadata": {"resourceVersion": rv}, "items": items})
+        if method == "GET":
+            obj = api.objects(kind, namespace).get(name)
+            if obj is None:
+                return self._send(404, _status(404, "NotFound", f'{kind} "{name}" not found'))
+            return self._send(200, obj)
+        if method == "POST" and name is None:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            return self._send(*api.create(kind, namespace, body))
+        if method == "DELETE" and name is not None:
+            obj = api.delete(kind, namespace, name)
+            if obj is None:
+                return self._send(404, _status(404, "NotFound", f'{kind} "{name}" not found'))
+            return self._send(200, obj)
+        return self._send(405, _status(405, "MethodNotAllowed", f"{method} {url.path}"))
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
@@ -0,0 +1,192 @@
+"""Drive the Kubernetes API clients against a local fake API server.
+
+    python -m benchmarks.smoke_kube [--node MoLMo]
+
+Runs WorkflowSubmitter and TemplateRegistry against FakeKubeAPI: submit,
+watch and wait until Succeeded; a workflow that never finishes (watch
+timeout); a workflow deleted while it is watched; a missing workflow; a
+connection dropped under a GET (retried by urllib3) and under a POST
+(surfaced as a urllib3 HTTPError); template create, re-use, pruning of an
+outdated template and a concurrent create (409). Then runs TargetWatcher
+against nodes, exporter DaemonSets and their pods: the initial list, watch
+bookmarks, nodes and pods added and deleted while watched, and an expired
+resourceVersion (410) after a compaction. Exits non-zero if any scenario
+fails.
+"""
+import argparse
+import sys
+import threading
+import time
+
+from kubernetes import client
+from urllib3.exceptions import HTTPError
+
+from benchmarks.fake_services import FakeKubeAPI
+from helpers.argo_utils import build_workflow_template, workflow_template_name
+from helpers.target_discovery import EXPORTER_DAEMONSETS, TargetWatcher
+from helpers.workflow_client import TEMPLATE_PLURAL, WORKFLOW_PLURAL, TemplateRegistry, WorkflowSubmitter
+
+NS = "default"
+WORKFLOW = {"apiVersion": "argoproj.io/v1alpha1", "kind": "Workflow",
+            "metadata": {"generateName": "smoke-"},
+            "spec": {"entrypoint": "main", "templates": [{"name": "main", "suspend": {}}]}}
+
+
+def check(results: list, name: str, ok: bool, detail: str = ""):
+    results.append((name, ok))
+    print(f"{'✅' if ok else '❌'} {name}" + (f" — {detail}" if detail else ""))
+
+
+def argo_scenarios(api: FakeKubeAPI, results: list):
+    submitter = WorkflowSubmitter(NS, host=api.url)
+    try:
+        name = submitter.submit(WORKFLOW)
+        phases = list(submitter.watch(name, timeout=10))
+        check(results, "submit → watch", phases[-1:] == ["Succeeded"], " → ".join(phases))
+        check(results, "phase after completion", submitter.phase(name) == "Succeeded")
+
+        name = submitter.submit_async(WORKFLOW).result(timeout=10)
+        check(results, "submit_async → wait", submitter.wait(name, timeout=10) == "Succeeded", name)
+
+        check(results, "phase of a missing workflow", submitter.phase("no-such-workflow") is None)
+
+        api.phases = ("Running",)
+        name = submitter.submit(WORKFLOW)
+        t0 = time.monotonic()
+        last = submitter.wait(name, timeout=1)
+        took = time.monotonic() - t0
+        check(results, "watch timeout on a stalled workflow", last == "Running" and took < 5,
+              f"{last} after {took:.1f} s")
+
+        name = submitter.submit(WORKFLOW)
+        seen = []
+        watcher = threading.Thread(target=lambda: seen.extend(submitter.watch(name, timeout=10)))
+        watcher.start()
+        time.sleep(3 * api.phase_interval)
+        api.delete(WORKFLOW_PLURAL, NS, name)
+        watcher.join(timeout=5)
+        check(results, "watch ends when the workflow is deleted", not watcher.is_alive(), " → ".join(seen))
+        api.phases = ("Running", "Succeeded")
+
+        api.drop_next(1)
+        check(results, "GET retried after a dropped connection", submitter.phase("no-such-workflow") is None)
+
+        api.drop_next(1)
+        try:
+            submitter.submit(WORKFLOW)
+            check(results, "dropped POST raises", False, "submit returned")
+        except HTTPError as e:
+            check(results, "dropped POST raises", True, type(e).__name__)
+    finally:
+        submitter.close()
+
+
+def template_scenarios(api: FakeKubeAPI, node: str, results: list):
+    submitter = WorkflowSubmitter(NS, host=api.url)
+    try:
+        name = workflow_template_name(node)
+        if name is None:
+            check(results, f"templates for {node}", False, "no manifest mapped")
+            return
+        body = build_workflow_template(node, NS)
+        outdated = {**body, "metadata": {**body["metadata"], "name": body["metadata"]["name"][:-10] + "0" * 10}}
+        api.put(TEMPLATE_PLURAL, NS, outdated)
+
+        registry = TemplateRegistry(submitter)
+        refs = registry.ensure([node, "No-Such-Module"])
+        templates = api.objects(TEMPLATE_PLURAL, NS)
+        check(results, "template created", refs == {node: name} and name in templates, name)
+        check(results, "outdated template pruned", outdated["metadata"]["name"] not in templates)
+
+        before = len(api.requests)
+        TemplateRegistry(submitter).ensure([node])
+        posts = [r for r in api.requests[before:] if r[0] == "POST"]
+        check(results, "existing template re-used", not posts)
+
+        api.fail_next("GET", rf"/{TEMPLATE_PLURAL}/{name}$", 404)
+        api.put(TEMPLATE_PLURAL, NS, outdated)
+        try:
+            TemplateRegistry(submitter).ensure([node])
+            ok, detail = outdated["metadata"]["name"] not in api.objects(TEMPLATE_PLURAL, NS), ""
+        except Exception as e:
+            ok, detail = False, f"{type(e).__name__}: {e}"
+        check(results, "concurrent create (409) treated as registered", ok, detail)
+    finally:
+        submitter.close()
+
+
+def _until(predicate, timeout: float = 3.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+def discovery_scenarios(api: FakeKubeAPI, results: list):
+    gpu_ds, (gpu_ns, *_) = EXPORTER_DAEMONSETS["gpu_ip"]
+    kepler_ds, (kepler_ns, *_) = EXPORTER_DAEMONSETS["kepler_ip"]
+    api.add_daemonset(gpu_ns, gpu_ds, {"app": gpu_ds})
+    api.add_daemonset(kepler_ns, kepler_ds, {"app": kepler_ds})
+    for i in range(2):
+        api.add_node(f"node-{i}", f"10.0.0.{i}")
+        api.add_pod(gpu_ns, f"{gpu_ds}-{i}", f"node-{i}", f"10.1.0.{i}", {"app": gpu_ds})
+        api.add_pod(kepler_ns, f"{kepler_ds}-{i}", f"node-{i}", f"10.2.0.{i}", {"app": kepler_ds})
+    api.add_pod(gpu_ns, "unrelated", "node-0", "10.9.9.9", {"app": "other"})
+
+    api_client = client.ApiClient(client.Configuration(host=api.url))
+    watcher = TargetWatcher(client.CoreV1Api(api_client), client.AppsV1Api(api_client), watch_timeout=30)
+    try:
+        watcher.start()
+        snap = watcher.snapshot()
+        check(results, "initial list", snap.get("node-1") ==
+              {"node_ip": "10.0.0.1", "gpu_ip": "10.1.0.1", "kepler_ip": "10.2.0.1"} and len(snap) == 2,
+              f"{len(snap)} nodes")
+
+        def lists(path):
+            return sum(1 for m, p, q in api.requests if m == "GET" and p == path and "watch" not in q)
+
+        node_lists = lists("/api/v1/nodes")
+        api.add_node("node-2", "10.0.0.2")
+        api.add_pod(gpu_ns, f"{gpu_ds}-2", "node-2", "10.1.0.2", {"app": gpu_ds})
+        check(results, "node and pod added while watched",
+              _until(lambda: watcher.snapshot().get("node-2", {}).get("gpu_ip") == "10.1.0.2"))
+        check(results, "bookmarks and events need no re-list", lists("/api/v1/nodes") == node_lists,
+              f"{lists('/api/v1/nodes') - node_lists} extra lists")
+
+        api.delete("pods", gpu_ns, f"{gpu_ds}-0")
+        api.delete("nodes", None, "node-1")
+        check(results, "pod and node deleted while watched",
+              _until(lambda: "gpu_ip" not in watcher.snapshot().get("node-0", {"gpu_ip": None})
+                     and "node-1" not in watcher.snapshot()))
+
+        api.compact()
+        api.add_node("node-3", "10.0.0.3")
+        check(results, "expired resourceVersion (410) re-lists",
+              _until(lambda: "node-3" in watcher.snapshot()) and lists("/api/v1/nodes") > node_lists,
+              f"{lists('/api/v1/nodes') - node_lists} re-lists")
+        api.add_node("node-4", "10.0.0.4")
+        check(results, "watch resumes after the re-list", _until(lambda: "node-4" in watcher.snapshot()))
+    finally:
+        watcher.stop()
+        api.close()  # ends the open watch streams before their client goes away
+        api_client.close()
+
+
+def main(node: str) -> bool:
+    results = []
+    with FakeKubeAPI(phase_interval=0.1) as api:
+        argo_scenarios(api, results)
+        template_scenarios(api, node, results)
+        discovery_scenarios(api, results)
+    failed = [name for name, ok in results if not ok]
+    print(f"\n{len(results) - len(failed)}/{len(results)} scenarios passed")
+    return not failed
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--node", default="MoLMo", help="module whose manifest is registered as a template")
+    a = ap.parse_args()
+    sys.exit(0 if main(a.node) else 1)
@@ -15,6 +15,11 @@ BANDIT_STATE_PATH = os.path.join(CURRENT_DIR, "bandit_state.pkl")
 RAG_FEEDBACK_PATH = os.path.join(CURRENT_DIR, "rag_feedback.txt")
 RUN_METRICS_PATH = os.path.join(CURRENT_DIR, "run_metrics.jsonl")
 ATS_LOG_PATH = os.path.join(CURRENT_DIR, "ats_log.csv")
+DEPLOY_REGISTRY_PATH = os.path.join(CURRENT_DIR, "deployments.json")
+INGEST_CHECKPOINT_PATH = os.path.join(DB_DIR, "ingest_checkpoint.json")
+TRACE_LOG_PATH = os.path.join(CURRENT_DIR, "stage_trace.jsonl")
+RUN_CHECKPOINT_PATH = os.path.join(CURRENT_DIR, "run_checkpoint.pkl")
+INTENT_CACHE_PATH = os.path.join(CURRENT_DIR, "intent_cache.pkl")
 
 # --- Meterial Subdirectories ---
 URL_PATH = os.path.join(MATERIALS_DIR, "website.txt")
@@ -23,6 +28,7 @@ ORAN_DIR = os.path.join(MATERIALS_DIR, "oran")
 GPP_DIR = os.path.join(MATERIALS_DIR, "gpp")
 PAPER_DIR = os.path.join(MATERIALS_DIR, "papers")
 DELIVER_DIR = os.path.join(MATERIALS_DIR, "deliverables")
+SOURCE_CACHE_DIR = os.path.join(MATERIALS_DIR, "source_cache")
 
 # --- RAG & LLM Constants ---
 MODULES_INFO = {
@@ -139,10 +145,20 @@ GOLD = {
 }
 
 
+# --- Corpus Ingestion ---
+INGEST_BATCH_SIZE = 64       # chunks per embedding request / Chroma upsert
+INGEST_MAX_CONCURRENCY = 4   # embedding requests in flight at once
+
+# --- Utilization Logging ---
+UTIL_FLUSH_SECONDS = 30.0    # buffered utilization samples are written at least this often
+
 # --- Bandit & Training Constants ---
 MAX_T = 150
 EMB_DIM = 3072  # text-embedding-3-small (1536) + text-embedding-3-small (1536)
 
+# --- Intent Cache ---
+INTENT_CACHE_THRESHOLD = 0.92  # cosine similarity above which a cached pipeline is reused
+
 # --- Blacklist ---
 try:
     with open(BL_PATH, 'r') as f:
@@ -1,9 +1,11 @@
 import re
 import os
+import hashlib
 import yaml
-from collections import defaultdict
+from collections import deque
 
 import config
+from .pipeline_utils import CandidateIR, parse_candidate
 
 MANIFESTS_DIR = os.path.join(config.CURRENT_DIR, "modules", "manifests")
 
@@ -60,79 +62,155 @@ def _template_name_for_node(node: str) -> str:
         base = f"no-manifest-{node}"
     return _sanitize_name(base)
 
-def parse_to_graph(cand_text: str):
-    """Parses the agent's numbered list into a graph structure (nodes and edges)."""
-    nodes = []
-    edges = []
-    step_map = {}
-    module_to_step = {}
+def _noop_template(name: str, msg: str) -> dict:
+    return {
+        "name": name,
+        "container": {
+            "image": "alpine:3.20",
+            "command": ["sh", "-c"],
+            "args": [f"echo '{msg}'"]
+        }
+    }
 
-    for line in cand_text.strip().splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        match = re.match(r"([\d\.]+)\s+(.+)", line)
-        if not match:
-            continue
-        step, name = match.groups()
-        name = name.strip()
-        nodes.append(name)
-        step_map[step] = name
-        module_to_step[name] = step
-
-    for step, module in step_map.items():
-        if '.' in step:
-            parent_step_prefix = step.split('.')[0]
-            potential_parents = [s for s in step_map if s.startswith(parent_step_prefix) and s != step and '.' not in s]
-            if not potential_parents:
-                parent_major_num = int(parent_step_prefix) - 1
-                parent_steps = [s for s in step_map if s.startswith(str(parent_major_num))]
-                for ps in parent_steps:
-                    edges.append((step_map[ps], module))
-            else:
-                for ps in potential_parents:
-                    edges.append((step_map[ps], module))
+def _indent(text: str, n: int = 2) -> str:
+    pad = " " * n
+    return "".join(pad + ln if ln.strip() else ln for ln in text.splitlines(True))
 
-    return list(dict.fromkeys(nodes)), edges
+def _fragment(template: dict) -> str:
+    """YAML for one entry of spec.templates, already indented for splicing."""
+    return _indent(yaml.dump([template], sort_keys=False))
 
-def is_dag(nodes, edges):
-    """Verifies that the graph is a DAG (has no cycles) using DFS."""
-    graph = defaultdict(list)
-    for u, v in edges:
-        graph[u].append(v)
-
-    visiting = set()
-    visited = set()
-
-    def has_cycle(node):
-        visiting.add(node)
-        for neighbor in graph.get(node, []):
-            if neighbor in visiting:
-                return True
-            if neighbor not in visited and has_cycle(neighbor):
-                return True
-        visiting.remove(node)
-        visited.add(node)
-        return False
+def _compile_node_templates(node: str) -> tuple[str | None, list[tuple[dict, str]]]:
+    """Build the Argo templates (one per manifest doc) and their YAML fragments for a node.
+    Also returns the sha256 of the manifest text (None when the node has no manifest).
+    """
+    tmpl_base = _template_name_for_node(node)
+    manifest_str = _read_manifest_for_node(node)
+    digest = hashlib.sha256(manifest_str.encode()).hexdigest() if manifest_str else None
+    if not manifest_str:
+        templates = [_noop_template(tmpl_base, f"No manifest mapped for {node}. Skipping.")]
+    else:
+        docs = _split_manifest_docs(manifest_str)
+        if not docs:
+            templates = [_noop_template(tmpl_base, f"Empty manifest for {node}. Skipping.")]
+        else:
+            templates = [{
+                "name": _doc_display_name(tmpl_base, doc, i),
+                "resource": {
+                    "action": "apply",
+                    "manifest": _dump_doc(doc),
+                    "setOwnerReference": True
+                }
+            } for i, doc in enumerate(docs, start=1)]
+    return digest, [(t, _fragment(t)) for t in templates]
 
-    for node in nodes:
-        if node not in visited:
-            if has_cycle(node):
-                return False
-    return True
+# node -> (manifest mtime_ns or None, manifest sha256 or None, compiled templates);
+# only nodes in NODE_TO_MANIFEST are cached, so LLM-invented names cannot grow it
+_NODE_TEMPLATE_CACHE: dict[str, tuple[int | None, str | None, list[tuple[dict, str]]]] = {}
+
+def _manifest_mtime(node: str) -> int | None:
+    fname = NODE_TO_MANIFEST.get(node)
+    if not fname:
+        return None
+    try:
+        return os.stat(os.path.join(MANIFESTS_DIR, fname)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def _compiled_node(node: str) -> tuple[str | None, list[tuple[dict, str]]]:
+    """Digest and compiled templates for a node, re-parsed only when its manifest's mtime changes."""
+    if node not in NODE_TO_MANIFEST:
+        return _compile_node_templates(node)  # a single no-op template, cheap to build
+    mtime = _manifest_mtime(node)
+    hit = _NODE_TEMPLATE_CACHE.get(node)
+    if hit is not None and hit[0] == mtime:
+        return hit[1], hit[2]
+    digest, compiled = _compile_node_templates(node)
+    _NODE_TEMPLATE_CACHE[node] = (mtime, digest, compiled)
+    return digest, compiled
+
+def _node_templates(node: str) -> list[tuple[dict, str]]:
+    return _compiled_node(node)[1]
+
+def manifest_digest(node: str) -> str | None:
+    """sha256 of the node's manifest text, or None if no manifest is mapped."""
+    return _compiled_node(node)[0]
+
+def workflow_template_name(node: str) -> str | None:
+    """Content-addressed WorkflowTemplate name for a node's manifest."""
+    digest = manifest_digest(node)
+    if digest is None:
+        return None
+    return f"{_template_name_for_node(node)}-{digest[:10]}"
+
+def build_workflow_template(node: str, namespace: str = "agentic-ai") -> dict | None:
+    """A WorkflowTemplate holding the node's per-doc resource templates, or None if it has no manifest."""
+    name = workflow_template_name(node)
+    if name is None:
+        return None
+    return {
+        "apiVersion": "argoproj.io/v1alpha1",
+        "kind": "WorkflowTemplate",
+        "metadata": {
+            "name": name,
+            "namespace": namespace,
+            "labels": {
+                "agentic-ai/module": _template_name_for_node(node),
+                "agentic-ai/manifest-sha256": manifest_digest(node)[:63],
+            },
+        },
+        "spec": {"templates": [tmpl for tmpl, _ in _node_templates(node)]},
+    }
+
+def parse_to_graph(cand: "str | CandidateIR"):
+    """Returns the graph structure (nodes and edges) of a candidate's numbered list."""
+    ir = parse_candidate(cand) if isinstance(cand, str) else cand
+    return ir.nodes, list(ir.edges)
+
+def _adjacency(nodes, edges):
+    """Ordered successor/predecessor lists for every node mentioned in nodes or edges."""
+    succ = {n: [] for n in nodes}
+    pred = {n: [] for n in nodes}
+    for u, v in dict.fromkeys(edges):
+        if u not in succ:
+            succ[u], pred[u] = [], []
+        if v not in succ:
+            succ[v], pred[v] = [], []
+        succ[u].append(v)
+        pred[v].append(u)
+    return succ, pred
+
+def topological_order(nodes, edges) -> list | None:
+    """Kahn's algorithm; returns the nodes in dependency order, or None if there is a cycle."""
+    succ, pred = _adjacency(nodes, edges)
+    indeg = {n: len(p) for n, p in pred.items()}
+    ready = deque(n for n, d in indeg.items() if d == 0)
+    order = []
+    while ready:
+        u = ready.popleft()
+        order.append(u)
+        for v in succ[u]:
+            indeg[v] -= 1
+            if indeg[v] == 0:
+                ready.append(v)
+    return order if len(order) == len(indeg) else None
+
+def is_dag(nodes, edges):
+    """Verifies that the graph is a DAG (has no cycles) using an iterative topological sort."""
+    return topological_order(nodes, edges) is not None
 
 def verify_dependencies(nodes, edges):
     """Checks if the graph structure respects the predefined module dependencies."""
-    predecessors = defaultdict(set)
-    for u, v in edges:
-        predecessors[v].add(u)
+    _, pred = _adjacency(nodes, edges)
+    order = topological_order(nodes, edges) or nodes
 
-    for node in nodes:
+    for node in order:
         required_deps = config.MODULE_DEPENDENCIES.get(node, [])
         if not required_deps:
             continue
-        if not set(required_deps).issubset(predecessors[node]):
-            missing = set(required_deps) - predecessors[node]
+        have = set(pred.get(node, []))
+        if not have.issuperset(required_deps):
+            missing = set(required_deps) - have
             print(f"🔥 Verification Error: Module '{node}' is missing dependencies: {list(missing)}")
             return False
 
@@ -146,13 +224,19 @@ def generate_argo_yaml(
     namespace: str = "agentic-ai",
     wait_for_dependencies: bool = True,
     service_account: str | None = "argo-executor",
+    template_refs: dict[str, str] | None = None,
 ) -> str:
     """Generates an Argo Workflow YAML that applies module-specific manifests per node.
     Template/task names are derived from the manifest filename instead of the node name.
+    Per-node templates come pre-rendered from the manifest cache and are spliced in as text.
+    Nodes listed in `template_refs` (node -> registered WorkflowTemplate name) are not
+    inlined; their tasks point at the registered templates through `templateRef`.
     """
-    templates = []
-    # Map each node to a list of template names (one per manifest doc)
+    template_refs = template_refs or {}
+    fragments = []
+    # Map each node to a list of task names (one per manifest doc)
     node_to_templates: dict[str, list[str]] = {}
+    task_refs: dict[str, dict] = {}
     name_counts = {}
 
     def _unique(n: str) -> str:
@@ -163,85 +247,59 @@ def generate_argo_yaml(
         name_counts[n] = c + 1
         return f"{n}-{c+1}"
 
-    # A resource template per node (inlines the manifest content)
+    # A resource template per manifest doc (inlines the manifest content)
     for node in nodes:
-        tmpl_base = _template_name_for_node(node)
-        manifest_str = _read_manifest_for_node(node)
         node_templates: list[str] = []
-
-        if manifest_str:
-            docs = _split_manifest_docs(manifest_str)
-            if not docs:
-                # No valid docs, create a no-op
-                tname = _unique(tmpl_base)
-                templates.append({
-                    "name": tname,
-                    "container": {
-                        "image": "alpine:3.20",
-                        "command": ["sh", "-c"],
-                        "args": [f"echo 'Empty manifest for {node}. Skipping.'"]
-                    }
-                })
-                node_templates.append(tname)
-            else:
-                # One template per document
-                for i, doc in enumerate(docs, start=1):
-                    tname = _unique(_doc_display_name(tmpl_base, doc, i))
-                    templates.append({
-                        "name": tname,
-                        "resource": {
-                            "action": "apply",
-                            "manifest": _dump_doc(doc),
-                            "setOwnerReference": True
-                        }
-                    })
-                    node_templates.append(tname)
-        else:
-            # No manifest mapped for this node
-            tname = _unique(tmpl_base)
-            templates.append({
-                "name": tname,
-                "container": {
-                    "image": "alpine:3.20",
-                    "command": ["sh", "-c"],
-                    "args": [f"echo 'No manifest mapped for {node}. Skipping.'"]
-                }
-            })
+        for tmpl, frag in _node_templates(node):
+            tname = _unique(tmpl["name"])
+            if node in template_refs:
+                task_refs[tname] = {"name": template_refs[node], "template": tmpl["name"]}
+            elif tname != tmpl["name"]:
+                frag = _fragment({**tmpl, "name": tname})
+            if node not in template_refs:
+                fragments.append(frag)
             node_templates.append(tname)
-
         node_to_templates[node] = node_templates
 
     # Build DAG tasks: include every per-doc template as its own task
+    _, pred = _adjacency(nodes, edges)
     dag_tasks = []
     for node in nodes:
-        # All upstream nodes that this node depends on
-        upstream_nodes = {u for (u, v) in edges if v == node}
-        # Flatten upstream templates
-        upstream_templates = []
-        for u in upstream_nodes:
-            upstream_templates.extend(node_to_templates.get(u, []))
+        # Flatten the templates of all upstream nodes this node depends on
+        deps = []
+        if wait_for_dependencies:
+            for u in pred.get(node, []):
+                deps.extend(node_to_templates.get(u, []))
         # Create one task per template for this node
         for tname in node_to_templates.get(node, []):
-            task = {"name": tname, "template": tname}
-            if wait_for_dependencies and upstream_templates:
-                # De-duplicate while preserving order
-                seen = set()
-                deps = [d for d in upstream_templates if not (d in seen or seen.add(d))]
-                task["dependencies"] = deps
+            if tname in task_refs:
+                task = {"name": tname, "templateRef": task_refs[tname]}
+            else:
+                task = {"name": tname, "template": tname}
+            if deps:
+                task["dependencies"] = list(deps)
             dag_tasks.append(task)
 
-    templates.append({"name": "main-dag", "dag": {"tasks": dag_tasks}})
+    fragments.append(_fragment({"name": "main-dag", "dag": {"tasks": dag_tasks}}))
 
-    workflow_spec = {"entrypoint": "main-dag", "templates": templates}
+    spec_tail = {}
     if not wait_for_dependencies:
-        workflow_spec["parallelism"] = max(1, len(dag_tasks))
+        spec_tail["parallelism"] = max(1, len(dag_tasks))
     if service_account:
-        workflow_spec["serviceAccountName"] = service_account
+        spec_tail["serviceAccountName"] = service_account
 
-    workflow = {
+    head = {
         "apiVersion": "argoproj.io/v1alpha1",
         "kind": "Workflow",
         "metadata": {"generateName": f"{name}-", "namespace": namespace},
-        "spec": workflow_spec,
     }
-    return yaml.dump(workflow, sort_keys=False)
+    parts = [
+        yaml.dump(head, sort_keys=False),
+        "spec:\n",
+        _indent(yaml.dump({"entrypoint": "main-dag"}, sort_keys=False)),
+        "  templates:\n",
+        *fragments,
+    ]
+    if spec_tail:
+        parts.append(_indent(yaml.dump(spec_tail, sort_keys=False)))
+    return "".join(parts)
@@ -0,0 +1,62 @@
+import time
+from typing import Callable
+
+import numpy as np
+
+from .pipeline_utils import CandidateIR
+from .evaluation import evaluate_modules
+
+
+class CandidateMemo:
+    """Per-intent cache of everything derived from a candidate pipeline.
+
+    Entries are keyed by the canonical `pipe_key`, so candidates that differ
+    only cosmetically (numbering, dashes, casing) share the parsed module
+    list, the feature vector and the reward/label.
+    """
+
+    def __init__(self, intent: str, featurize: Callable[[str], np.ndarray]):
+        self.intent = intent
+        self.featurize = featurize
+        self._entries = {}
+        self._calls = {"phi": 0, "evaluate": 0}
+        self._hits = {"phi": 0, "evaluate": 0}
+        self._cost = {"phi": 0.0, "evaluate": 0.0}
+
+    def lookup(self, ir: CandidateIR) -> dict:
+        key = ir.key
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._hits["phi"] += 1
+            return entry
+
+        t0 = time.perf_counter()
+        entry = {"key": key, "mods": ir.modules, "phi": self.featurize(ir.text),
+                 "reward": None, "label": None}
+        self._cost["phi"] += time.perf_counter() - t0
+        self._calls["phi"] += 1
+        self._entries[key] = entry
+        return entry
+
+    def score(self, entry: dict) -> tuple[float, str]:
+        if entry["reward"] is not None:
+            self._hits["evaluate"] += 1
+            return entry["reward"], entry["label"]
+
+        t0 = time.perf_counter()
+        entry["reward"], entry["label"] = evaluate_modules(self.intent, entry["mods"])
+        self._cost["evaluate"] += time.perf_counter() - t0
+        self._calls["evaluate"] += 1
+        return entry["reward"], entry["label"]
+
+    def stats(self) -> dict:
+        lookups = self._calls["phi"] + self._hits["phi"]
+        saved = sum(self._hits[k] * self._cost[k] / self._calls[k]
+                    for k in self._calls if self._calls[k])
+        return {
+            "unique": len(self._entries),
+            "lookups": lookups,
+            "repeats": self._hits["phi"],
+            "repeat_rate": self._hits["phi"] / lookups if lookups else 0.0,
+            "time_saved_s": saved,
+        }
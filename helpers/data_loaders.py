@@ -2,18 +2,21 @@ import os
 import re
 import json
 import hashlib
-import wikipediaapi
-from docx import Document
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.document_loaders import FireCrawlLoader, PyPDFLoader
-from langchain.schema import Document as LCDoc
+from functools import lru_cache
 
 import config
+from .source_cache import cache_key, cache_get, cache_has, cache_put
 
-wiki_client = wikipediaapi.Wikipedia(
-    language='en',
-    user_agent='AgenticAIDT/1.0 (your-name@example.com)'
-)
+
+# The Wikipedia client, FireCrawl, the PDF/DOCX readers and the splitter are
+# imported on first use: most runs find every source unchanged and never fetch.
+@lru_cache(maxsize=1)
+def wiki_client():
+    import wikipediaapi
+    return wikipediaapi.Wikipedia(
+        language='en',
+        user_agent='AgenticAIDT/1.0 (your-name@example.com)'
+    )
 
 
 def clean_text(txt: str) -> str:
@@ -41,83 +44,161 @@ def load_hashes() -> dict:
     return {}
 
 
-def fetch_wiki_text(title: str) -> str | None:
-    page = wiki_client.page(title)
+def fetch_wiki_text(title: str, offline: bool = False) -> str | None:
+    key = cache_key("wiki", title)
+    text = cache_get(key)
+    if text is not None or offline:
+        if text is None:
+            print(f"⚠ Wikipedia page not in source cache: {title}")
+        return text
+    page = wiki_client().page(title)
     if page.exists():
+        cache_put(key, page.text)
         return page.text
     print(f"⚠ Wikipedia page not found: {title}")
     return None
 
 
+def fetch_url_text(url: str, api_key: str | None, offline: bool = False) -> str | None:
+    key = cache_key("url", url)
+    text = cache_get(key)
+    if text is not None or offline:
+        if text is None:
+            print(f"⚠ URL not in source cache: {url}")
+        return text
+    from langchain_community.document_loaders import FireCrawlLoader
+    pages = FireCrawlLoader(url, api_key=api_key, mode="scrape").load()
+    text = "\n\n".join(p.page_content for p in pages)
+    cache_put(key, text)
+    return text
+
+
 def load_docx(path: str):
+    from docx import Document
     doc = Document(path)
     return "\n".join(p.text for p in doc.paragraphs)
 
 
-def load_documents() -> tuple[list, bool]:
+def uncached_sources() -> list[str]:
+    """Web and Wikipedia sources listed in the materials that the raw source cache lacks."""
+    missing = []
+    if os.path.exists(config.URL_PATH):
+        with open(config.URL_PATH) as f:
+            missing += [u for u in (u.strip() for u in f) if u and not cache_has(cache_key("url", u))]
+    if os.path.exists(config.WIKIPEDIA_PATH):
+        with open(config.WIKIPEDIA_PATH) as f:
+            for link in (l.strip() for l in f if l.strip()):
+                if not cache_has(cache_key("wiki", link.split('/wiki/')[-1])):
+                    missing.append(link)
+    return missing
+
+
+class DocumentStream:
+    """Chunks produced lazily, one source at a time.
+
+    Source hashes are only persisted by `commit()`, which the caller invokes
+    once every chunk has been ingested, so an interrupted ingest is retried
+    on the next run instead of being marked up to date.
+    """
+
+    def __init__(self, sources: list, curr: dict, prev: dict):
+        self._sources = sources
+        self._curr = curr
+        self._prev = prev
+
+    def __iter__(self):
+        for produce in self._sources:
+            yield from produce()
+
+    def __bool__(self):
+        return bool(self._sources)
+
+    def commit(self):
+        save_hashes(self._prev | self._curr)
+
+
+def load_documents(offline: bool = False) -> tuple[DocumentStream, bool]:
+    """Plan every source that changed since the last run and stream its chunks.
+
+    With `offline=True` nothing is fetched: web and Wikipedia sources are read
+    from the raw source cache only and every source is re-emitted, so the
+    vector index can be rebuilt from scratch on an air-gapped node.
+    """
+    from langchain.text_splitter import CharacterTextSplitter
+    from langchain.schema import Document as LCDoc
+
     splitter = CharacterTextSplitter(chunk_size=500, chunk_overlap=0)
     prev = load_hashes()
-    curr, docs, updated = {}, [], False
+    curr, sources = {}, []
     api_key = os.getenv("FIRECRAWL_API_KEY")
 
+    def url_source(u: str):
+        def produce():
+            text = fetch_url_text(u, api_key, offline=offline)
+            if text:
+                for d in splitter.split_text(text):
+                    yield LCDoc(page_content=d, metadata={"source": u})
+        return produce
+
+    def wiki_source(link: str, title: str):
+        def produce():
+            text = fetch_wiki_text(title, offline=offline)
+            if text:
+                curr[title] = hashlib.md5(text.encode()).hexdigest()
+                for d in splitter.split_text(text):
+                    yield LCDoc(page_content=d, metadata={"source": link})
+        return produce
+
+    def file_source(path: str, fn: str):
+        def produce():
+            try:
+                if fn.endswith(".pdf"):
+                    from langchain_community.document_loaders import PyPDFLoader
+                    pieces = PyPDFLoader(path).load()
+                else:
+                    pieces = [LCDoc(page_content=load_docx(
+                        path), metadata={"source": fn})]
+                chunks = splitter.split_documents(pieces)
+            except Exception as e:
+                print(f"⚠ Error processing file {path}: {e}")
+                return
+            for d in chunks:
+                d.page_content = clean_text(d.page_content)
+                d.metadata = {"source": fn}
+                yield d
+        return produce
+
     if os.path.exists(config.URL_PATH):
         curr['website.txt'] = md5(config.URL_PATH)
-        if curr['website.txt'] != prev.get('website.txt'):
-            updated = True
+        if offline or curr['website.txt'] != prev.get('website.txt'):
             with open(config.URL_PATH) as f:
-                urls = [u.strip() for u in f]
-            for u in urls:
-                for d in splitter.split_documents(FireCrawlLoader(api_key, u, "scrape").load()):
-                    d.metadata = {"source": u}
-                    docs.append(d)
+                urls = [u.strip() for u in f if u.strip()]
+            sources.extend(url_source(u) for u in urls)
 
     if os.path.exists(config.WIKIPEDIA_PATH):
         with open(config.WIKIPEDIA_PATH) as f:
             for link in (l.strip() for l in f if l.strip()):
                 title = link.split('/wiki/')[-1]
-                if title in prev:
+                if title in prev and not offline:
                     curr[title] = prev[title]
                     continue
-
-                updated = True
-                text = fetch_wiki_text(title)
-                if text:
-                    curr[title] = hashlib.md5(text.encode()).hexdigest()
-                    for d in splitter.split_text(text):
-                        docs.append(
-                            LCDoc(page_content=d, metadata={"source": link}))
+                sources.append(wiki_source(link, title))
 
     def load_bulk(folder: str):
-        nonlocal updated
         if not os.path.isdir(folder):
             return
-        for fn in os.listdir(folder):
+        for fn in sorted(os.listdir(folder)):
             if not fn.endswith((".pdf", ".docx")):
                 continue
             path = os.path.join(folder, fn)
             curr[fn] = md5(path)
-            if curr[fn] == prev.get(fn):
-                continue
-            updated = True
-            try:
-                if fn.endswith(".pdf"):
-                    pieces = PyPDFLoader(path).load()
-                else:
-                    pieces = [LCDoc(page_content=load_docx(
-                        path), metadata={"source": fn})]
-                for d in splitter.split_documents(pieces):
-                    d.page_content = clean_text(d.page_content)
-                    d.metadata = {"source": fn}
-                    docs.append(d)
-            except Exception as e:
-                print(f"⚠ Error processing file {path}: {e}")
+            if curr[fn] == prev.get(fn) and not offline:
                 continue
+            sources.append(file_source(path, fn))
 
     load_bulk(config.ORAN_DIR)
     load_bulk(config.GPP_DIR)
     load_bulk(config.PAPER_DIR)
     load_bulk(config.DELIVER_DIR)
 
-    if updated:
-        save_hashes(curr | prev)
-    return docs, updated
+    return DocumentStream(sources, curr, prev), bool(sources)
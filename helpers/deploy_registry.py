@@ -0,0 +1,79 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Callable
+
+import config
+from .argo_utils import manifest_digest
+
+# Phases in which a workflow's applied resources are still in place.
+LIVE_PHASES = {"Pending", "Running", "Succeeded"}
+
+
+def pipeline_hash(nodes, edges) -> str:
+    """Canonical hash of a deployable pipeline: its nodes, edges and manifest versions."""
+    payload = {
+        "nodes": sorted(set(nodes)),
+        "edges": sorted({(u, v) for u, v in edges}),
+        "manifests": {n: manifest_digest(n) for n in sorted(set(nodes))},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class DeploymentRegistry:
+    """Local record of submitted pipelines, keyed by `pipeline_hash` and persisted as JSON."""
+
+    def __init__(self, path: str = config.DEPLOY_REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self._entries = json.load(f)
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def live(self, key: str, phase_of: Callable[[str, str], str | None]) -> dict | None:
+        """The recorded deployment for `key` if its workflow is still live, refreshing its phase.
+
+        `phase_of(workflow, namespace)` returns the current phase or None when
+        the workflow is gone; dead entries are dropped from the registry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        phase = phase_of(entry["workflow"], entry["namespace"])
+        with self._lock:
+            if phase in LIVE_PHASES:
+                entry.update(phase=phase, checked_at=time.time())
+                self._save()
+                return dict(entry)
+            self._entries.pop(key, None)
+            self._save()
+        return None
+
+    def record(self, key: str, workflow: str, namespace: str, intent: str):
+        with self._lock:
+            self._entries[key] = {
+                "workflow": workflow,
+                "namespace": namespace,
+                "intent": intent,
+                "phase": "Pending",
+                "submitted_at": time.time(),
+                "checked_at": time.time(),
+            }
+            self._save()
+
+    def set_phase(self, workflow: str, phase: str):
+        with self._lock:
+            for entry in self._entries.values():
+                if entry["workflow"] == workflow:
+                    entry.update(phase=phase, checked_at=time.time())
+            self._save()
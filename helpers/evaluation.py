@@ -1,10 +1,25 @@
+from functools import lru_cache
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
 import config
 from .pipeline_utils import _parse
 
+# Integer IDs for the module library; anything else maps to OTHER_ID.
+MODULE_IDS = {m: i for i, m in enumerate(config.MODULES_INFO)}
+OTHER_ID = len(MODULE_IDS)
+N_IDS = OTHER_ID + 1
+
+_KIND_CODE = {"all": 0, "any": 1, "opt": 2}
+
 
 def evaluate(intent: str, cand_text: str):
+    return evaluate_modules(intent, _parse(cand_text))
+
+
+def evaluate_modules(intent: str, mods: Sequence[str]):
     req = config.GOLD[intent]
-    mods = _parse(cand_text)
     pos = {m: i for i, m in enumerate(mods)}
 
     present = set(mods)
@@ -37,3 +52,98 @@ def evaluate(intent: str, cand_text: str):
 
     extra = present - mandatory - optional
     return (1.0, "perfect") if not extra else (0.5, "partial")
+
+
+class GoldSpec(NamedTuple):
+    """A GOLD requirement list compiled to module-ID bitmasks.
+
+    `kinds[g]` is 0/1/2 for all/any/opt, `masks[g]` the group's bitmask and
+    `members[g]` its module IDs; `allowed` is the union of every group, i.e.
+    the modules that do not count as extra.
+    """
+    kinds: tuple[int, ...]
+    masks: tuple[int, ...]
+    members: tuple[np.ndarray, ...]
+    allowed: int
+
+
+def compile_gold(req) -> GoldSpec:
+    kinds, masks, members, allowed = [], [], [], 0
+    for kind, grp in req:
+        ids = sorted(MODULE_IDS[m] for m in grp)
+        mask = 0
+        for i in ids:
+            mask |= 1 << i
+        kinds.append(_KIND_CODE[kind])
+        masks.append(mask)
+        members.append(np.asarray(ids, dtype=np.intp))
+        allowed |= mask
+    return GoldSpec(tuple(kinds), tuple(masks), tuple(members), allowed)
+
+
+@lru_cache(maxsize=None)
+def gold_spec(intent: str) -> GoldSpec:
+    return compile_gold(config.GOLD[intent])
+
+
+def encode_modules(pipelines: Sequence[Sequence[str]]) -> np.ndarray:
+    """Pack parsed module lists into an (N, L) int array of IDs, -1 padded."""
+    width = max((len(p) for p in pipelines), default=0)
+    ids = np.full((len(pipelines), width), -1, dtype=np.int16)
+    for r, mods in enumerate(pipelines):
+        ids[r, :len(mods)] = [MODULE_IDS.get(m, OTHER_ID) for m in mods]
+    return ids
+
+
+def evaluate_ids(spec: GoldSpec, ids: np.ndarray) -> np.ndarray:
+    """Score an (N, L) module-ID matrix against one compiled spec.
+
+    Mirrors `evaluate`: a module's position is its last occurrence, groups
+    must be fully/partially present per kind, and the positions of each
+    all/any group must not start before the previous group ended.
+    """
+    n, width = ids.shape
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    # pos[r, m] = last index of module m in row r, or -1
+    onehot = ids[:, :, None] == np.arange(N_IDS, dtype=ids.dtype)
+    steps = np.arange(width, dtype=np.int32)[None, :, None]
+    pos = np.where(onehot, steps, -1).max(axis=1) if width else np.full((n, N_IDS), -1)
+    present = ((pos >= 0).astype(np.int64) << np.arange(N_IDS, dtype=np.int64)).sum(axis=1)
+
+    bad = np.zeros(n, dtype=bool)
+    prev = np.full(n, -1, dtype=np.int32)
+    big = np.iinfo(np.int32).max
+    for kind, mask, members in zip(spec.kinds, spec.masks, spec.members):
+        hit = present & mask
+        if kind == 0:
+            bad |= hit != mask
+        elif kind == 1:
+            bad |= hit == 0
+        else:
+            continue
+        gp = pos[:, members]
+        has = (gp >= 0).any(axis=1)
+        lo = np.where(gp >= 0, gp, big).min(axis=1)
+        hi = gp.max(axis=1)
+        bad |= has & (lo < prev)
+        prev = np.where(has, hi, prev)
+
+    extra = (present & ~spec.allowed) != 0
+    return np.where(bad, 0.0, np.where(extra, 0.5, 1.0)).astype(np.float32)
+
+
+_LABELS = {0.0: "bad", 0.5: "partial", 1.0: "perfect"}
+
+
+def evaluate_batch(intent: str, cands: Sequence) -> tuple[np.ndarray, list[str]]:
+    """Score a whole pool in one pass.
+
+    `cands` holds candidate texts or already-parsed module lists (e.g. a
+    logged dataset being re-scored). Returns rewards and labels aligned with
+    `cands`, identical to calling `evaluate` on each.
+    """
+    mods = [_parse(c) if isinstance(c, str) else c for c in cands]
+    rewards = evaluate_ids(gold_spec(intent), encode_modules(mods))
+    return rewards, [_LABELS[float(r)] for r in rewards]
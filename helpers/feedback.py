@@ -1,5 +1,4 @@
 import json
-from langchain.schema import Document as LCDoc
 from .pipeline_utils import pipe_key
 import config
 
@@ -35,7 +34,8 @@ def log_feedback(db, intent, pipeline_txt, label, reward):
 
     meta = {"type": "feedback", "label": label,
             "reward": reward, "intent": intent}
-    db.add_documents([LCDoc(page_content=text, metadata=meta)])
+    from langchain.schema import Document as LCDoc
+    ids = db.add_documents([LCDoc(page_content=text, metadata=meta)])
 
     with open(config.RAG_FEEDBACK_PATH, "a") as f:
         f.write(text + "\n")
@@ -45,3 +45,4 @@ def log_feedback(db, intent, pipeline_txt, label, reward):
         config.BLACKLIST.setdefault(intent, []).append(key)
         with open(config.BL_PATH, "w") as f:
             f.write(json.dumps(config.BLACKLIST, indent=2))
+    return ids
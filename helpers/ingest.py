@@ -0,0 +1,109 @@
+import os
+import json
+import time
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator
+
+import config
+
+
+def _batches(docs: Iterable, size: int) -> Iterator[list]:
+    it = iter(docs)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def _chunk_id(doc, seq: int) -> str:
+    src = str(doc.metadata.get("source", ""))
+    h = hashlib.sha1(f"{src}\0{doc.page_content}".encode()).hexdigest()[:16]
+    return f"{h}-{seq}"
+
+
+def _load_checkpoint(path: str) -> dict:
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return {}
+
+
+def _save_checkpoint(path: str, done: int, last_id: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump({"done": done, "last_id": last_id}, f)
+    os.replace(tmp, path)
+
+
+def _resume(docs: Iterable, path: str, db) -> tuple[Iterator, int]:
+    """Skip the chunks a previous, interrupted ingest already committed.
+
+    The chunk stream is deterministic (sources are read from the raw source
+    cache in a fixed order), so the checkpoint only records how many chunks
+    were inserted and the id of the last one; if that id no longer matches,
+    the stream changed and ingestion starts over (`docs` must therefore be
+    re-iterable, e.g. a DocumentStream or a list). The last chunk must also
+    still be in `db`, or the collection was rebuilt since and nothing is skipped.
+    """
+    it = iter(docs)
+    ckpt = _load_checkpoint(path)
+    done = ckpt.get("done", 0)
+    if not done:
+        return it, 0
+    for _ in islice(it, done - 1):
+        pass
+    last = next(it, None)
+    last_id = ckpt.get("last_id")
+    if (last is not None and _chunk_id(last, done - 1) == last_id
+            and db._collection.get(ids=[last_id], include=[])["ids"]):
+        print(f"↻ resuming ingest after {done} committed chunks")
+        return it, done
+    print("↻ ingest checkpoint is stale; starting over")
+    return iter(docs), 0
+
+
+def ingest_documents(db, embed, docs: Iterable,
+                     batch_size: int = config.INGEST_BATCH_SIZE,
+                     max_concurrency: int = config.INGEST_MAX_CONCURRENCY,
+                     checkpoint_path: str = config.INGEST_CHECKPOINT_PATH) -> int:
+    """Embed and upsert `docs` into the Chroma `db` in bounded batches.
+
+    At most `max_concurrency` embedding requests of `batch_size` chunks are in
+    flight; batches are inserted in stream order and the position is
+    checkpointed after every insert. Returns the number of chunks inserted.
+    """
+    it, seq = _resume(docs, checkpoint_path, db)
+    start, inserted = time.time(), 0
+    inflight = deque()
+
+    def drain_one():
+        nonlocal seq, inserted
+        batch, fut = inflight.popleft()
+        vectors = fut.result()
+        ids = [_chunk_id(d, seq + i) for i, d in enumerate(batch)]
+        db._collection.upsert(
+            ids=ids,
+            embeddings=vectors,
+            documents=[d.page_content for d in batch],
+            metadatas=[d.metadata or None for d in batch],
+        )
+        seq += len(batch)
+        inserted += len(batch)
+        _save_checkpoint(checkpoint_path, seq, ids[-1])
+        rate = inserted / max(time.time() - start, 1e-9)
+        print(f"📥 ingested {seq} chunks ({rate:.0f} chunks/s)")
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        for batch in _batches(it, batch_size):
+            if len(inflight) >= max_concurrency:
+                drain_one()
+            texts = [d.page_content for d in batch]
+            inflight.append((batch, pool.submit(embed.embed_documents, texts)))
+        while inflight:
+            drain_one()
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return inserted
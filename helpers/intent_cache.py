@@ -0,0 +1,80 @@
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+
+import config
+
+
+class IntentCache:
+    """Converged pipelines keyed by intent embedding, with a cosine nearest-neighbour lookup.
+
+    Each entry holds the intent it converged for, the canonical pipeline key
+    and text, its module list and its verified DAG (nodes, edges). Embeddings
+    are kept L2-normalised in one matrix, so a lookup is a single
+    matrix-vector product. The Argo YAML is not stored: it is regenerated
+    from the (cached) manifests on deployment, so it never goes stale.
+    Persisted as one pickle, replaced atomically on every insert.
+    """
+
+    def __init__(self, path: str = config.INTENT_CACHE_PATH,
+                 threshold: float = config.INTENT_CACHE_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._entries: list[dict] = []
+        self._vecs = np.zeros((0, 0), dtype=np.float32)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+            self._entries, self._vecs = state["entries"], state["vecs"]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _unit(vec) -> np.ndarray:
+        vec = np.asarray(vec, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump({"entries": self._entries, "vecs": self._vecs}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+    def nearest(self, vec) -> tuple[dict, float] | None:
+        """The entry closest to `vec` and its cosine similarity, if it clears the threshold."""
+        q = self._unit(vec)
+        with self._lock:
+            if not self._entries or self._vecs.shape[1] != q.shape[0]:
+                return None
+            sims = self._vecs @ q
+            i = int(np.argmax(sims))
+            if sims[i] < self.threshold:
+                return None
+            return dict(self._entries[i]), float(sims[i])
+
+    def add(self, intent: str, vec, key: str, pipeline: str, modules: list,
+            nodes: list, edges: list):
+        """Store a verified pipeline for `intent`, replacing an earlier entry for the same intent."""
+        q = self._unit(vec)
+        entry = {"intent": intent, "key": key, "pipeline": pipeline, "modules": list(modules),
+                 "nodes": list(nodes), "edges": [tuple(e) for e in edges], "added_at": time.time()}
+        with self._lock:
+            if self._vecs.shape[1] != q.shape[0]:
+                # embedding model changed; older vectors are not comparable
+                self._entries, self._vecs = [], np.zeros((0, q.shape[0]), dtype=np.float32)
+            idx = next((i for i, e in enumerate(self._entries) if e["intent"] == intent), None)
+            if idx is None:
+                self._entries.append(entry)
+                self._vecs = np.vstack([self._vecs, q[None, :]])
+            else:
+                self._entries[idx] = entry
+                self._vecs[idx] = q
+            self._save()
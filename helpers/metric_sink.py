@@ -0,0 +1,183 @@
+"""Buffered metric writers shared by monitoring.py and main.py.
+
+A MetricSink collects rows in memory and writes them in chunks once
+`flush_rows` rows are buffered or `flush_seconds` have passed. Paths ending
+in .csv get plain CSV; anything else gets the columnar format below.
+
+Columnar format: the magic line b"MCOL1\\n", then one block per chunk:
+a little-endian uint32 header length, a JSON header
+{"rows": n, "columns": [{"name", "dtype", "values"?}, ...]}, and each
+column's raw little-endian bytes in header order. dtype is "f8" or "i8";
+"dict" columns are int32 codes into the header's "values" list. Chunks
+carry their own schema, so columns may come and go between chunks.
+
+    python -m helpers.metric_sink metrics.mcol metrics.csv
+"""
+import csv
+import json
+import os
+import struct
+import sys
+import time
+from typing import Iterator
+
+import numpy as np
+
+MAGIC = b"MCOL1\n"
+_LEN = struct.Struct("<I")
+
+
+def _encode_column(values: list) -> tuple[dict, bytes]:
+    if all(type(v) is int for v in values):
+        return {"dtype": "i8"}, np.asarray(values, dtype="<i8").tobytes()
+    if all(v is None or isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        arr = np.array([np.nan if v is None else v for v in values], dtype="<f8")
+        return {"dtype": "f8"}, arr.tobytes()
+    cats: dict[str, int] = {}
+    codes = [cats.setdefault("" if v is None else str(v), len(cats)) for v in values]
+    return {"dtype": "dict", "values": list(cats)}, np.asarray(codes, dtype="<i4").tobytes()
+
+
+def _decode_column(meta: dict, buf: memoryview, rows: int) -> tuple[np.ndarray, int]:
+    if meta["dtype"] == "dict":
+        n = rows * 4
+        codes = np.frombuffer(buf[:n], dtype="<i4")
+        return np.asarray(meta["values"], dtype=object)[codes], n
+    n = rows * 8
+    return np.frombuffer(buf[:n], dtype="<" + meta["dtype"]), n
+
+
+class MetricSink:
+    """Buffers metric rows and appends them to `path` in chunks.
+
+    `columns` fixes the leading column order; keys first seen in later rows
+    are appended after them, except in CSV files, whose header is fixed by
+    the first flush (or by the existing file). Call `close()` (or use as a context manager)
+    to write the last partial chunk.
+    """
+
+    def __init__(self, path: str, columns: list[str] = (), flush_rows: int = 1024,
+                 flush_seconds: float = 10.0):
+        self.path = path
+        self.columns = list(columns)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.is_csv = path.lower().endswith(".csv")
+        self._rows: list[dict] = []
+        self._last_flush = time.monotonic()
+        self._header = None
+        self._seen = set(self.columns)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", newline="") if self.is_csv else open(path, "ab")
+
+    def write(self, row: dict):
+        for key in row:
+            if key not in self._seen:
+                self._seen.add(key)
+                if self._header is None:
+                    self.columns.append(key)
+                else:
+                    print(f"[metric_sink] {self.path}: column {key!r} is not in the CSV header, dropped")
+        self._rows.append(row)
+        if (len(self._rows) >= self.flush_rows
+                or time.monotonic() - self._last_flush >= self.flush_seconds):
+            self.flush()
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        if self.is_csv:
+            self._write_csv(rows)
+        else:
+            self._write_chunk(rows)
+        self._file.flush()
+
+    def _write_csv(self, rows: list[dict]):
+        writer = csv.writer(self._file)
+        if self._file.tell() == 0:
+            self._header = list(self.columns)
+            writer.writerow(self._header)
+        elif self._header is None:
+            with open(self.path, newline="") as f:
+                self._header = next(csv.reader(f), [])
+        writer.writerows([["" if r.get(c) is None else r.get(c) for c in self._header]
+                          for r in rows])
+
+    def _write_chunk(self, rows: list[dict]):
+        names = [c for c in self.columns if any(c in r for r in rows)]
+        metas, blobs = [], []
+        for name in names:
+            meta, blob = _encode_column([r.get(name) for r in rows])
+            metas.append({"name": name, **meta})
+            blobs.append(blob)
+        header = json.dumps({"rows": len(rows), "columns": metas}).encode()
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self._file.write(_LEN.pack(len(header)) + header + b"".join(blobs))
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_chunks(path: str) -> Iterator[dict[str, np.ndarray]]:
+    """Yield each chunk of a columnar metric file as {column: array}."""
+    with open(path, "rb") as f:
+        data = memoryview(f.read())
+    if bytes(data[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not a columnar metric file")
+    pos = len(MAGIC)
+    while pos + _LEN.size <= len(data):
+        (hlen,) = _LEN.unpack_from(data, pos)
+        pos += _LEN.size
+        header = json.loads(bytes(data[pos:pos + hlen]))
+        pos += hlen
+        chunk = {}
+        for meta in header["columns"]:
+            chunk[meta["name"]], n = _decode_column(meta, data[pos:], header["rows"])
+            pos += n
+        yield chunk
+
+
+def to_csv(src: str, dst: str) -> int:
+    """Convert a columnar metric file to CSV; returns the number of rows written."""
+    columns: list[str] = []
+    for chunk in read_chunks(src):
+        columns.extend(c for c in chunk if c not in columns)
+
+    rows = 0
+    with open(dst, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for chunk in read_chunks(src):
+            n = len(next(iter(chunk.values()), []))
+            cols = []
+            for c in columns:
+                col = chunk.get(c)
+                if col is None:
+                    cols.append([""] * n)
+                elif col.dtype.kind == "f":
+                    cols.append(["" if np.isnan(v) else repr(float(v)) for v in col])
+                else:
+                    cols.append(col.tolist())
+            writer.writerows(zip(*cols))
+            rows += n
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__.strip().splitlines()[-1].strip())
+    print(f"wrote {to_csv(sys.argv[1], sys.argv[2])} rows to {sys.argv[2]}")
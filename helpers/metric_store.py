@@ -0,0 +1,215 @@
+import time
+import warnings
+
+import numpy as np
+
+# Metric axis order; keys outside this list are appended as they are first seen.
+METRIC_FIELDS = [
+    "free_memory", "total_memory",
+    "tx_bytes", "rx_bytes", "tx_rate", "rx_rate",
+    "idle_cpu_seconds", "total_cpu_seconds", "cpu",
+    "node_cpu_power",
+    "gpu_freq", "vram_freq", "enc_util", "dec_util",
+    "power_usage", "gpu_util", "vram_util", "vram_free", "vram_used",
+]
+
+# (resolution in seconds, capacity) per level; None is the raw sample level.
+# With a 2 s interval: ~2 h raw, 1 day at 1 min, 30 days at 15 min.
+DEFAULT_LEVELS = ((None, 3600), (60, 1440), (900, 2880))
+
+
+class _Ring:
+    """Fixed-capacity ring of (timestamp, nodes x metrics frame) samples."""
+
+    def __init__(self, capacity: int, n_nodes: int, n_metrics: int):
+        self.capacity = capacity
+        self.ts = np.full(capacity, np.nan)
+        self.values = np.full((capacity, n_nodes, n_metrics), np.nan)
+        self.head = 0
+        self.size = 0
+
+    def push(self, ts: float, frame: np.ndarray):
+        self.ts[self.head] = ts
+        self.values[self.head] = frame
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def last(self, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """The newest `k` samples in chronological order."""
+        k = min(k, self.size)
+        idx = (self.head - k + np.arange(k)) % self.capacity
+        return self.ts[idx], self.values[idx]
+
+    def since(self, t0: float) -> tuple[np.ndarray, np.ndarray]:
+        ts, _ = self.last(self.size)
+        return self.last(int(np.count_nonzero(ts >= t0)))
+
+    def grow(self, n_nodes: int, n_metrics: int):
+        _, old_n, old_m = self.values.shape
+        values = np.full((self.capacity, n_nodes, n_metrics), np.nan)
+        values[:, :old_n, :old_m] = self.values
+        self.values = values
+
+
+class _Level:
+    """A downsampled ring fed with per-bucket means of the raw samples."""
+
+    def __init__(self, resolution: float, capacity: int, n_nodes: int, n_metrics: int):
+        self.resolution = resolution
+        self.ring = _Ring(capacity, n_nodes, n_metrics)
+        self.bucket = None
+        self.sum = np.zeros((n_nodes, n_metrics))
+        self.count = np.zeros((n_nodes, n_metrics))
+
+    def add(self, ts: float, frame: np.ndarray):
+        bucket = ts // self.resolution
+        if self.bucket is not None and bucket != self.bucket:
+            self.flush()
+        self.bucket = bucket
+        seen = ~np.isnan(frame)
+        self.sum += np.where(seen, frame, 0.0)
+        self.count += seen
+
+    def flush(self):
+        if self.bucket is None:
+            return
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(self.count > 0, self.sum / self.count, np.nan)
+        self.ring.push(self.bucket * self.resolution, mean)
+        self.bucket = None
+        self.sum[:] = 0
+        self.count[:] = 0
+
+    def grow(self, n_nodes: int, n_metrics: int):
+        self.ring.grow(n_nodes, n_metrics)
+        old_n, old_m = self.sum.shape
+        for name in ("sum", "count"):
+            arr = np.zeros((n_nodes, n_metrics))
+            arr[:old_n, :old_m] = getattr(self, name)
+            setattr(self, name, arr)
+
+
+class MetricStore:
+    """Bounded node x metric x time history backed by preallocated NumPy ring buffers.
+
+    Level 0 keeps raw samples; each further level keeps per-bucket means at a
+    coarser resolution, so a long run holds recent samples at full detail and
+    older ones downsampled, in a fixed amount of memory. Missing values are NaN.
+    """
+
+    def __init__(self, levels=DEFAULT_LEVELS, metrics=METRIC_FIELDS, node_capacity: int = 8):
+        self.nodes: list[str] = []
+        self.metrics: list[str] = list(metrics)
+        self._node_idx: dict[str, int] = {}
+        self._metric_idx = {m: i for i, m in enumerate(self.metrics)}
+        self._shape = (node_capacity, max(len(self.metrics), 1))
+        (_, raw_capacity), *coarse = levels
+        self.raw = _Ring(raw_capacity, *self._shape)
+        self.levels = [_Level(res, cap, *self._shape) for res, cap in coarse]
+
+    def _index(self, names: list[str], index: dict[str, int], name: str) -> int:
+        i = index.get(name)
+        if i is None:
+            i = index[name] = len(names)
+            names.append(name)
+        return i
+
+    def _fit(self):
+        n_cap, m_cap = self._shape
+        if len(self.nodes) <= n_cap and len(self.metrics) <= m_cap:
+            return
+        while n_cap < len(self.nodes):
+            n_cap *= 2
+        while m_cap < len(self.metrics):
+            m_cap *= 2
+        self._shape = (n_cap, m_cap)
+        self.raw.grow(*self._shape)
+        for level in self.levels:
+            level.grow(*self._shape)
+
+    def append(self, sample: dict[str, dict[str, float]], ts: float | None = None):
+        """Record one round of `{node: {metric: value}}`; `ts` defaults to now (epoch seconds)."""
+        ts = time.time() if ts is None else ts
+        cells = []
+        for node, vals in sample.items():
+            n = self._index(self.nodes, self._node_idx, node)
+            for metric, value in vals.items():
+                if value is None:
+                    continue
+                cells.append((n, self._index(self.metrics, self._metric_idx, metric), value))
+        self._fit()
+
+        frame = np.full(self._shape, np.nan)
+        if cells:
+            n, m, v = zip(*cells)
+            frame[list(n), list(m)] = v
+        self.raw.push(ts, frame)
+        for level in self.levels:
+            level.add(ts, frame)
+
+    def _ring(self, level: int) -> _Ring:
+        return self.raw if level == 0 else self.levels[level - 1].ring
+
+    def window(self, seconds: float | None = None, samples: int | None = None,
+               level: int = 0) -> tuple[np.ndarray, np.ndarray]:
+        """(timestamps, values[time, node, metric]) for the last `seconds` or `samples` of a level.
+
+        Only the first len(self.nodes) x len(self.metrics) cells are populated.
+        """
+        ring = self._ring(level)
+        if seconds is not None:
+            ts, values = ring.since(time.time() - seconds)
+        else:
+            ts, values = ring.last(ring.size if samples is None else samples)
+        return ts, values[:, :len(self.nodes), :len(self.metrics)]
+
+    def series(self, node: str, metric: str, seconds: float | None = None,
+               level: int = 0) -> tuple[np.ndarray, np.ndarray]:
+        ts, values = self.window(seconds=seconds, level=level)
+        return ts, values[:, self._node_idx[node], self._metric_idx[metric]]
+
+    def rolling(self, seconds: float | None = None, samples: int | None = None,
+                level: int = 0) -> dict[str, np.ndarray]:
+        """NaN-aware mean/min/max/std/last over a window, each a [node, metric] array."""
+        _, values = self.window(seconds=seconds, samples=samples, level=level)
+        if len(values) == 0:
+            empty = np.full((len(self.nodes), len(self.metrics)), np.nan)
+            return {k: empty for k in ("mean", "min", "max", "std", "last")}
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return {
+                "mean": np.nanmean(values, axis=0),
+                "min": np.nanmin(values, axis=0),
+                "max": np.nanmax(values, axis=0),
+                "std": np.nanstd(values, axis=0),
+                "last": values[-1],
+            }
+
+    def summary(self, seconds: float | None = None, samples: int | None = None,
+                level: int = 0) -> dict[str, dict[str, dict[str, float]]]:
+        """`rolling` as {node: {metric: {stat: value}}}, leaving out metrics with no samples."""
+        stats = self.rolling(seconds=seconds, samples=samples, level=level)
+        out = {}
+        for n, node in enumerate(self.nodes):
+            out[node] = {
+                metric: {k: float(arr[n, m]) for k, arr in stats.items()}
+                for m, metric in enumerate(self.metrics)
+                if not np.isnan(stats["mean"][n, m])
+            }
+        return out
+
+    def latest(self) -> dict[str, dict[str, float]]:
+        """The newest raw sample as {node: {metric: value}}."""
+        _, values = self.window(samples=1)
+        if len(values) == 0:
+            return {}
+        frame = values[-1]
+        return {
+            node: {metric: float(frame[n, m]) for m, metric in enumerate(self.metrics)
+                   if not np.isnan(frame[n, m])}
+            for n, node in enumerate(self.nodes)
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return self.raw.values.nbytes + sum(l.ring.values.nbytes for l in self.levels)
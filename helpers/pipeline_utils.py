@@ -1,4 +1,7 @@
 import re
+from functools import lru_cache
+from typing import NamedTuple
+
 import config
 
 _DASHES = dict.fromkeys(map(ord, "‑–—"), "-")
@@ -10,33 +13,112 @@ def _canon(name: str) -> str:
     return config._CANON.get(txt, txt)
 
 
-_NUMLINE = re.compile(r"[\d\.]+\s*(.+)")
+_NUMLINE = re.compile(r"([\d\.]+)\s*(.+)")
+_SPLIT = re.compile(r"Candidate-\d+[^\n\r]*?:", re.I)
 
 
-def _parse(text: str):
-    mods = []
-    for ln in text.splitlines():
+class CandidateIR(NamedTuple):
+    """One candidate pipeline, parsed once and shared by every consumer.
+
+    `modules` are canonical module names in answer order and `steps` the
+    matching step numbers ("2", "2.1", or None for unnumbered lines).
+    `edges` follow the original parse_to_graph rule on the step labels as
+    written: only labels containing a '.' ("2." or "2.1") get parents,
+    namely a bare "2" label if the answer has one, otherwise every label
+    numbered 1.
+    """
+    cid: str
+    text: str
+    modules: tuple[str, ...]
+    steps: tuple[str | None, ...]
+    edges: tuple[tuple[str, str], ...]
+
+    @property
+    def key(self) -> str:
+        return " > ".join(self.modules)
+
+    @property
+    def nodes(self) -> list[str]:
+        return list(dict.fromkeys(self.modules))
+
+
+def _graph_edges(modules, labels) -> tuple[tuple[str, str], ...]:
+    """Edges of the original parse_to_graph on raw step labels ("2", "2.", "2.1").
+
+    Majors are compared as numbers where the original matched string
+    prefixes, so step 1 no longer matches step 10; the lookups are indexed,
+    so building the edges is linear in their number.
+    """
+    step_map = {}
+    for label, mod in zip(labels, modules):
+        if label is not None:
+            step_map[label] = mod
+
+    by_major: dict[int, list[str]] = {}
+    for label in step_map:
+        by_major.setdefault(int(label.split('.')[0]), []).append(label)
+
+    edges = []
+    for label, mod in step_map.items():
+        if '.' not in label:
+            continue
+        major = label.split('.')[0]
+        parents = [major] if major in step_map else by_major.get(int(major) - 1, [])
+        edges.extend((step_map[p], mod) for p in parents)
+    return tuple(edges)
+
+
+def _build(cid: str, lines: list[str]) -> CandidateIR:
+    text = "\n".join(lines).strip()
+    modules, steps, labels = [], [], []
+    for ln in lines:
         ln = ln.strip()
         if not ln or ln.lower().startswith("candidate"):
             continue
         m = _NUMLINE.match(ln)
-        raw = m.group(1).rstrip(".") if m else ln
-        mods.append(_canon(raw))
-    return mods
+        if m:
+            label = m.group(1)
+            raw = m.group(2).rstrip(".")
+        else:
+            label, raw = "", ln
+        modules.append(_canon(raw))
+        numbered = label.split('.')[0].isdigit()
+        steps.append(label.strip('.') if numbered else None)
+        labels.append(label if numbered else None)
+    return CandidateIR(cid, text, tuple(modules), tuple(steps),
+                       _graph_edges(modules, labels))
 
 
-def pipe_key(pipeline_txt: str) -> str:
-    mods = _parse(pipeline_txt)
-    return " > ".join(mods)
+@lru_cache(maxsize=4096)
+def parse_candidate(text: str, cid: str = "cand_1") -> CandidateIR:
+    return _build(cid, text.splitlines())
 
 
-_SPLIT = re.compile(r"Candidate-\d+[^\n\r]*?:", re.I)
+def parse_answer(raw: str) -> list[CandidateIR]:
+    """Split an LLM answer into candidates and parse them in one pass over its lines."""
+    cands, cid, lines = [], None, []
+    for ln in raw.splitlines():
+        m = _SPLIT.search(ln)
+        if m is None:
+            lines.append(ln)
+            continue
+        if cid is not None:
+            cands.append(_build(cid, lines))
+        cid = m.group().rstrip(':').strip()
+        lines = [ln[m.end():]]
+    if cid is None:
+        return [_build("cand_1", lines)]
+    cands.append(_build(cid, lines))
+    return cands
+
+
+def _parse(text: str):
+    return list(parse_candidate(text).modules)
+
+
+def pipe_key(pipeline_txt: str) -> str:
+    return parse_candidate(pipeline_txt).key
 
 
 def split_cands(raw: str) -> dict[str, str]:
-    parts = _SPLIT.split(raw)
-    tags = _SPLIT.findall(raw)
-    if not tags:
-        return {"cand_1": raw.strip()}
-    return {tag.rstrip(':').strip(): body.strip()
-            for tag, body in zip(tags, parts[1:])}
+    return {ir.cid: ir.text for ir in parse_answer(raw)}
@@ -0,0 +1,139 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+# Profiler that `phase` reports to; None makes every phase a no-op.
+_active = None
+
+
+# Keep the profiler's own bookkeeping out of the memory reports.
+_OWN_TRACES = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_OWN_TRACES)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """Statistical profiler for every thread of the process, plus per-phase memory.
+
+    A daemon thread wakes every `interval` seconds, reads all thread stacks
+    through sys._current_frames() and counts them as folded stacks
+    ("phase;thread;file:func;...", flamegraph.pl / speedscope compatible).
+    With `memory=True`, tracemalloc records each phase's peak traced memory
+    and the allocations it left behind. Results go to `out_dir` on stop():
+    stacks.folded and memory.txt.
+    """
+
+    def __init__(self, out_dir: str, interval: float = 0.01, memory: bool = True, top: int = 15):
+        self.out_dir = out_dir
+        self.interval = interval
+        self.memory = memory
+        self.top = top
+        self.samples = Counter()
+        self.n_samples = 0
+        self._phase = "main"
+        self._mem_reports: list[str] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            phase = self._phase
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                stack.append(phase)
+                self.samples[";".join(reversed(stack))] += 1
+            self.n_samples += 1
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._thread.start()
+        return self
+
+    @contextmanager
+    def phase(self, name: str):
+        prev, self._phase = self._phase, name
+        before = None
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            before = _snapshot()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phase = prev
+            if before is not None:
+                self._mem_reports.append(self._memory_report(name, before, time.perf_counter() - t0))
+
+    def _memory_report(self, name, before, elapsed) -> str:
+        current, peak = tracemalloc.get_traced_memory()
+        after = _snapshot()
+        lines = [f"== phase {name}: {elapsed:.1f}s, peak {peak / 2**20:.1f} MiB, "
+                 f"live at end {current / 2**20:.1f} MiB",
+                 f"   allocations made during the phase and still live (top {self.top}):"]
+        for stat in after.compare_to(before, "lineno")[:self.top]:
+            if stat.size_diff <= 0:
+                break
+            frame = stat.traceback[0]
+            lines.append(f"   {stat.size_diff / 2**10:>10.1f} KiB  {stat.count_diff:>7} blocks  "
+                         f"{frame.filename}:{frame.lineno}")
+        return "\n".join(lines)
+
+    def stop(self) -> str:
+        """Stop sampling, write the reports, and return a short hot-spot summary."""
+        self._stop.set()
+        self._thread.join()
+        os.makedirs(self.out_dir, exist_ok=True)
+        with open(os.path.join(self.out_dir, "stacks.folded"), "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        if self._mem_reports:
+            with open(os.path.join(self.out_dir, "memory.txt"), "w") as f:
+                f.write("\n\n".join(self._mem_reports) + "\n")
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+        leaves = Counter()
+        for stack, count in self.samples.items():
+            _, thread, rest = stack.split(";", 2)
+            if thread == "MainThread":
+                leaves[rest.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        lines = [f"{self.n_samples} samples every {self.interval * 1e3:.0f} ms -> {self.out_dir}",
+                 "top frames on the main thread by self time:"]
+        lines += [f"  {c / total:6.1%}  {leaf}" for leaf, c in leaves.most_common(10)]
+        return "\n".join(lines)
+
+
+def set_profiler(profiler: SamplingProfiler | None):
+    global _active
+    _active = profiler
+
+
+@contextmanager
+def phase(name: str):
+    """Attribute samples and memory inside the block to phase `name` (no-op without a profiler)."""
+    if _active is None:
+        yield
+        return
+    with _active.phase(name):
+        yield
@@ -0,0 +1,91 @@
+import re
+
+# node-exporter series -> key in Monitor.parse_metrics output
+NODE_SERIES = {
+    'node_memory_MemAvailable_bytes': 'free_memory',
+    'node_memory_MemTotal_bytes': 'total_memory',
+    'node_network_transmit_bytes_total': 'tx_bytes',
+    'node_network_receive_bytes_total': 'rx_bytes',
+}
+NODE_CPU_SERIES = 'node_cpu_seconds_total'
+
+KEPLER_VM_SERIES = 'kepler_vm_cpu_watts'
+
+DCGM_SERIES = {
+    'DCGM_FI_DEV_SM_CLOCK': 'gpu_freq',
+    'DCGM_FI_DEV_MEM_CLOCK': 'vram_freq',
+    'DCGM_FI_DEV_ENC_UTIL': 'enc_util',
+    'DCGM_FI_DEV_DEC_UTIL': 'dec_util',
+    'DCGM_FI_DEV_POWER_USAGE': 'power_usage',
+    'DCGM_FI_DEV_GPU_UTIL': 'gpu_util',
+    'DCGM_FI_DEV_MEM_COPY_UTIL': 'vram_util',
+    'DCGM_FI_DEV_FB_FREE': 'vram_free',
+    'DCGM_FI_DEV_FB_USED': 'vram_used',
+}
+
+_VM_NAME = re.compile(r'vm_name="([^"]+)"')
+
+
+def _series_pattern(names) -> re.Pattern:
+    """Matches `name{labels} value` samples of the given metric names at line starts.
+
+    Every candidate match begins with a literal newline, so the regex engine
+    skips straight from line to line and only tries the names on each line
+    start; comment lines and unwanted series never reach Python.
+    """
+    alt = '|'.join(re.escape(n) for n in sorted(names, key=len, reverse=True))
+    return re.compile(r'\n(' + alt + r')(?:\{([^}\n]*)\})?[ \t]+([^ \t\n]+)')
+
+
+_NODE_RE = _series_pattern([*NODE_SERIES, NODE_CPU_SERIES])
+_KEPLER_RE = _series_pattern([KEPLER_VM_SERIES])
+_DCGM_RE = _series_pattern(DCGM_SERIES)
+
+
+def iter_series(pattern: re.Pattern, text: str):
+    """Yield (name, labels, value) for each sample matched by `pattern`; unparsable values are skipped."""
+    for m in pattern.finditer('\n' + text):
+        try:
+            value = float(m.group(3))
+        except ValueError:
+            continue
+        yield m.group(1), m.group(2) or '', value
+
+
+def parse_node_exporter(text: str) -> dict:
+    """Memory, network byte counters and summed CPU seconds from a node-exporter payload.
+
+    Network counters keep the last device seen; CPU seconds are summed over
+    all cpus/modes (total) and over mode="idle" (idle).
+    """
+    parsed = {}
+    idle = total = 0.0
+    seen_cpu = False
+    for name, labels, value in iter_series(_NODE_RE, text):
+        if name == NODE_CPU_SERIES:
+            seen_cpu = True
+            total += value
+            if 'mode="idle"' in labels:
+                idle += value
+        else:
+            parsed[NODE_SERIES[name]] = value
+    if seen_cpu:
+        parsed['idle_cpu_seconds'] = idle
+        parsed['total_cpu_seconds'] = total
+    return parsed
+
+
+def parse_kepler_vm_power(text: str) -> dict[str, float]:
+    """Sum of kepler_vm_cpu_watts per lower-cased vm_name."""
+    power = {}
+    for _, labels, value in iter_series(_KEPLER_RE, text):
+        m = _VM_NAME.search(labels)
+        if m:
+            vm = m.group(1).lower()
+            power[vm] = power.get(vm, 0.0) + value
+    return power
+
+
+def parse_dcgm(text: str) -> dict:
+    """Wanted DCGM fields by their short names; with several GPUs the last one listed wins."""
+    return {DCGM_SERIES[name]: value for name, _, value in iter_series(_DCGM_RE, text)}
@@ -1,33 +1,48 @@
 import os
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_chroma import Chroma
-try:
-    from langchain_core.prompts import ChatPromptTemplate
-except ImportError:
-    from langchain.prompts import ChatPromptTemplate
-from langchain.chains import create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
 
 import config
+from .ingest import ingest_documents
+from .data_loaders import DocumentStream
 
+# OpenAI, Chroma and the langchain chain builders are imported where they are
+# used, so importing this module (and main) stays cheap for short commands.
 
-def get_retriever(_docs, updated: bool):
+
+def get_retriever(_docs, updated: bool, persist_dir: str | None = None):
+    """Open (and, when fresh or updated, fill) the Chroma DB at `persist_dir`,
+    default config.PERSIST_DIR. The ingest checkpoint lives next to the DB."""
+    from langchain_openai import OpenAIEmbeddings
+    from langchain_chroma import Chroma
+
+    persist_dir = persist_dir or config.PERSIST_DIR
+    checkpoint_path = os.path.join(os.path.dirname(persist_dir),
+                                   os.path.basename(config.INGEST_CHECKPOINT_PATH))
     embed = OpenAIEmbeddings(model="text-embedding-3-small")
-    if not os.path.isdir(config.PERSIST_DIR):
-        db = Chroma.from_documents(
-            _docs, embed, persist_directory=config.PERSIST_DIR)
-    else:
-        db = Chroma(persist_directory=config.PERSIST_DIR,
-                    embedding_function=embed)
-        if updated and _docs:
-            db.add_documents(_docs)
+    fresh = not os.path.isdir(persist_dir)
+    if fresh and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)  # its chunks went with the old DB
+    db = Chroma(persist_directory=persist_dir,
+                embedding_function=embed)
+    if (fresh or updated) and _docs:
+        ingest_documents(db, embed, _docs, checkpoint_path=checkpoint_path)
+        if isinstance(_docs, DocumentStream):
+            _docs.commit()
     retriever = db.as_retriever(
         search_type="similarity", search_kwargs={"k": 50})
     return retriever, db
 
 
-def build_chain(retriever, intents: list[str], k=3):
-    llm = ChatOpenAI(model="gpt-4o", streaming=False)
+def build_chain(retriever, intents: list[str], k=3, llm=None):
+    try:
+        from langchain_core.prompts import ChatPromptTemplate
+    except ImportError:
+        from langchain.prompts import ChatPromptTemplate
+    from langchain.chains import create_retrieval_chain
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+
+    if llm is None:
+        from langchain_openai import ChatOpenAI
+        llm = ChatOpenAI(model="gpt-4o", streaming=False)
     intents_desc = "\n".join(f"- {it}" for it in intents)
     modules_desc = "\n".join(
         f"- **{m}**: {d}" for m, d in config.MODULES_INFO.items())
@@ -50,6 +65,6 @@ def build_chain(retriever, intents: list[str], k=3):
     return rag_chain
 
 
-def run_intent(intent: str, rag_chain) -> str:
-    ans = rag_chain.invoke({"input": intent})["answer"]
+def run_intent(intent: str, rag_chain, callbacks=None) -> str:
+    ans = rag_chain.invoke({"input": intent}, config={"callbacks": callbacks or []})["answer"]
     return ans
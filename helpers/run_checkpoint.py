@@ -0,0 +1,109 @@
+import os
+import pickle
+
+from .bandit import LinearTS
+
+
+def _key(phase: str, run_id: str, intent: str) -> str:
+    return f"{phase}|{run_id}|{intent}"
+
+
+def bandit_snapshot(bandit: LinearTS, with_arrays: bool = True) -> dict:
+    """The bandit's posterior (optional, it is EMB_DIM² floats) and sampler position."""
+    snap = {"rng": bandit.rng.bit_generator.state}
+    if with_arrays:
+        snap.update(A_inv=bandit.A_inv.copy(), b=bandit.b.copy())
+    return snap
+
+
+def restore_bandit(bandit: LinearTS, snap: dict) -> LinearTS:
+    if "A_inv" in snap:
+        bandit.A_inv, bandit.b = snap["A_inv"].copy(), snap["b"].copy()
+    bandit.rng.bit_generator.state = snap["rng"]
+    return bandit
+
+
+class RunCheckpoint:
+    """Progress of a main.py run, written atomically so a killed run can resume.
+
+    Holds the metric rows of finished (phase, run_id, intent) loops, the
+    position, success/theta series and bandit state of the loop in progress,
+    and, for the process pool, the bandit merged from the jobs finished so
+    far. `run` identifies the run (intents, MAX_T, seeds); a checkpoint
+    written by a different run is ignored. Feedback vectors, the blacklist
+    and the deployment registry are persisted by their own code as the run
+    goes, so rounds after the last checkpoint are redone but not lost.
+    """
+
+    def __init__(self, path: str, run: dict, every: int = 10, resume: bool = False):
+        self.path = path
+        self.every = every
+        self._state = {"run": run, "done": {}, "loop": None, "merged": None}
+        if resume:
+            self._load(run)
+
+    def _load(self, run: dict):
+        if not os.path.exists(self.path):
+            print("↻ no run checkpoint found; starting from scratch")
+            return
+        with open(self.path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("run") != run:
+            print("↻ run checkpoint belongs to a different run; starting over")
+            return
+        self._state = state
+        loop = state["loop"]
+        where = f", {loop['key']} at t={loop['next_t']}" if loop else ""
+        print(f"↻ resuming run: {len(state['done'])} intent loops done{where}")
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(self._state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def done(self, phase: str, run_id: str, intent: str) -> dict | None:
+        """The metric row of a finished loop, or None if it still has to run."""
+        return self._state["done"].get(_key(phase, run_id, intent))
+
+    def loop(self, phase: str, run_id: str, intent: str) -> dict | None:
+        """The saved state of this loop if it was interrupted, else None."""
+        loop = self._state["loop"]
+        if loop is not None and loop["key"] == _key(phase, run_id, intent):
+            return loop
+        return None
+
+    def save_loop(self, phase: str, run_id: str, intent: str, next_t: int, series: dict,
+                  bandit: LinearTS, with_arrays: bool, force: bool = False):
+        """Record a loop about to start round `next_t`; written every `every` rounds or when forced.
+
+        `series` holds the loop's locals (success/theta series, streak). The
+        bandit's arrays are only stored when the loop updates them.
+        """
+        if not force and (self.every <= 0 or (next_t - 1) % self.every):
+            return
+        self._state["loop"] = {"key": _key(phase, run_id, intent), "next_t": next_t,
+                               "series": series, "bandit": bandit_snapshot(bandit, with_arrays)}
+        self._save()
+
+    def finish(self, phase: str, run_id: str, intent: str, row: dict, merged: LinearTS | None = None):
+        """Record a finished loop (and, for the pool, the bandit merged so far)."""
+        self._state["done"][_key(phase, run_id, intent)] = row
+        self._state["loop"] = None
+        if merged is not None:
+            self._state["merged"] = {"phase": phase, "bandit": bandit_snapshot(merged)}
+        self._save()
+
+    def merged(self, phase: str) -> dict | None:
+        """The pool's merged bandit snapshot for `phase`, if jobs of it already finished."""
+        merged = self._state["merged"]
+        return merged["bandit"] if merged and merged["phase"] == phase else None
+
+    def clear(self):
+        """Drop the checkpoint once the run's metrics are safely written."""
+        for path in (self.path, self.path + ".tmp"):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,136 @@
+import json
+import math
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local port of the monitor's snapshot endpoint
+SNAPSHOT_PORT = 9188
+METRIC_PREFIX = "agentic"
+
+
+def _clean(value):
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(latest: dict, rolling: dict, window: float, ts: float) -> str:
+    """Latest per-node values plus rolling mean/max as Prometheus exposition text."""
+    families: dict[str, list[str]] = {}
+    for node, vals in latest.items():
+        for metric, value in vals.items():
+            families.setdefault(f"{METRIC_PREFIX}_node_{metric}", []).append(
+                f'{{node="{_label(node)}"}} {value!r}')
+    win = f"{window:g}s"
+    for node, metrics in rolling.items():
+        for metric, stats in metrics.items():
+            for stat in ("mean", "max"):
+                families.setdefault(f"{METRIC_PREFIX}_node_{metric}_{stat}", []).append(
+                    f'{{node="{_label(node)}",window="{win}"}} {stats[stat]!r}')
+    lines = []
+    for name in sorted(families):
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(name + sample for sample in families[name])
+    lines.append(f"# TYPE {METRIC_PREFIX}_snapshot_timestamp_seconds gauge")
+    lines.append(f"{METRIC_PREFIX}_snapshot_timestamp_seconds {ts!r}")
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body, ctype = self.server.snapshots.get(self.path.split("?", 1)[0], (None, None))
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+class SnapshotServer:
+    """Serves the monitor's latest cluster state from memory.
+
+    `publish` renders both responses once per round on the monitor's thread,
+    so a request only copies prebuilt bytes:
+      /snapshot  JSON {"timestamp", "window_s", "nodes": latest, "rolling": {node: {metric: stats}}}
+      /metrics   the same as Prometheus gauges, for one scrape instead of one per node
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = SNAPSHOT_PORT, window: float = 60.0):
+        self.window = window
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.snapshots = {}
+        self.publish({}, None)
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name="snapshot-server", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def publish(self, latest: dict, store):
+        ts = time.time()
+        rolling = store.summary(seconds=self.window) if store is not None else {}
+        payload = {
+            "timestamp": ts,
+            "window_s": self.window,
+            "nodes": latest,
+            "rolling": {
+                node: {m: {k: _clean(v) for k, v in stats.items()} for m, stats in metrics.items()}
+                for node, metrics in rolling.items()
+            },
+        }
+        # A single dict assignment, so readers see either the old or the new pair.
+        self._httpd.snapshots = {
+            "/snapshot": (json.dumps(payload).encode(), "application/json"),
+            "/metrics": (render_prometheus(latest, rolling, self.window, ts).encode(),
+                         "text/plain; version=0.0.4"),
+        }
+
+    def close(self):
+        if self._thread.is_alive():
+            self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def fetch_snapshot(url: str = f"http://127.0.0.1:{SNAPSHOT_PORT}", timeout: float = 0.5) -> dict | None:
+    """The monitor's current /snapshot, or None if no monitor is serving at `url` (or it is not JSON)."""
+    try:
+        with urllib.request.urlopen(url.rstrip("/") + "/snapshot", timeout=timeout) as resp:
+            return json.load(resp)
+    except (OSError, ValueError):
+        return None
+
+
+def cluster_load(snapshot: dict) -> dict:
+    """Cluster-wide view of a snapshot: mean CPU/GPU utilization and total node CPU power."""
+    nodes = snapshot.get("nodes") or {}
+
+    def values(metric):
+        return [v[metric] for v in nodes.values() if v.get(metric) is not None]
+
+    cpu, gpu, power = values("cpu"), values("gpu_util"), values("node_cpu_power")
+    return {
+        "nodes": len(nodes),
+        "cpu_mean": sum(cpu) / len(cpu) if cpu else None,
+        "gpu_util_mean": sum(gpu) / len(gpu) if gpu else None,
+        "cpu_power_w": sum(power) if power else None,
+    }
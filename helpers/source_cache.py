@@ -0,0 +1,76 @@
+import os
+import json
+import time
+import hashlib
+
+import config
+
+_INDEX_PATH = os.path.join(config.SOURCE_CACHE_DIR, "index.json")
+_OBJECTS_DIR = os.path.join(config.SOURCE_CACHE_DIR, "objects")
+
+
+def _load_index() -> dict:
+    if os.path.exists(_INDEX_PATH):
+        with open(_INDEX_PATH, 'r') as f:
+            return json.load(f)
+    return {}
+
+
+def _save_index(index: dict):
+    os.makedirs(config.SOURCE_CACHE_DIR, exist_ok=True)
+    tmp = _INDEX_PATH + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp, _INDEX_PATH)
+
+
+def _object_path(digest: str) -> str:
+    return os.path.join(_OBJECTS_DIR, digest[:2], digest + ".txt")
+
+
+def cache_key(kind: str, ref: str) -> str:
+    """Index key for a raw source, e.g. ('url', 'https://...') or ('wiki', 'Core_network')."""
+    return f"{kind}:{ref}"
+
+
+def cache_put(key: str, text: str) -> str:
+    """Store raw text under its sha256 and point `key` at it. Returns the digest."""
+    digest = hashlib.sha256(text.encode()).hexdigest()
+    path = _object_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    index = _load_index()
+    index[key] = {"sha256": digest, "fetched_at": time.time()}
+    _save_index(index)
+    return digest
+
+
+def cache_get(key: str) -> str | None:
+    entry = _load_index().get(key)
+    if not entry:
+        return None
+    path = _object_path(entry["sha256"])
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def cache_has(key: str) -> bool:
+    """Whether `key` is indexed and its object is on disk, without reading it."""
+    entry = _load_index().get(key)
+    return bool(entry) and os.path.exists(_object_path(entry["sha256"]))
+
+
+def cache_entries(kind: str | None = None) -> dict[str, dict]:
+    """All index entries (optionally only one kind), keyed by cache key."""
+    index = _load_index()
+    if kind is None:
+        return index
+    prefix = f"{kind}:"
+    return {k: v for k, v in index.items() if k.startswith(prefix)}
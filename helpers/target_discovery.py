@@ -0,0 +1,221 @@
+import threading
+
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+
+# Kepler endpoint used when no Kepler DaemonSet runs in the cluster
+DEFAULT_KEPLER_IP = '10.68.184.20'
+
+# target field -> (DaemonSet name, namespaces to look for it in)
+EXPORTER_DAEMONSETS = {
+    "gpu_ip": ("nvidia-dcgm-exporter", ("gpu-operator", "nvidia")),
+    "kepler_ip": ("kepler", ("kepler",)),
+}
+
+WATCH_TIMEOUT = 300      # seconds before a watch is re-opened from the last resourceVersion
+RETRY_BACKOFF = 5.0      # seconds to wait after a failed list/watch
+
+
+def _node_ip(node) -> str | None:
+    addresses = node.status.addresses or []
+    for addr in addresses:
+        if addr.type == "InternalIP":
+            return addr.address
+    return addresses[0].address if addresses else None
+
+
+def _resource_version(obj) -> str | None:
+    """resourceVersion of a watched object; BOOKMARK objects arrive as raw dicts."""
+    if isinstance(obj, dict):
+        return (obj.get("metadata") or {}).get("resourceVersion")
+    return obj.metadata.resource_version
+
+
+def _pod_target(pod) -> tuple[str, str] | None:
+    """(node name, pod IP) for a running exporter pod, None otherwise."""
+    if pod.metadata.deletion_timestamp or pod.status.phase != "Running":
+        return None
+    if not (pod.spec.node_name and pod.status.pod_ip):
+        return None
+    return pod.spec.node_name, pod.status.pod_ip
+
+
+class _Feed:
+    """One listed-then-watched resource and how its objects map into the target table."""
+
+    def __init__(self, name, list_fn, args, kwargs, reset, apply):
+        self.name = name
+        self.list_fn = list_fn
+        self.args = args
+        self.kwargs = kwargs
+        self.reset = reset
+        self.apply = apply
+
+    def sync(self) -> str:
+        resp = self.list_fn(*self.args, **self.kwargs)
+        self.reset(resp.items)
+        return resp.metadata.resource_version
+
+
+class TargetWatcher:
+    """Scrape targets kept current by Kubernetes watches on nodes and exporter pods.
+
+    `start()` lists nodes and the DCGM/Kepler DaemonSet pods once, then
+    background threads watch them from that resourceVersion and update the
+    table in place; an expired version (410 Gone) triggers one re-list.
+    `snapshot()` returns node -> {"node_ip", "kepler_ip", "gpu_ip"} without
+    calling the API server. Without a Kepler DaemonSet, every node uses
+    `kepler_ip` (or DEFAULT_KEPLER_IP) as before.
+    """
+
+    def __init__(self, v1, appsv1, kepler_ip: str | None = None,
+                 watch_timeout: int = WATCH_TIMEOUT):
+        self.v1 = v1
+        self.appsv1 = appsv1
+        self.kepler_ip = kepler_ip or DEFAULT_KEPLER_IP
+        self.watch_timeout = watch_timeout
+        self.version = 0
+        self._lock = threading.Lock()
+        self._nodes: dict[str, str] = {}
+        self._pods: dict[str, dict[str, tuple[str, str]]] = {}
+        self._stop = threading.Event()
+        self._watches: list[watch.Watch] = []
+        self._threads: list[threading.Thread] = []
+
+    # --- table updates ---
+
+    def _changed(self):
+        self.version += 1
+
+    def _reset_nodes(self, items):
+        with self._lock:
+            self._nodes = {n.metadata.name: ip for n in items if (ip := _node_ip(n))}
+            self._changed()
+
+    def _apply_node(self, kind, node):
+        name, ip = node.metadata.name, _node_ip(node)
+        with self._lock:
+            if kind == "DELETED" or ip is None:
+                if self._nodes.pop(name, None) is not None:
+                    self._changed()
+            elif self._nodes.get(name) != ip:
+                self._nodes[name] = ip
+                self._changed()
+
+    def _pod_handlers(self, field):
+        def reset(items):
+            with self._lock:
+                self._pods[field] = {p.metadata.name: t for p in items if (t := _pod_target(p))}
+                self._changed()
+
+        def apply(kind, pod):
+            target = None if kind == "DELETED" else _pod_target(pod)
+            with self._lock:
+                pods = self._pods[field]
+                if target is None:
+                    if pods.pop(pod.metadata.name, None) is not None:
+                        self._changed()
+                elif pods.get(pod.metadata.name) != target:
+                    pods[pod.metadata.name] = target
+                    self._changed()
+
+        return reset, apply
+
+    # --- discovery ---
+
+    def _find_daemonset(self, name, namespaces):
+        for ns in namespaces:
+            try:
+                ds = self.appsv1.read_namespaced_daemon_set(name=name, namespace=ns)
+            except ApiException as e:
+                if e.status == 404:
+                    continue
+                raise
+            labels = ds.spec.selector.match_labels or {}
+            return ns, ",".join(f"{k}={v}" for k, v in labels.items())
+        return None
+
+    def _feeds(self) -> list[_Feed]:
+        feeds = [_Feed("nodes", self.v1.list_node, (), {}, self._reset_nodes, self._apply_node)]
+        for field, (ds_name, namespaces) in EXPORTER_DAEMONSETS.items():
+            try:
+                found = self._find_daemonset(ds_name, namespaces)
+            except Exception as e:
+                print(f"Error discovering {ds_name} exporter pods: {e}")
+                found = None
+            if found is None:
+                continue
+            ns, selector = found
+            self._pods[field] = {}
+            feeds.append(_Feed(f"{ds_name} pods", self.v1.list_namespaced_pod, (ns,),
+                               {"label_selector": selector}, *self._pod_handlers(field)))
+        return feeds
+
+    def _loop(self, feed: _Feed, resource_version: str | None):
+        while not self._stop.is_set():
+            try:
+                if resource_version is None:
+                    resource_version = feed.sync()
+                w = watch.Watch()
+                self._watches.append(w)
+                try:
+                    for event in w.stream(feed.list_fn, *feed.args,
+                                          resource_version=resource_version,
+                                          timeout_seconds=self.watch_timeout,
+                                          allow_watch_bookmarks=True, **feed.kwargs):
+                        obj = event["object"]
+                        resource_version = _resource_version(obj) or resource_version
+                        if event["type"] != "BOOKMARK":
+                            feed.apply(event["type"], obj)
+                finally:
+                    self._watches.remove(w)
+            except ApiException as e:
+                if e.status != 410:
+                    print(f"[discovery] {feed.name} watch failed: {e.status} {e.reason}")
+                    self._stop.wait(RETRY_BACKOFF)
+                resource_version = None
+            except Exception as e:
+                print(f"[discovery] {feed.name} watch failed: {e!r}")
+                self._stop.wait(RETRY_BACKOFF)
+                resource_version = None
+
+    def start(self):
+        """List every feed once (so targets are ready on return), then watch in the background."""
+        for i, feed in enumerate(self._feeds()):
+            try:
+                resource_version = feed.sync()
+            except Exception as e:
+                if i == 0:  # no nodes, nothing to scrape
+                    raise
+                print(f"[discovery] listing {feed.name} failed, retrying in the background: {e}")
+                resource_version = None
+            t = threading.Thread(target=self._loop, args=(feed, resource_version),
+                                 name=f"watch-{feed.name}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    @property
+    def started(self) -> bool:
+        return bool(self._threads)
+
+    def stop(self):
+        self._stop.set()
+        for w in list(self._watches):
+            w.stop()
+
+    def snapshot(self) -> dict[str, dict[str, str]]:
+        with self._lock:
+            by_node = {field: {node: ip for node, ip in pods.values()}
+                       for field, pods in self._pods.items()}
+            targets = {}
+            for name, ip in self._nodes.items():
+                target = {"node_ip": ip}
+                for field in EXPORTER_DAEMONSETS:
+                    if field in by_node:
+                        if name in by_node[field]:
+                            target[field] = by_node[field][name]
+                    elif field == "kepler_ip":
+                        target[field] = self.kepler_ip
+                targets[name] = target
+            return targets
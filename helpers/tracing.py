@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+import numpy as np
+
+# Tracer that `span` reports to; None makes every span a no-op.
+_active = None
+
+
+class Tracer:
+    """Collects stage spans per decision round and appends one JSONL record per round.
+
+    Records look like {"ts", "end", "dur_s", <round fields>, "spans": [{"name",
+    "start", "dur_s", ...}]}; all timestamps are time.time() epoch seconds,
+    the same clock as the utilization log, so the two can be joined.
+    """
+
+    def __init__(self, path: str | None = None, keep: bool = False):
+        self.path = path
+        self.records = [] if keep else None
+        self._file = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._file = open(path, "a")
+        self._lock = threading.Lock()
+        self._round = None
+        self._totals: dict[str, dict[str, list[float]]] = {}
+
+    def add(self, name: str, start: float, dur: float, **attrs):
+        with self._lock:
+            if self._round is not None:
+                self._round["spans"].append({"name": name, "start": start, "dur_s": dur, **attrs})
+
+    @contextmanager
+    def round(self, **fields):
+        """Group the spans recorded inside the block into one round; the yielded dict
+        can be filled with more fields (reward, chosen pipeline, ...) before it is written."""
+        rec = {"ts": time.time(), **fields, "spans": []}
+        t0 = time.perf_counter()
+        with self._lock:
+            self._round = rec
+        try:
+            yield rec
+        finally:
+            with self._lock:
+                self._round = None
+            rec["dur_s"] = time.perf_counter() - t0
+            rec["end"] = rec["ts"] + rec["dur_s"]
+            self._finish(rec)
+
+    def _finish(self, rec: dict):
+        stages = self._totals.setdefault(rec.get("intent", ""), {})
+        per_stage: dict[str, float] = {}
+        for s in rec["spans"]:
+            per_stage[s["name"]] = per_stage.get(s["name"], 0.0) + s["dur_s"]
+        per_stage["round"] = rec["dur_s"]
+        for name, dur in per_stage.items():
+            stages.setdefault(name, []).append(dur)
+        if self.records is not None:
+            self.records.append(rec)
+        if self._file is not None:
+            self._file.write(json.dumps(rec, default=str) + "\n")
+            self._file.flush()
+
+    def merge(self, records: list[dict]):
+        """Add rounds recorded by another tracer (e.g. in a worker process)."""
+        for rec in records:
+            self._finish(rec)
+
+    def summary(self) -> dict[str, dict[str, dict[str, float]]]:
+        """{intent: {stage: {n, p50, p95}}} over per-round stage totals."""
+        return {
+            intent: {
+                name: {"n": len(d), "p50": float(np.percentile(d, 50)), "p95": float(np.percentile(d, 95))}
+                for name, d in stages.items()
+            }
+            for intent, stages in self._totals.items()
+        }
+
+    def print_summary(self):
+        for intent, stages in self.summary().items():
+            print(f"\n⏱  Stage latency | {intent}")
+            print(f"   {'stage':<14}{'rounds':>7}{'p50 ms':>10}{'p95 ms':>10}")
+            for name, s in sorted(stages.items(), key=lambda kv: -kv[1]["p50"]):
+                print(f"   {name:<14}{s['n']:>7}{s['p50'] * 1e3:>10.1f}{s['p95'] * 1e3:>10.1f}")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def set_tracer(tracer: Tracer | None):
+    global _active
+    _active = tracer
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time the block as stage `name` of the current round (no-op without a tracer)."""
+    tracer = _active
+    if tracer is None:
+        yield
+        return
+    start, t0 = time.time(), time.perf_counter()
+    try:
+        yield
+    finally:
+        tracer.add(name, start, time.perf_counter() - t0, **attrs)
+
+
+# langchain_core is only needed once a chain runs, so the handler class is
+# created on first use and importing this module (and main.py) stays light.
+@lru_cache(maxsize=1)
+def _stage_handler_class():
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class StageCallbackHandler(BaseCallbackHandler):
+        """LangChain callbacks that report retriever and LLM runs as "retrieval" / "llm" spans."""
+
+        def __init__(self):
+            self._open = {}
+
+        def _start(self, run_id, name):
+            self._open[run_id] = (name, time.time(), time.perf_counter())
+
+        def _end(self, run_id, **attrs):
+            started = self._open.pop(run_id, None)
+            if started is None or _active is None:
+                return
+            name, start, t0 = started
+            _active.add(name, start, time.perf_counter() - t0, **attrs)
+
+        def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+            self._start(run_id, "retrieval")
+
+        def on_retriever_end(self, documents, *, run_id, **kwargs):
+            self._end(run_id, docs=len(documents))
+
+        def on_retriever_error(self, error, *, run_id, **kwargs):
+            self._end(run_id, error=repr(error))
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self._start(run_id, "llm")
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self._start(run_id, "llm")
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            self._end(run_id, **{k: usage[k] for k in ("prompt_tokens", "completion_tokens") if k in usage})
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            self._end(run_id, error=repr(error))
+
+    return StageCallbackHandler
+
+
+def stage_callback_handler():
+    """A new StageCallbackHandler (a LangChain BaseCallbackHandler)."""
+    return _stage_handler_class()()
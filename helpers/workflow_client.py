@@ -0,0 +1,167 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator
+
+import yaml
+from kubernetes import client, config as kube_config, watch
+from kubernetes.client.rest import ApiException
+
+from .argo_utils import build_workflow_template, workflow_template_name
+
+ARGO_GROUP = "argoproj.io"
+ARGO_VERSION = "v1alpha1"
+WORKFLOW_PLURAL = "workflows"
+TEMPLATE_PLURAL = "workflowtemplates"
+TERMINAL_PHASES = {"Succeeded", "Failed", "Error"}
+
+
+def _phase_of(obj: dict) -> str:
+    return (obj.get("status") or {}).get("phase") or "Pending"
+
+
+class WorkflowSubmitter:
+    """Creates and watches Argo Workflow objects through the Kubernetes API.
+
+    One ApiClient (and so one urllib3 connection pool) is kept for the life
+    of the submitter. Pass `host` to talk to a specific API server, e.g. a
+    local fake one, instead of loading kube/in-cluster config.
+    """
+
+    def __init__(self, namespace: str = "default", host: str | None = None,
+                 max_workers: int = 4):
+        cfg = client.Configuration()
+        if host:
+            cfg.host = host
+        else:
+            try:
+                kube_config.load_kube_config(client_configuration=cfg)
+            except Exception:
+                kube_config.load_incluster_config(client_configuration=cfg)
+        cfg.connection_pool_maxsize = max(cfg.connection_pool_maxsize, max_workers)
+        self.api = client.CustomObjectsApi(client.ApiClient(cfg))
+        self.namespace = namespace
+        self._max_workers = max_workers
+        self._pool = None
+
+    def submit(self, workflow: dict | str, namespace: str | None = None) -> str:
+        """Create the workflow and return its generated name."""
+        body = yaml.safe_load(workflow) if isinstance(workflow, str) else dict(workflow)
+        ns = namespace or self.namespace
+        body["metadata"] = {**(body.get("metadata") or {}), "namespace": ns}
+        created = self.api.create_namespaced_custom_object(
+            ARGO_GROUP, ARGO_VERSION, ns, WORKFLOW_PLURAL, body)
+        return created["metadata"]["name"]
+
+    def submit_async(self, workflow: dict | str, namespace: str | None = None) -> Future:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self._max_workers,
+                                            thread_name_prefix="argo-submit")
+        return self._pool.submit(self.submit, workflow, namespace)
+
+    def phase(self, name: str, namespace: str | None = None) -> str | None:
+        """Current phase of a workflow, or None if it does not exist."""
+        try:
+            obj = self.api.get_namespaced_custom_object(
+                ARGO_GROUP, ARGO_VERSION, namespace or self.namespace,
+                WORKFLOW_PLURAL, name)
+        except ApiException as e:
+            if e.status == 404:
+                return None
+            raise
+        return _phase_of(obj)
+
+    def watch(self, name: str, namespace: str | None = None,
+              timeout: int = 600) -> Iterator[str]:
+        """Yield the workflow's phase on every transition until it is terminal or deleted."""
+        w = watch.Watch()
+        last = None
+        for event in w.stream(self.api.list_namespaced_custom_object,
+                              ARGO_GROUP, ARGO_VERSION, namespace or self.namespace,
+                              WORKFLOW_PLURAL,
+                              field_selector=f"metadata.name={name}",
+                              timeout_seconds=timeout):
+            if event["type"] == "DELETED":
+                w.stop()
+                return
+            phase = _phase_of(event["object"])
+            if phase != last:
+                last = phase
+                yield phase
+            if phase in TERMINAL_PHASES:
+                w.stop()
+                return
+
+    def wait(self, name: str, namespace: str | None = None,
+             timeout: int = 600) -> str | None:
+        last = None
+        for last in self.watch(name, namespace, timeout):
+            pass
+        return last
+
+    def close(self):
+        """Wait for pending asynchronous submissions and release the connection pool."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self.api.api_client.close()
+
+
+class TemplateRegistry:
+    """Registers one WorkflowTemplate per module manifest, named by the manifest's hash.
+
+    A template is created the first time its hash is seen and never rewritten;
+    when a manifest changes, the new hash gets a new template and the module's
+    older templates are deleted. Names already confirmed in this process are
+    not checked against the API server again. Another process registering or
+    pruning the same module at the same time (409 on create, 404 on delete)
+    is not an error.
+    """
+
+    def __init__(self, submitter: WorkflowSubmitter):
+        self.api = submitter.api
+        self.namespace = submitter.namespace
+        self._registered: dict[str, str] = {}
+
+    def ensure(self, nodes) -> dict[str, str]:
+        """Make sure every node with a manifest has its template; returns node -> template name."""
+        refs = {}
+        for node in nodes:
+            name = workflow_template_name(node)
+            if name is None:
+                continue
+            if self._registered.get(node) != name:
+                self._register(node, name)
+                self._registered[node] = name
+            refs[node] = name
+        return refs
+
+    def _register(self, node: str, name: str):
+        body = build_workflow_template(node, self.namespace)
+        try:
+            self.api.get_namespaced_custom_object(
+                ARGO_GROUP, ARGO_VERSION, self.namespace, TEMPLATE_PLURAL, name)
+        except ApiException as e:
+            if e.status != 404:
+                raise
+            try:
+                self.api.create_namespaced_custom_object(
+                    ARGO_GROUP, ARGO_VERSION, self.namespace, TEMPLATE_PLURAL, body)
+                print(f"📦 registered WorkflowTemplate {name}")
+            except ApiException as e:
+                if e.status != 409:
+                    raise
+
+        module = body["metadata"]["labels"]["agentic-ai/module"]
+        stale = self.api.list_namespaced_custom_object(
+            ARGO_GROUP, ARGO_VERSION, self.namespace, TEMPLATE_PLURAL,
+            label_selector=f"agentic-ai/module={module}")
+        for item in stale.get("items", []):
+            old = item["metadata"]["name"]
+            if old == name:
+                continue
+            try:
+                self.api.delete_namespaced_custom_object(
+                    ARGO_GROUP, ARGO_VERSION, self.namespace, TEMPLATE_PLURAL, old)
+                print(f"🧹 removed outdated WorkflowTemplate {old}")
+            except ApiException as e:
+                if e.status != 404:
+                    raise
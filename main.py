@@ -1,261 +1,764 @@
 import argparse
+import io
 import os
 import json
 import numpy as np
-import subprocess
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from multiprocessing import get_context
+from typing import TYPE_CHECKING, Callable, NamedTuple
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
 
 import config
-from helpers.data_loaders import load_documents
+from helpers.data_loaders import load_documents, uncached_sources
 from helpers.rag_chain import get_retriever, build_chain, run_intent
 from helpers.feedback import purge_feedback_vectors, log_feedback
-from helpers.bandit import load_bandit_state, save_bandit_state
-from helpers.pipeline_utils import split_cands, pipe_key
-from helpers.evaluation import evaluate
+from helpers.bandit import LinearTS, load_bandit_state, save_bandit_state
+from helpers.pipeline_utils import parse_answer
+from helpers.candidate_memo import CandidateMemo
+from helpers.evaluation import evaluate_modules
+from helpers.intent_cache import IntentCache
 from helpers.argo_utils import parse_to_graph, is_dag, verify_dependencies, generate_argo_yaml
+from helpers.deploy_registry import DeploymentRegistry, pipeline_hash
+from helpers.source_cache import cache_entries
+from helpers.metric_sink import MetricSink
+from helpers.snapshot_server import fetch_snapshot, cluster_load
+from helpers.tracing import Tracer, set_tracer, span, stage_callback_handler
+from helpers.profiler import SamplingProfiler, set_profiler, phase as profile_phase
+from helpers.run_checkpoint import RunCheckpoint, restore_bandit
 
-from functools import lru_cache
+if TYPE_CHECKING:
+    from helpers.workflow_client import WorkflowSubmitter, TemplateRegistry
+
+from functools import lru_cache, partial
 
 import threading
 import time
-import csv
-import psutil
 
 load_dotenv()
-_EMB = OpenAIEmbeddings(model="text-embedding-3-small")
+# The embedder, the Kubernetes client and psutil are created or imported on
+# first use, so `--reset`, `--help` and freshly spawned pool workers start fast.
+_EMB = None
+
+
+def _embedder():
+    global _EMB
+    if _EMB is None:
+        from langchain_openai import OpenAIEmbeddings
+        _EMB = OpenAIEmbeddings(model="text-embedding-3-small")
+    return _EMB
 
 
 @lru_cache(maxsize=4096)
 def _emb(txt: str) -> np.ndarray:
-    return np.asarray(_EMB.embed_query(txt), dtype=np.float32)
+    with span("embed"):
+        return np.asarray(_embedder().embed_query(txt), dtype=np.float32)
 
 
 def phi(intent_txt: str, pipeline_txt: str) -> np.ndarray:
     return np.concatenate([_emb(intent_txt), _emb(pipeline_txt)], axis=0)
 
 
+@lru_cache(maxsize=1)
+def _workflow_submitter() -> "WorkflowSubmitter":
+    from helpers.workflow_client import WorkflowSubmitter
+    return WorkflowSubmitter(namespace="default")
+
+
+@lru_cache(maxsize=1)
+def _template_registry() -> "TemplateRegistry":
+    from helpers.workflow_client import TemplateRegistry
+    return TemplateRegistry(_workflow_submitter())
+
+
+@lru_cache(maxsize=1)
+def _deploy_registry() -> DeploymentRegistry:
+    return DeploymentRegistry()
+
+
+def _report_workflow(name: str, deploy_key: str, intent: str, watch: bool):
+    print(f"✅ Workflow submitted successfully: {name}")
+    registry = _deploy_registry()
+    registry.record(deploy_key, name, _workflow_submitter().namespace, intent)
+    if watch:
+        for phase in _workflow_submitter().watch(name):
+            print(f"   ↳ {name}: {phase}")
+            registry.set_phase(name, phase)
+
+
+def _on_submitted(fut, deploy_key: str, intent: str, watch: bool):
+    if fut.exception() is not None:
+        print(f"🔥 Deployment Error: workflow creation failed ({fut.exception()}).")
+        return
+    _report_workflow(fut.result(), deploy_key, intent, watch)
+
+
+def _deploy_pipeline(intent: str, nodes: list, edges: list, args):
+    """Generate, save and submit the Argo workflow for a verified pipeline,
+    unless an identical pipeline is already deployed."""
+    from kubernetes.client.rest import ApiException
+    from kubernetes.config import ConfigException
+    from urllib3.exceptions import HTTPError
+
+    deploy_key = pipeline_hash(nodes, edges)
+    try:
+        if not args.force_deploy:
+            existing = _deploy_registry().live(deploy_key, _workflow_submitter().phase)
+            if existing:
+                print(f"♻ Identical pipeline already deployed as '{existing['workflow']}' "
+                      f"({existing['phase']}); skipping submission.")
+                return
+
+        intent_slug = intent.lower().replace(
+            ' ', '-').replace('(', '').replace(')', '')[:20]
+        template_refs = None
+        if args.template_refs:
+            try:
+                template_refs = _template_registry().ensure(nodes)
+            except ApiException as e:
+                print(f"⚠ WorkflowTemplate registration failed ({e.status} {e.reason}); inlining manifests")
+        yaml_content = generate_argo_yaml(
+            intent_slug, nodes, edges, wait_for_dependencies=False,
+            template_refs=template_refs)
+
+        yaml_filename = f"{intent_slug}-workflow.yaml"
+        with open(yaml_filename, "w") as f:
+            f.write(yaml_content)
+        print(f"✅ Argo Workflow YAML saved to '{yaml_filename}'")
+
+        if args.cluster_url:
+            snap = fetch_snapshot(args.cluster_url)
+            if snap is not None:
+                load = cluster_load(snap)
+                fmt = lambda v, unit: "n/a" if v is None else f"{v:.1f}{unit}"
+                print(f"📊 Cluster: {load['nodes']} nodes, cpu {fmt(load['cpu_mean'], '%')}, "
+                      f"gpu {fmt(load['gpu_util_mean'], '%')}, cpu power {fmt(load['cpu_power_w'], ' W')}")
+
+        print(f"🚢 Submitting '{yaml_filename}' to Argo...")
+        submitter = _workflow_submitter()
+        if args.async_submit:
+            with span("submit", mode="async"):
+                fut = submitter.submit_async(yaml_content)
+            fut.add_done_callback(
+                lambda fut: _on_submitted(fut, deploy_key, intent, args.watch_workflow))
+        else:
+            with span("submit", mode="sync"):
+                name = submitter.submit(yaml_content)
+            _report_workflow(name, deploy_key, intent, args.watch_workflow)
+    except ConfigException as e:
+        print(f"🔥 Deployment Error: no Kubernetes config available ({e}).")
+    except ApiException as e:
+        print(f"🔥 Deployment Error: workflow creation failed ({e.status} {e.reason}).")
+        print(e.body)
+    except (HTTPError, OSError) as e:
+        # unreachable or timed-out API server; keep the decision loop going
+        print(f"🔥 Deployment Error: Kubernetes API request failed ({e}).")
+
+
+UTIL_COLUMNS = [
+    "timestamp", "elapsed_s", "pid", "proc_cpu_percent",
+    "proc_mem_percent", "proc_rss_bytes", "sys_cpu_percent",
+    "sys_mem_percent", "disk_read_bytes", "disk_write_bytes",
+    "net_bytes_sent", "net_bytes_recv",
+]
+
+
 def _utilization_worker(path: str, interval: float, stop_event: threading.Event):
+    import psutil
+
     proc = psutil.Process(os.getpid())
 
     proc.cpu_percent(interval=None)
     psutil.cpu_percent(interval=None)
 
     start_ts = time.time()
-    file_exists = os.path.exists(path)
-
-    with open(path, "a", newline="") as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow([
-                "timestamp", "elapsed_s", "pid", "proc_cpu_percent",
-                "proc_mem_percent", "proc_rss_bytes", "sys_cpu_percent",
-                "sys_mem_percent", "disk_read_bytes", "disk_write_bytes",
-                "net_bytes_sent", "net_bytes_recv"
-            ])
-            f.flush()
-
-        while not stop_event.is_set():
-            time.sleep(interval)
-            now = time.time()
-            elapsed = now - start_ts
 
-            proc_cpu = proc.cpu_percent(interval=None)
-            sys_cpu = psutil.cpu_percent(interval=None)
-
-            proc_mem_pct = proc.memory_percent()
-            rss = proc.memory_info().rss
-            sys_mem_pct = psutil.virtual_memory().percent
+    with MetricSink(path, columns=UTIL_COLUMNS, flush_seconds=config.UTIL_FLUSH_SECONDS) as sink:
+        while not stop_event.wait(interval):
+            now = time.time()
 
             disk = psutil.disk_io_counters()
             net = psutil.net_io_counters()
 
-            writer.writerow([
-                f"{now:.6f}",
-                f"{elapsed:.3f}",
-                proc.pid,
-                f"{proc_cpu:.2f}",
-                f"{proc_mem_pct:.2f}",
-                rss,
-                f"{sys_cpu:.2f}",
-                f"{sys_mem_pct:.2f}",
-                getattr(disk, "read_bytes", 0),
-                getattr(disk, "write_bytes", 0),
-                getattr(net, "bytes_sent", 0),
-                getattr(net, "bytes_recv", 0),
-            ])
-            f.flush()
-
-
-def start_utilization_logger(path: str, interval: float) -> threading.Event:
-    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            sink.write({
+                "timestamp": round(now, 6),
+                "elapsed_s": round(now - start_ts, 3),
+                "pid": proc.pid,
+                "proc_cpu_percent": round(proc.cpu_percent(interval=None), 2),
+                "proc_mem_percent": round(proc.memory_percent(), 2),
+                "proc_rss_bytes": proc.memory_info().rss,
+                "sys_cpu_percent": round(psutil.cpu_percent(interval=None), 2),
+                "sys_mem_percent": round(psutil.virtual_memory().percent, 2),
+                "disk_read_bytes": getattr(disk, "read_bytes", 0),
+                "disk_write_bytes": getattr(disk, "write_bytes", 0),
+                "net_bytes_sent": getattr(net, "bytes_sent", 0),
+                "net_bytes_recv": getattr(net, "bytes_recv", 0),
+            })
+
+
+def start_utilization_logger(path: str, interval: float) -> tuple[threading.Event, threading.Thread]:
     stop_event = threading.Event()
     t = threading.Thread(target=_utilization_worker, args=(path, interval, stop_event), daemon=True)
     t.start()
-    return stop_event
+    return stop_event, t
+
+
+class RunContext(NamedTuple):
+    """What a decision loop needs besides the intent: the chain, the feedback store,
+    the tracer and callbacks, what to do with a verified pipeline, where to
+    checkpoint progress, and the cache of converged pipelines to reuse for
+    near-duplicate intents (None to do without either). With `cache_verify`
+    a cached pipeline is also scored against config.GOLD when the intent has
+    a GOLD spec."""
+    rag_chain: object
+    db: object
+    tracer: Tracer
+    callbacks: list
+    deploy: Callable[[str, list, list], None]
+    checkpoint: RunCheckpoint | None = None
+    intent_cache: IntentCache | None = None
+    cache_verify: bool = False
+
+
+def _run_id(run_id: str | None) -> str:
+    return run_id if run_id is not None else os.getenv("SEED", "0")
+
+
+def _reuse_cached_pipeline(intent: str, phase: str, ctx: RunContext, run_id: str) -> dict | None:
+    """Deploy the pipeline a near-duplicate intent converged to, instead of searching.
+
+    The cached DAG is re-checked (acyclic, dependencies met, not black-listed
+    for this intent) and, with `ctx.cache_verify`, scored against GOLD. Returns
+    the run_metrics row, or None when there is no usable entry.
+    """
+    with ctx.tracer.round(phase=phase, intent=intent, t=0, cached=True) as trace:
+        with span("intent_cache"):
+            hit = ctx.intent_cache.nearest(_emb(intent))
+        if hit is None:
+            trace.update(hit=False)
+            return None
+        entry, sim = hit
+        trace.update(hit=True, similarity=sim, chosen=entry["key"])
+        print(f"🧠 intent cache: {sim:.3f} similar to '{entry['intent']}'")
+        if entry["key"] in config.BLACKLIST.get(intent, []):
+            print("   cached pipeline is black-listed for this intent; searching instead")
+            return None
+        with span("verify"):
+            ok = is_dag(entry["nodes"], entry["edges"]) and verify_dependencies(entry["nodes"], entry["edges"])
+            if ok and ctx.cache_verify and intent in config.GOLD:
+                reward, label = evaluate_modules(intent, entry["modules"])
+                print(f"   GOLD check: reward={reward:.1f} ({label})")
+                ok = reward == 1.0
+        if not ok:
+            print("   cached pipeline failed verification; searching instead")
+            return None
+        print("   " + " | ".join(ln.strip() for ln in entry["pipeline"].splitlines()))
+        ctx.deploy(intent, entry["nodes"], entry["edges"])
+
+    return {
+        "run_id": run_id,
+        "phase": phase,
+        "intent": intent,
+        "ATS": 0,
+        "theta_final": 0.0,
+        "succ_series": [],
+        "theta_series": [],
+        "memo": None,
+        "cache": {"intent": entry["intent"], "similarity": sim, "key": entry["key"]},
+    }
+
+
+def run_intent_loop(intent: str, phase: str, ctx: RunContext,
+                    update_bandit: bool,
+                    stop_on_perfect: bool = True,
+                    consec_success_needed: int = 2,
+                    log_theta: bool = True,
+                    bandit: LinearTS | None = None,
+                    save_state: bool = True,
+                    run_id: str | None = None) -> tuple[dict, list, list]:
+    """Run the decision rounds for one intent.
+
+    Returns the run_metrics row, the (phi, reward) bandit updates applied, and
+    the ids of the feedback documents added to `ctx.db`. With `ctx.checkpoint`
+    the loop's position, series and bandit are checkpointed between rounds,
+    and an interrupted loop continues from its last checkpoint. With
+    `ctx.intent_cache` a near-duplicate intent that already converged is
+    served from the cache (ATS 0), and pipelines that converge are added.
+    """
+    print(f"\n=== {phase.upper()} | {intent} ===")
+    run_id = _run_id(run_id)
+    if bandit is None:
+        bandit = load_bandit_state(config.EMB_DIM)
+    success_hist = []
+    theta_hist = []
+    updates = []
+    feedback_ids = []
+
+    consec = 0
+    attempts_at_consec = config.MAX_T + 1
+    memo = CandidateMemo(intent, lambda txt: phi(intent, txt))
+
+    first_t = 1
+    saved = ctx.checkpoint.loop(phase, run_id, intent) if ctx.checkpoint else None
+    if saved is not None:
+        first_t = saved["next_t"]
+        series = saved["series"]
+        success_hist, theta_hist = list(series["succ"]), list(series["theta"])
+        consec, attempts_at_consec = series["consec"], series["attempts_at_consec"]
+        restore_bandit(bandit, saved["bandit"])
+        if update_bandit and save_state:
+            save_bandit_state(bandit)
+        if series.get("stopped"):
+            first_t = config.MAX_T + 1  # converged and stopped before finish() was recorded
+            print("↻ loop had already stopped on a perfect pipeline")
+        else:
+            print(f"↻ resuming at t={first_t:02d}")
+    elif ctx.intent_cache is not None:
+        row = _reuse_cached_pipeline(intent, phase, ctx, run_id)
+        if row is not None:
+            if ctx.checkpoint is not None:
+                ctx.checkpoint.finish(phase, run_id, intent, row)
+            return row, [], []
+
+    def checkpoint(next_t: int, force: bool = False, stopped: bool = False):
+        if ctx.checkpoint is None:
+            return
+        series = {"succ": list(success_hist), "theta": list(theta_hist), "consec": consec,
+                  "attempts_at_consec": attempts_at_consec, "stopped": stopped}
+        ctx.checkpoint.save_loop(phase, run_id, intent, next_t, series, bandit,
+                                 with_arrays=update_bandit, force=force)
+
+    for t in range(first_t, config.MAX_T + 1):
+        if t > first_t:
+            checkpoint(t)
+        with ctx.tracer.round(phase=phase, intent=intent, t=t) as trace:
+            llm_out = run_intent(intent, ctx.rag_chain, callbacks=ctx.callbacks)
+            cands = {ir.cid: ir for ir in parse_answer(llm_out)}
+
+            entries = {cid: memo.lookup(ir)
+                       for cid, ir in cands.items()}
+            blacklisted = set(config.BLACKLIST.get(intent, []))
+            pool = {cid: e["phi"] for cid, e in entries.items()
+                    if e["key"] not in blacklisted}
+            if not pool:
+                print("⚠ all candidates black-listed; skip this round")
+                continue
+
+            with span("select", pool=len(pool)):
+                chosen = bandit.select(pool)
+            chosen_ir = cands[chosen]
+            chosen_txt = chosen_ir.text
+            with span("evaluate"):
+                reward, label = memo.score(entries[chosen])
+            trace.update(reward=reward, chosen=chosen_ir.key)
+
+            with span("log_feedback"):
+                feedback_ids += log_feedback(ctx.db, intent, chosen_txt, label, reward)
+
+            if update_bandit:
+                with span("bandit_update"):
+                    bandit.update(pool[chosen], reward)
+                    updates.append((pool[chosen], reward))
+                    if save_state:
+                        save_bandit_state(bandit)
+
+            theta_norm = float(np.linalg.norm(bandit.A_inv @ bandit.b))
+            success_hist.append(int(reward == 1.0))
+            if log_theta:
+                theta_hist.append(theta_norm)
+
+            one_line = " | ".join(ln.strip()
+                                  for ln in chosen_txt.splitlines())
+            print(
+                f"t={t:02d} | reward={reward:.1f} | θ‖≈{theta_norm:.2f} | {one_line}")
+
+            if reward == 1.0:
+                consec += 1
+                if consec >= consec_success_needed and attempts_at_consec == config.MAX_T + 1:
+                    attempts_at_consec = t
+
+                    print(
+                        "\n🚀 Perfect pipeline found. Verifying and preparing for deployment...")
+                    with span("verify"):
+                        nodes, edges = parse_to_graph(chosen_ir)
+
+                        is_valid_dag = is_dag(nodes, edges)
+                        deps_ok = verify_dependencies(nodes, edges)
+
+                    if is_valid_dag and deps_ok:
+                        print("✅ Graph is a valid DAG and dependencies are met.")
+                        ctx.deploy(intent, nodes, edges)
+                        if ctx.intent_cache is not None:
+                            ctx.intent_cache.add(intent, _emb(intent), chosen_ir.key, chosen_txt,
+                                                 chosen_ir.modules, nodes, edges)
+                    else:
+                        print("🔥 Verification Failed. Skipping deployment.")
+                    # never deploy this twice, nor search on after stopping
+                    checkpoint(t + 1, force=True, stopped=stop_on_perfect)
+
+                    if stop_on_perfect:
+                        print(
+                            f"PERFECT {consec_success_needed}× in a row at step {t}")
+                        break
+            else:
+                consec = 0
+
+    memo_stats = memo.stats()
+    print(f"♻ candidate memo: {memo_stats['repeats']}/{memo_stats['lookups']} repeats "
+          f"({memo_stats['repeat_rate']:.0%}), ~{memo_stats['time_saved_s']:.2f}s saved")
+
+    row = {
+        "run_id": run_id,
+        "phase": phase,
+        "intent": intent,
+        "ATS": attempts_at_consec,
+        "theta_final": theta_hist[-1] if theta_hist else 0.0,
+        "succ_series": success_hist,
+        "theta_series": theta_hist,
+        "memo": memo_stats
+    }
+    if ctx.checkpoint is not None:
+        ctx.checkpoint.finish(phase, run_id, intent, row)
+    return row, updates, feedback_ids
+
+
+def run_phase(intent_list, phase: str, ctx: RunContext, **opts) -> list[dict]:
+    """Run the intents one after another in this process; returns their metric rows.
+
+    Intents that a resumed checkpoint already finished are not run again.
+    """
+    rows = []
+    for intent in intent_list:
+        row = ctx.checkpoint.done(phase, _run_id(opts.get("run_id")), intent) if ctx.checkpoint else None
+        if row is not None:
+            print(f"\n=== {phase.upper()} | {intent} === ↻ done in checkpoint")
+        else:
+            row = run_intent_loop(intent, phase, ctx, **opts)[0]
+        rows.append(row)
+    return rows
+
+
+class _Job(NamedTuple):
+    index: int
+    seed: int
+    intent: str
+    phase: str
+    intents: list          # every intent, for the chain's system prompt
+    persist_dir: str       # phase-start snapshot of the Chroma DB, copied by the worker
+    bandit_path: str       # shared bandit state at the start of the phase
+    blacklist: dict
+    opts: dict
+
+
+class _JobResult(NamedTuple):
+    row: dict
+    updates: list          # (phi, reward) rank-1 updates, in the order they were made
+    feedback: dict | None  # ids/documents/metadatas/embeddings of the new feedback vectors
+    feedback_lines: list
+    blacklisted: list      # pipeline keys black-listed for the job's intent
+    deploys: list          # (intent, nodes, edges) of verified pipelines
+    trace: list
+    log: str
+
+
+def _intent_worker(job: _Job) -> _JobResult:
+    """Run one (seed, intent) job in a pool process.
+
+    The worker gets a private copy of the Chroma DB and private feedback and
+    blacklist files, so nothing it writes is shared; everything it produced is
+    returned for the parent to merge. Pool processes run several jobs, so the
+    shared paths come from the job, not from config.
+    """
+    workdir = tempfile.mkdtemp(prefix="intent-job-")
+    out = io.StringIO()
+    try:
+        with redirect_stdout(out):
+            persist_dir = os.path.join(workdir, "chroma")
+            shutil.copytree(job.persist_dir, persist_dir)
+            config.PERSIST_DIR = persist_dir
+            config.RAG_FEEDBACK_PATH = os.path.join(workdir, "rag_feedback.txt")
+            config.BL_PATH = os.path.join(workdir, "blacklist.json")
+            config.BANDIT_STATE_PATH = job.bandit_path
+            config.BLACKLIST = {k: list(v) for k, v in job.blacklist.items()}
+
+            retriever, db = get_retriever(None, False)
+            rag_chain = build_chain(retriever, job.intents, k=5)
+            tracer = Tracer(keep=True)
+            set_tracer(tracer)
+            deploys = []
+            ctx = RunContext(rag_chain, db, tracer, [stage_callback_handler()],
+                             lambda intent, nodes, edges: deploys.append((intent, nodes, edges)))
+
+            bandit = load_bandit_state(config.EMB_DIM)
+            bandit.rng = np.random.default_rng([job.seed, job.index])
+            row, updates, feedback_ids = run_intent_loop(
+                job.intent, job.phase, ctx, bandit=bandit, save_state=False,
+                run_id=str(job.seed), **job.opts)
+
+            feedback = None
+            if feedback_ids:
+                feedback = db._collection.get(ids=feedback_ids,
+                                              include=["documents", "metadatas", "embeddings"])
+            feedback_lines = []
+            if os.path.exists(config.RAG_FEEDBACK_PATH):
+                with open(config.RAG_FEEDBACK_PATH) as f:
+                    feedback_lines = f.read().splitlines()
+            before = job.blacklist.get(job.intent, [])
+            blacklisted = config.BLACKLIST.get(job.intent, [])[len(before):]
+        return _JobResult(row, updates, feedback, feedback_lines, blacklisted,
+                          deploys, tracer.records, out.getvalue())
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_phase_parallel(intent_list, phase: str, ctx: RunContext, intents: list[str],
+                       seeds: list[int], workers: int, update_bandit: bool,
+                       **opts) -> list[dict]:
+    """Run every (seed, intent) pair of a phase on a process pool.
+
+    All jobs start from the bandit state and feedback store as they are when
+    the phase starts. Results are merged in job order (seed-major, then
+    intent), so the shared state and the returned rows do not depend on which
+    worker finishes first: bandit updates are replayed as rank-1 updates into
+    one LinearTS and saved once, feedback vectors are upserted into ctx.db,
+    and verified pipelines are deployed from this process. With
+    `ctx.checkpoint` every merged job is checkpointed with the merged bandit;
+    on resume, finished jobs are skipped and merging continues from there.
+    """
+    # Copied, since pending jobs are pickled lazily while results are merged.
+    blacklist = {k: list(v) for k, v in config.BLACKLIST.items()}
+    # Workers copy the DB when their job starts, while this process is already
+    # upserting merged feedback into it; they copy a snapshot taken now instead.
+    snapshot_dir = tempfile.mkdtemp(prefix=f"phase-{phase}-")
+    persist_dir = os.path.join(snapshot_dir, "chroma")
+    shutil.copytree(config.PERSIST_DIR, persist_dir)
+    jobs = [_Job(i, seed, intent, phase, intents, persist_dir, config.BANDIT_STATE_PATH,
+                 blacklist, dict(opts, update_bandit=update_bandit))
+            for i, (seed, intent) in enumerate(
+                (seed, intent) for seed in seeds for intent in intent_list)]
+    print(f"\n🧵 {phase}: {len(jobs)} jobs ({len(seeds)} seeds × {len(intent_list)} intents) "
+          f"on {workers} processes")
+
+    ckpt = ctx.checkpoint
+    rows = {}
+    if ckpt is not None:
+        rows = {job.index: row for job in jobs
+                if (row := ckpt.done(phase, str(job.seed), job.intent)) is not None}
+    pending = [job for job in jobs if job.index not in rows]
+    bandit = load_bandit_state(config.EMB_DIM)
+    merged = ckpt.merged(phase) if rows else None
+    if merged is not None:
+        restore_bandit(bandit, merged)
+    if rows:
+        print(f"↻ {len(rows)} jobs done in checkpoint, {len(pending)} to run")
+    n_updates = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+            for job, res in zip(pending, pool.map(_intent_worker, pending)):
+                print(f"\n--- seed {job.seed} ---{res.log}", end="")
+                for phi_vec, reward in res.updates:
+                    bandit.update(phi_vec, reward)
+                n_updates += len(res.updates)
+
+                if res.feedback is not None:
+                    ctx.db._collection.upsert(ids=res.feedback["ids"],
+                                              documents=res.feedback["documents"],
+                                              metadatas=res.feedback["metadatas"],
+                                              embeddings=res.feedback["embeddings"])
+                if res.feedback_lines:
+                    with open(config.RAG_FEEDBACK_PATH, "a") as f:
+                        f.write("\n".join(res.feedback_lines) + "\n")
+                known = config.BLACKLIST.get(job.intent, [])
+                new_keys = [k for k in dict.fromkeys(res.blacklisted) if k not in known]
+                if new_keys:
+                    config.BLACKLIST[job.intent] = known + new_keys
+                    with open(config.BL_PATH, "w") as f:
+                        f.write(json.dumps(config.BLACKLIST, indent=2))
+
+                ctx.tracer.merge(res.trace)
+                for intent, nodes, edges in res.deploys:
+                    ctx.deploy(intent, nodes, edges)
+                rows[job.index] = res.row
+                if ckpt is not None:
+                    ckpt.finish(phase, str(job.seed), job.intent, res.row,
+                                merged=bandit if update_bandit else None)
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+    if update_bandit and (n_updates or merged is not None):
+        save_bandit_state(bandit)
+        print(f"🎰 merged {n_updates} bandit updates into {config.BANDIT_STATE_PATH}")
+    return [rows[job.index] for job in jobs]
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--reset", action="store_true",
                         help="delete previous RAG logs and vector DB")
+    parser.add_argument("--offline-rebuild", action="store_true",
+                        help="rebuild the vector DB from the local source cache only, then exit")
+    parser.add_argument("--async-submit", action="store_true",
+                        help="submit Argo workflows in the background instead of blocking the loop")
+    parser.add_argument("--watch-workflow", action="store_true",
+                        help="follow submitted workflows until they reach a terminal phase")
+    parser.add_argument("--template-refs", action="store_true",
+                        help="register module manifests as WorkflowTemplates and reference them via templateRef")
+    parser.add_argument("--force-deploy", action="store_true",
+                        help="submit even if an identical pipeline is already deployed")
+    parser.add_argument("--cluster-url", type=str, default=None,
+                        help="snapshot endpoint of a running `monitoring.py --serve`, e.g. http://127.0.0.1:9188; "
+                             "its cluster load is reported before each deployment")
+    parser.add_argument("--trace-log", type=str, default=config.TRACE_LOG_PATH,
+                        help="JSONL file for per-round stage timings ('' to only print the summary)")
+    parser.add_argument("--profile", type=str, default=None, metavar="DIR",
+                        help="sample all thread stacks and per-phase memory; writes DIR/stacks.folded and DIR/memory.txt "
+                             "(sequential runs only)")
+    parser.add_argument("--profile-interval", type=float, default=0.01,
+                        help="seconds between stack samples with --profile")
+    parser.add_argument("--profile-no-memory", action="store_true",
+                        help="skip tracemalloc (it slows allocation-heavy code) and only sample stacks")
     parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="run intents (and --seeds) on this many processes; bandit updates are merged after each phase")
+    parser.add_argument("--seeds", type=int, nargs="+", default=None,
+                        help="repeat every phase once per seed (run_id in run_metrics.jsonl); implies the process pool")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from its checkpoint instead of starting over")
+    parser.add_argument("--checkpoint", type=str, default=config.RUN_CHECKPOINT_PATH,
+                        help="where run progress is checkpointed (removed once the metrics are written)")
+    parser.add_argument("--checkpoint-every", type=int, default=10,
+                        help="rounds between checkpoints of the running intent (0 disables checkpointing)")
+    parser.add_argument("--intent-cache", action="store_true",
+                        help="reuse the verified pipeline of a near-duplicate intent that already converged, "
+                             "and cache newly converged ones (sequential runs only)")
+    parser.add_argument("--intent-cache-threshold", type=float, default=config.INTENT_CACHE_THRESHOLD,
+                        help="cosine similarity of intent embeddings needed to reuse a cached pipeline")
+    parser.add_argument("--intent-cache-verify", action="store_true",
+                        help="also score a cached pipeline against config.GOLD before reusing it")
     parser.add_argument("--util-log", type=str, default="hardware_usage.csv",
-                        help="CSV path to write hardware utilization samples")
+                        help="where to write hardware utilization samples (*.csv, or columnar otherwise)")
     parser.add_argument("--util-interval", type=float, default=1.0,
                         help="Sampling interval in seconds for utilization logging")
     args = parser.parse_args()
+    if args.resume and args.checkpoint_every <= 0:
+        parser.error("--resume needs checkpointing (--checkpoint-every > 0)")
+    if args.intent_cache and (args.workers > 1 or args.seeds):
+        parser.error("--intent-cache only works for sequential runs, not with --workers/--seeds")
+    if args.profile and (args.workers > 1 or args.seeds):
+        parser.error("--profile only samples this process; run it without --workers/--seeds")
 
     if args.reset:
-        for path in [config.RAG_FEEDBACK_PATH, config.ATS_LOG_PATH, config.BANDIT_STATE_PATH]:
+        for path in [config.RAG_FEEDBACK_PATH, config.ATS_LOG_PATH, config.BANDIT_STATE_PATH,
+                     args.checkpoint, config.INTENT_CACHE_PATH]:
             if os.path.exists(path):
                 os.remove(path)
         if os.path.exists(config.PERSIST_DIR):
-            embed = OpenAIEmbeddings(model="text-embedding-3-small")
+            from langchain_chroma import Chroma
             db = Chroma(persist_directory=config.PERSIST_DIR,
-                        embedding_function=embed)
+                        embedding_function=_embedder())
             purge_feedback_vectors(db)
         print("✔ feedback history cleared; core corpus retained")
         if os.path.exists(config.BL_PATH):
             os.remove(config.BL_PATH)
         exit(0)
 
-    util_stop_event = start_utilization_logger(args.util_log, args.util_interval)
-    print(f"🧭 Utilization CSV: {os.path.abspath(args.util_log)}")
+    if args.offline_rebuild:
+        # Nothing is deleted until the new index is complete: it is built next
+        # to the old one and swapped in afterwards.
+        if not cache_entries():
+            print("⚠ source cache is empty; nothing to rebuild")
+            exit(1)
+        missing = uncached_sources()
+        if missing:
+            print(f"⚠ {len(missing)} sources are not in the source cache; refusing to rebuild:")
+            for src in missing:
+                print(f"   {src}")
+            exit(1)
+        docs, _ = load_documents(offline=True)
+        os.makedirs(os.path.dirname(config.PERSIST_DIR), exist_ok=True)
+        build_dir = tempfile.mkdtemp(prefix="rebuild-", dir=os.path.dirname(config.PERSIST_DIR))
+        try:
+            new_dir = os.path.join(build_dir, "chroma")
+            _, db = get_retriever(docs, True, persist_dir=new_dir)
+            n_chunks = db._collection.count()
+            old_dir = os.path.join(build_dir, "previous")
+            if os.path.exists(config.PERSIST_DIR):
+                os.replace(config.PERSIST_DIR, old_dir)
+            os.replace(new_dir, config.PERSIST_DIR)
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+        print(f"✔ vector DB rebuilt offline from {n_chunks} chunks")
+        exit(0)
+
+    profiler = None
+    if args.profile:
+        profiler = SamplingProfiler(args.profile, interval=args.profile_interval,
+                                    memory=not args.profile_no_memory).start()
+        set_profiler(profiler)
+        print(f"🔬 Profiling every {args.profile_interval * 1e3:.0f} ms into {os.path.abspath(args.profile)}")
+
+    util_stop_event, util_thread = start_utilization_logger(args.util_log, args.util_interval)
+    print(f"🧭 Utilization log: {os.path.abspath(args.util_log)}")
+    tracer = Tracer(args.trace_log or None)
+    set_tracer(tracer)
+    stage_callbacks = stage_callback_handler()
+    if args.trace_log:
+        print(f"⏱  Stage trace: {os.path.abspath(args.trace_log)}")
 
     try:
         print("🖇  RAG log  :", os.path.abspath(config.RAG_FEEDBACK_PATH))
         print("📂 Chroma DB:", os.path.abspath(config.PERSIST_DIR))
 
-        docs, upd = load_documents()
-        retriever, db = get_retriever(docs, upd)
-        intents = list(config.GOLD.keys())
-        rag_chain = build_chain(retriever, intents, k=5)
+        with profile_phase("startup"):
+            docs, upd = load_documents()
+            retriever, db = get_retriever(docs, upd)
+            intents = list(config.GOLD.keys())
+            rag_chain = build_chain(retriever, intents, k=5)
 
         train_intents = intents[0:-2]
         test_intents = intents[5:6]
         results = []
-
-        def run_phase(intent_list, phase: str,
-                      update_bandit: bool,
-                      stop_on_perfect: bool = True,
-                      consec_success_needed: int = 2,
-                      log_theta: bool = True):
-            for intent in intent_list:
-                print(f"\n=== {phase.upper()} | {intent} ===")
-                bandit = load_bandit_state(config.EMB_DIM)
-                success_hist = []
-                theta_hist = []
-
-                consec = 0
-                attempts_at_consec = config.MAX_T + 1
-
-                for t in range(1, config.MAX_T + 1):
-                    llm_out = run_intent(intent, rag_chain)
-                    cands = split_cands(llm_out)
-
-                    pool_all = {cid: phi(intent, txt)
-                                for cid, txt in cands.items()}
-                    pool = {cid: v for cid, v in pool_all.items()
-                            if pipe_key(cands[cid]) not in config.BLACKLIST.get(intent, [])}
-                    if not pool:
-                        print("⚠ all candidates black-listed; skip this round")
-                        continue
-
-                    chosen = bandit.select(pool)
-                    chosen_txt = cands[chosen]
-                    reward, label = evaluate(intent, chosen_txt)
-
-                    log_feedback(db, intent, chosen_txt, label, reward)
-
-                    if update_bandit:
-                        bandit.update(pool[chosen], reward)
-                        save_bandit_state(bandit)
-
-                    theta_norm = float(np.linalg.norm(bandit.A_inv @ bandit.b))
-                    success_hist.append(int(reward == 1.0))
-                    if log_theta:
-                        theta_hist.append(theta_norm)
-
-                    one_line = " | ".join(ln.strip()
-                                          for ln in chosen_txt.splitlines())
-                    print(
-                        f"t={t:02d} | reward={reward:.1f} | θ‖≈{theta_norm:.2f} | {one_line}")
-
-                    if reward == 1.0:
-                        consec += 1
-                        if consec >= consec_success_needed and attempts_at_consec == config.MAX_T + 1:
-                            attempts_at_consec = t
-
-                            print(
-                                "\n🚀 Perfect pipeline found. Verifying and preparing for deployment...")
-                            nodes, edges = parse_to_graph(chosen_txt)
-
-                            is_valid_dag = is_dag(nodes, edges)
-                            deps_ok = verify_dependencies(nodes, edges)
-
-                            if is_valid_dag and deps_ok:
-                                print("✅ Graph is a valid DAG and dependencies are met.")
-
-                                intent_slug = intent.lower().replace(
-                                    ' ', '-').replace('(', '').replace(')', '')[:20]
-                                yaml_content = generate_argo_yaml(
-                                    intent_slug, nodes, edges, wait_for_dependencies=False)
-
-                                yaml_filename = f"{intent_slug}-workflow.yaml"
-                                with open(yaml_filename, "w") as f:
-                                    f.write(yaml_content)
-                                print(
-                                    f"✅ Argo Workflow YAML saved to '{yaml_filename}'")
-
-                                try:
-                                    print(
-                                        f"🚢 Submitting '{yaml_filename}' to Argo...")
-                                    result = subprocess.run(
-                                        ["argo", "submit", yaml_filename,
-                                            "-n", "default"],
-                                        capture_output=True, text=True, check=True
-                                    )
-                                    print("✅ Workflow submitted successfully!")
-                                    print(result.stdout)
-                                except FileNotFoundError:
-                                    print(
-                                        "🔥 Deployment Error: 'argo' command not found. Is Argo CLI installed and in your PATH?")
-                                except subprocess.CalledProcessError as e:
-                                    print(f"🔥 Deployment Error: 'argo submit' failed.")
-                                    print(e.stderr)
-                            else:
-                                print("🔥 Verification Failed. Skipping deployment.")
-
-                            if stop_on_perfect:
-                                print(
-                                    f"PERFECT {consec_success_needed}× in a row at step {t}")
-                                break
-                    else:
-                        consec = 0
-
-                results.append({
-                    "run_id": os.getenv("SEED", "0"),
-                    "phase": phase,
-                    "intent": intent,
-                    "ATS": attempts_at_consec,
-                    "theta_final": theta_hist[-1] if theta_hist else 0.0,
-                    "succ_series": success_hist,
-                    "theta_series": theta_hist
-                })
-
-        # run_phase(train_intents, "train", update_bandit=True,
-        #           stop_on_perfect=True, consec_success_needed=2)
-        run_phase(test_intents,  "test",  update_bandit=False, stop_on_perfect=True)
+        seeds = args.seeds or [int(os.getenv("SEED", "0"))]
+        checkpoint = None
+        if args.checkpoint_every > 0:
+            checkpoint = RunCheckpoint(args.checkpoint, every=args.checkpoint_every, resume=args.resume,
+                                       run={"intents": intents, "max_t": config.MAX_T, "seeds": seeds})
+        intent_cache = None
+        if args.intent_cache:
+            intent_cache = IntentCache(threshold=args.intent_cache_threshold)
+            print(f"🧠 Intent cache: {len(intent_cache)} pipelines in {os.path.abspath(intent_cache.path)}")
+        ctx = RunContext(rag_chain, db, tracer, [stage_callbacks],
+                         lambda intent, nodes, edges: _deploy_pipeline(intent, nodes, edges, args),
+                         checkpoint, intent_cache, args.intent_cache_verify)
+        if args.workers > 1 or args.seeds:
+            phase_runner = partial(run_phase_parallel, intents=intents, seeds=seeds,
+                                   workers=max(1, args.workers))
+        else:
+            phase_runner = run_phase
+
+        # results += phase_runner(train_intents, "train", ctx, update_bandit=True,
+        #                         stop_on_perfect=True, consec_success_needed=2)
+        with profile_phase("test"):
+            results += phase_runner(test_intents, "test", ctx, update_bandit=False, stop_on_perfect=True)
 
         with open(config.RUN_METRICS_PATH, "a") as f:
             for row in results:
                 json.dump(row, f)
                 f.write("\n")
         print(f"✔ All metrics appended to {config.RUN_METRICS_PATH}")
+        if checkpoint is not None:
+            checkpoint.clear()
     finally:
+        if _workflow_submitter.cache_info().currsize:
+            _workflow_submitter().close()
         util_stop_event.set()
+        util_thread.join()
+        tracer.print_summary()
+        tracer.close()
+        if profiler is not None:
+            print(profiler.stop())
 
 
 if __name__ == "__main__":
@@ -1,13 +1,20 @@
 import datetime
 import time
-import os
 import json
 import argparse
 from kubernetes import client, config
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import re
-import csv
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import asyncio
+import aiohttp
+
+from helpers.prom_parser import parse_node_exporter, parse_kepler_vm_power, parse_dcgm
+from helpers.metric_store import MetricStore, METRIC_FIELDS
+from helpers.metric_sink import MetricSink
+from helpers.target_discovery import TargetWatcher
+from helpers.snapshot_server import SnapshotServer, SNAPSHOT_PORT
 
 
 HOSTNAME_MAP = {
@@ -21,172 +28,136 @@ HOSTNAME_MAP = {
     "worker-arm": None
 }
 
-CSV_PATH = None
+# Set from the CLI: where --livesave rows go, and whether they are also printed
+SINK = None
+PRINT_JSON = False
+
+# (connect, read) timeouts in seconds for every exporter scrape
+SCRAPE_TIMEOUT = (1.0, 3.0)
+# Max concurrent connections to one host in the asyncio backend
+ASYNC_LIMIT_PER_HOST = 4
+
+NODE_EXPORTER_PORT = 9100
+KEPLER_PORT = 28281
+DCGM_PORT = 9400
 
 class Monitor:
-    def __init__(self, kepler_ip: str | None = None):
-        try:
-            config.load_kube_config()
-        except Exception:
-            config.load_incluster_config()
-        self.v1 = client.CoreV1Api()
-        self.appsv1 = client.AppsV1Api()
+    def __init__(self, kepler_ip: str | None = None, kube: bool = True):
+        """`kube=False` skips cluster discovery (no API access), e.g. for benchmarks."""
+        self.v1 = self.appsv1 = None
+        self.discovery = None
+        if kube:
+            try:
+                config.load_kube_config()
+            except Exception:
+                config.load_incluster_config()
+            self.v1 = client.CoreV1Api()
+            self.appsv1 = client.AppsV1Api()
+            self.discovery = TargetWatcher(self.v1, self.appsv1, kepler_ip=kepler_ip)
+        self._targets_version = None
+        self.snapshot = None
         self.node_metrics = {}
         self.prev_metrics = {}
-        self.metrics_recorder = []
-        self.nodes = self.v1.list_node().items
+        self.store = MetricStore()
         self.target_namespace_prefix = "default"  
-
-    def fetch_combined_metrics(self, node_ip, kepler_ip, gpu_ip=None):
-        metrics = {}
+        self.timeout = SCRAPE_TIMEOUT
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        self._executor = None
+
+    def _session(self, target: str) -> requests.Session:
+        """One keep-alive session per exporter endpoint, reused across intervals."""
+        with self._sessions_lock:
+            session = self._sessions.get(target)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=0)
+                session.mount("http://", adapter)
+                self._sessions[target] = session
+            return session
+
+    def _scrape(self, host, port, label):
+        if not host:
+            return None
+        target = f"{host}:{port}"
         try:
-            response = requests.get(f"http://{node_ip}:9100/metrics")
+            response = self._session(target).get(f"http://{target}/metrics", timeout=self.timeout)
             response.raise_for_status()
-            metrics['node_exporter'] = response.text
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching node exporter metrics from {node_ip}: {e}")
-            metrics['node_exporter'] = None
-
-        try:
-            if kepler_ip:
-                response = requests.get(f"http://{kepler_ip}:28281/metrics", timeout=3)
-                response.raise_for_status()
-                metrics['kepler'] = response.text
-            else:
-                metrics['kepler'] = None
+            return response.text
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching kepler metrics from {kepler_ip}: {e}")
-            metrics['kepler'] = None
+            print(f"Error fetching {label} metrics from {host}: {e}")
+            return None
 
+    async def _scrape_async(self, session, host, port, label):
+        if not host:
+            return None
         try:
-            if gpu_ip:
-                response = requests.get(f"http://{gpu_ip}:9400/metrics", timeout=3)
+            async with session.get(f"http://{host}:{port}/metrics") as response:
                 response.raise_for_status()
-                metrics['dcgm'] = response.text
-            else:
-                metrics['dcgm'] = None
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching DCGM metrics from {gpu_ip}: {e}")
-            metrics['dcgm'] = None
-
-        return metrics
+                return await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error fetching {label} metrics from {host}: {e!r}")
+            return None
+
+    def serve_snapshots(self, port: int = SNAPSHOT_PORT, window: float = 60.0, host: str = "127.0.0.1"):
+        """Serve the latest round and `window`-second rolling stats at http://host:port/{snapshot,metrics}."""
+        self.snapshot = SnapshotServer(host, port, window).start()
+        return self.snapshot.url
+
+    def close(self):
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+        if self.discovery is not None:
+            self.discovery.stop()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._sessions_lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
 
     def fetch_ips(self, kepler = False, gpu = False):
-        node_ips = {node.metadata.name: {"node_ip":node.status.addresses[0].address} for node in self.nodes}
-        
-        # if kepler:
-        #     daemonset = self.appsv1.read_namespaced_daemon_set(name="kepler", namespace="kepler")
-        #     label_selector = daemonset.spec.selector.match_labels
-        #     label_selector = ",".join([f"{key}={value}" for key, value in label_selector.items()])
-        #     pods = self.v1.list_namespaced_pod(namespace="kepler", label_selector=label_selector)
-        #     for pod in pods.items:
-        #         node_name = pod.spec.node_name
-        #         pod_ip = pod.status.pod_ip
-        #         node_ips[node_name]["kepler_ip"] = pod_ip
-        if kepler:
-            for node_name in node_ips.keys():
-                node_ips[node_name]["kepler_ip"] = '10.68.184.20'  # Hardcoded for testing, replace with actual logic
-
-        if gpu:
-            try:
-                ds = self.appsv1.read_namespaced_daemon_set(
-                    name="nvidia-dcgm-exporter", namespace="gpu-operator"
-                )
-                label_selector = ",".join([f"{k}={v}" for k, v in ds.spec.selector.match_labels.items()])
-                pods = self.v1.list_namespaced_pod(namespace="gpu-operator", label_selector=label_selector).items
-                if not pods:
-                    pods = self.v1.list_namespaced_pod(namespace="nvidia", label_selector=label_selector).items
-                for pod in pods:
-                    node_name = pod.spec.node_name
-                    pod_ip = pod.status.pod_ip
-                    if node_name in node_ips and pod_ip:
-                        node_ips[node_name]["gpu_ip"] = pod_ip
-            except Exception as e:
-                print(f"Error discovering DCGM exporter pods: {e}")
-
-        return node_ips
-
-    def parse_metrics(self, node_metrics, kepler_metrics, prev_metrics, interval, node_name, dcgm_metrics=None):
+        """Current scrape targets from the discovery watches (started on first use)."""
+        if self.discovery is None:
+            return {}
+        if not self.discovery.started:
+            self.discovery.start()
+        targets = self.discovery.snapshot()
+        drop = [f for f, keep in (("kepler_ip", kepler), ("gpu_ip", gpu)) if not keep]
+        for t in targets.values():
+            for field in drop:
+                t.pop(field, None)
+        if self.discovery.version != self._targets_version:
+            self._targets_version = self.discovery.version
+            self._prune_sessions(targets)
+        return targets
+
+    def _prune_sessions(self, targets):
+        """Close keep-alive sessions to endpoints that are no longer scrape targets."""
+        exporters = self._exporters()
+        live = {f"{ip}:{exporters[field][1]}" for t in targets.values() for field, ip in t.items()}
+        with self._sessions_lock:
+            for target in [t for t in self._sessions if t not in live]:
+                self._sessions.pop(target).close()
+
+    def parse_metrics(self, node_metrics, kepler_metrics, prev_metrics, interval, node_name, dcgm_metrics=None,
+                      kepler_index=None):
+        """`kepler_index` is `kepler_metrics` already parsed by parse_kepler_vm_power, if available."""
         parsed = {}
         kepler_match_name = (HOSTNAME_MAP.get(node_name) or node_name).lower()
 
         if node_metrics:
-            for line in node_metrics.split('\n'):
-                if line.startswith('#'):
-                    continue
-                if 'node_memory_MemAvailable_bytes' in line:
-                    parsed['free_memory'] = float(line.split(' ')[1])
-                elif 'node_memory_MemTotal_bytes' in line:
-                    parsed['total_memory'] = float(line.split(' ')[1])
-                elif 'node_network_transmit_bytes_total' in line:
-                    parsed['tx_bytes'] = float(line.split(' ')[1])
-                elif 'node_network_receive_bytes_total' in line:
-                    parsed['rx_bytes'] = float(line.split(' ')[1])
-                elif 'node_cpu_seconds_total' in line:
-                    if 'idle_cpu_seconds' not in parsed:
-                        parsed['idle_cpu_seconds'] = 0
-                    if 'mode="idle"' in line:
-                        parsed['idle_cpu_seconds'] += float(line.split(' ')[1])
-                    if 'total_cpu_seconds' not in parsed:
-                        parsed['total_cpu_seconds'] = 0
-                    parsed['total_cpu_seconds'] += float(line.split(' ')[1])
+            parsed.update(parse_node_exporter(node_metrics))
 
         if kepler_metrics:
-            parsed['node_cpu_power'] = 0
-            for line in kepler_metrics.split('\n'):
-                if line.startswith('#'):
-                    continue
-                try:
-                    if 'kepler_vm_cpu_watts' in line:
-                        vm_name_match = re.search(r'vm_name="([^"]+)"', line)
-                        
-                        if vm_name_match:
-                            vm_name = vm_name_match.group(1).lower()
-
-                            if vm_name == kepler_match_name:
-                                
-                                parts = line.split()
-                                if len(parts) >= 2:
-                                    power_watts = float(parts[-1])
-                                    
-                                    parsed['node_cpu_power'] += power_watts
-                except (ValueError, IndexError) as e:
-                    print(f"Error parsing Kepler VM metric line: {line[:50]}... - {e}")
-                    continue
+            if kepler_index is None:
+                kepler_index = parse_kepler_vm_power(kepler_metrics)
+            parsed['node_cpu_power'] = kepler_index.get(kepler_match_name, 0)
 
         if dcgm_metrics:
-            metric_lookup = {
-                'DCGM_FI_DEV_SM_CLOCK': 'gpu_freq',
-                'DCGM_FI_DEV_MEM_CLOCK': 'vram_freq',
-                'DCGM_FI_DEV_ENC_UTIL': 'enc_util',
-                'DCGM_FI_DEV_DEC_UTIL': 'dec_util',
-                'DCGM_FI_DEV_POWER_USAGE': 'power_usage',
-                'DCGM_FI_DEV_GPU_UTIL': 'gpu_util',
-                'DCGM_FI_DEV_MEM_COPY_UTIL': 'vram_util',
-                'DCGM_FI_DEV_FB_FREE': 'vram_free',
-                'DCGM_FI_DEV_FB_USED': 'vram_used',
-            }
-            for line in dcgm_metrics.split('\n'):
-                if line.startswith('#') or not line.strip():
-                    continue
-                key = None
-                value = None
-                if '}' in line and ' ' in line:
-                    try:
-                        left, right = line.split('}', 1)
-                        key = left.split('{', 1)[0].strip()
-                        value = float(right.strip().split()[0])
-                    except Exception:
-                        continue
-                elif ' ' in line:
-                    try:
-                        parts = line.split(' ', 1)
-                        key = parts[0].strip()
-                        value = float(parts[1].strip().split()[0])
-                    except Exception:
-                        continue
-                if key and key in metric_lookup and value is not None:
-                    parsed[metric_lookup[key]] = value
+            parsed.update(parse_dcgm(dcgm_metrics))
 
         if prev_metrics:
             if 'idle_cpu_seconds' in parsed and 'total_cpu_seconds' in parsed:
@@ -205,137 +176,204 @@ class Monitor:
 
         return parsed
 
-    def collect_metrics(self, duration_seconds, interval, livesave=False):
-        start_time = time.time()
+    @staticmethod
+    def _exporters():
+        """Target field -> (label, port) for every exporter a node can point at."""
+        return {
+            "node_ip": ("node exporter", NODE_EXPORTER_PORT),
+            "kepler_ip": ("kepler", KEPLER_PORT),
+            "gpu_ip": ("DCGM", DCGM_PORT),
+        }
+
+    def _round_endpoints(self, nodes):
+        """Distinct endpoints of a round as (field, host) -> (host, port, label).
+
+        Nodes that share an exporter (e.g. one Kepler instance for every VM)
+        map to the same key, so it is fetched and parsed once per round.
+        """
+        exporters = self._exporters()
+        endpoints = {}
+        for node_data in nodes.values():
+            for field, (label, port) in exporters.items():
+                host = node_data.get(field)
+                if host:
+                    endpoints[(field, host)] = (host, port, label)
+        return endpoints
+
+    def _parse_round(self, nodes, payloads, interval):
+        """Fan the round's payloads out to nodes; each Kepler payload is parsed once."""
+        kepler_index = {
+            host: parse_kepler_vm_power(text)
+            for (field, host), text in payloads.items()
+            if field == "kepler_ip" and text
+        }
+        current_metrics = {}
+        for node_name, node_data in nodes.items():
+            node = payloads.get(("node_ip", node_data.get("node_ip")))
+            kepler = payloads.get(("kepler_ip", node_data.get("kepler_ip")))
+            dcgm = payloads.get(("gpu_ip", node_data.get("gpu_ip")))
+            if node or kepler or dcgm:
+                current_metrics[node_name] = self.parse_metrics(
+                    node,
+                    kepler,
+                    self.prev_metrics.get(node_name, {}),
+                    interval,
+                    node_name,
+                    dcgm_metrics=dcgm,
+                    kepler_index=kepler_index.get(node_data.get("kepler_ip")),
+                )
+        return current_metrics
+
+    def _scrape_round(self, nodes, interval):
+        """Fetch every distinct endpoint once on the shared worker pool and parse the results."""
+        futures = {
+            key: self._executor.submit(self._scrape, *endpoint)
+            for key, endpoint in self._round_endpoints(nodes).items()
+        }
+        payloads = {key: f.result() for key, f in futures.items()}
+        return self._parse_round(nodes, payloads, interval)
+
+    async def _scrape_round_async(self, session, nodes, interval):
+        """Fetch every distinct endpoint concurrently, then parse the results."""
+        endpoints = self._round_endpoints(nodes)
+        texts = await asyncio.gather(*(
+            self._scrape_async(session, *endpoint) for endpoint in endpoints.values()
+        ))
+        return self._parse_round(nodes, dict(zip(endpoints, texts)), interval)
+
+    def _async_session(self) -> aiohttp.ClientSession:
+        connect, read = self.timeout
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=0, limit_per_host=ASYNC_LIMIT_PER_HOST),
+            timeout=aiohttp.ClientTimeout(total=connect + read, sock_connect=connect, sock_read=read),
+        )
+
+    def _record_round(self, current_metrics, livesave):
+        self.prev_metrics = current_metrics
+        self.node_metrics = current_metrics
+        self.store.append(current_metrics)
+        if self.snapshot is not None:
+            self.snapshot.publish(current_metrics, self.store)
+
+        if livesave:
+            self.save_metrics_as_json() 
+
+    @staticmethod
+    def _advance_tick(next_tick, interval):
+        """Next tick on the fixed clock, skipping ticks an overrunning round missed."""
+        next_tick += interval
+        now = time.monotonic()
+        if now > next_tick:
+            next_tick += ((now - next_tick) // interval + 1) * interval
+        return next_tick, next_tick - now
+
+    def collect_metrics(self, duration_seconds, interval, livesave=False, backend="threads"):
+        """Sample all nodes every `interval` seconds on a fixed clock.
+
+        Ticks are scheduled against a monotonic clock rather than sleeping a
+        full interval after each round, so scrape time does not stretch the
+        sampling period; a round that overruns skips the ticks it missed, and
+        rates use the measured time between samples. `backend="async"` scrapes
+        with aiohttp on one event loop instead of the worker thread pool.
+        Targets are re-read from the discovery watches every round, so nodes
+        and exporter pods that come and go are picked up without re-listing.
+        """
         nodes = self.fetch_ips(kepler=True, gpu=True)
+        if backend == "async":
+            asyncio.run(self._collect_async(duration_seconds, interval, livesave))
+            return
 
-        while time.time() - start_time < duration_seconds:
-            with ThreadPoolExecutor(max_workers=len(nodes)) as executor:
-                future_to_node = {
-                    executor.submit(
-                        self.fetch_combined_metrics,
-                        node_data["node_ip"],
-                        node_data.get("kepler_ip"),
-                        node_data.get("gpu_ip"),
-                    ): node_name
-                    for node_name, node_data in nodes.items()
-                }
-                
-                current_metrics = {}
-                for future in as_completed(future_to_node):
-                    node_name = future_to_node[future]
-                    data = future.result()
-                    if data and (data.get('node_exporter') or data.get('kepler') or data.get('dcgm')):
-                        if node_name in self.prev_metrics:
-                            parsed_metrics = self.parse_metrics(
-                                data.get('node_exporter'), 
-                                data.get('kepler'),
-                                self.prev_metrics[node_name], 
-                                interval,
-                                node_name,
-                                dcgm_metrics=data.get('dcgm'),
-                            )
-                        else:
-                            parsed_metrics = self.parse_metrics(
-                                data.get('node_exporter'), 
-                                data.get('kepler'),
-                                {}, 
-                                interval,
-                                node_name,
-                                dcgm_metrics=data.get('dcgm'),
-                            )
-                        current_metrics[node_name] = parsed_metrics
-                
-                self.prev_metrics = current_metrics
-                self.node_metrics = current_metrics
-                
-                if time.time() - start_time > interval:   
-                    self.metrics_recorder.append(self.node_metrics)
-                    if len(self.metrics_recorder) > 1:  
-                        self.metrics_recorder = self.metrics_recorder[1:]  
-                    if self.metrics_recorder: 
-                        self.prev_metrics = self.metrics_recorder[0] 
-                else:
-                    self.metrics_recorder.append(self.node_metrics)
-                
-                if livesave:
-                    self.save_metrics_as_json() 
-            time.sleep(interval) 
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=max(8, len(nodes)),
+                                                thread_name_prefix="scrape")
+        start_time = next_tick = time.monotonic()
+        last_sample = None
+        while time.monotonic() - start_time < duration_seconds:
+            now = time.monotonic()
+            elapsed = now - last_sample if last_sample is not None else interval
+            last_sample = now
+
+            nodes = self.fetch_ips(kepler=True, gpu=True)
+            self._record_round(self._scrape_round(nodes, elapsed), livesave)
+
+            next_tick, delay = self._advance_tick(next_tick, interval)
+            time.sleep(delay)
+
+    async def _collect_async(self, duration_seconds, interval, livesave):
+        async with self._async_session() as session:
+            start_time = next_tick = time.monotonic()
+            last_sample = None
+            while time.monotonic() - start_time < duration_seconds:
+                now = time.monotonic()
+                elapsed = now - last_sample if last_sample is not None else interval
+                last_sample = now
+
+                nodes = self.fetch_ips(kepler=True, gpu=True)
+                current_metrics = await self._scrape_round_async(session, nodes, elapsed)
+                self._record_round(current_metrics, livesave)
+
+                next_tick, delay = self._advance_tick(next_tick, interval)
+                await asyncio.sleep(delay)
 
     def save_metrics_as_json(self, output_file="data.json"):
         if self.node_metrics:
             self.col.insert_one({"timestamp": datetime.datetime.now(), "metrics": self.node_metrics})
 
 def _print_metrics_as_json(self, output_file: str = "data.json"):
-    """Runtime override for Monitor.save_metrics_as_json: print payload instead of DB insert."""
+    """Runtime override for Monitor.save_metrics_as_json: buffer rows to SINK and/or print JSON."""
     try:
-        payload = {
-            "timestamp": datetime.datetime.now().isoformat(),
-            "metrics": self.node_metrics,
-        }
-        print(json.dumps(payload, default=str))
-        if CSV_PATH:
-            _save_metrics_as_csv(self, CSV_PATH)
-    except Exception as e:
-        print(f"[monitoring] print_metrics error: {e}")
-
-def _save_metrics_as_csv(self, csv_path: str):
-    """Append current node metrics as CSV rows (one row per node)."""
-    try:
-        if not self.node_metrics:
-            return
-
-        csv_dir = os.path.dirname(csv_path)
-        if csv_dir:
-            os.makedirs(csv_dir, exist_ok=True)
-
-        all_keys = set()
-        for node_vals in self.node_metrics.values():
-            if isinstance(node_vals, dict):
-                all_keys.update(node_vals.keys())
-
-        preferred_order = [
-            "free_memory", "total_memory",
-            "tx_bytes", "rx_bytes", "tx_rate", "rx_rate",
-            "idle_cpu_seconds", "total_cpu_seconds", "cpu",
-            "node_cpu_power",
-            "gpu_freq", "vram_freq", "enc_util", "dec_util",
-            "power_usage", "gpu_util", "vram_util", "vram_free", "vram_used",
-        ]
-        remaining = [k for k in sorted(all_keys) if k not in preferred_order]
-        header = ["timestamp", "node"] + preferred_order + remaining
-
-        write_header = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
-
-        now = datetime.datetime.now().isoformat()
-        with open(csv_path, "a", newline="") as f:
-            writer = csv.writer(f)
-            if write_header:
-                writer.writerow(header)
+        now = time.time()
+        if SINK is not None:
             for node, vals in self.node_metrics.items():
-                row = [now, node]
-                for key in preferred_order + remaining:
-                    row.append(vals.get(key, "") if isinstance(vals, dict) else "")
-                writer.writerow(row)
+                SINK.write({"timestamp": now, "node": node, **vals})
+        if PRINT_JSON:
+            payload = {
+                "timestamp": datetime.datetime.fromtimestamp(now).isoformat(),
+                "metrics": self.node_metrics,
+            }
+            print(json.dumps(payload, default=str))
     except Exception as e:
-        print(f"[monitoring] csv save error: {e}")
+        print(f"[monitoring] save_metrics error: {e}")
 
 Monitor.save_metrics_as_json = _print_metrics_as_json
 
 def main():
     parser = argparse.ArgumentParser(description="Standalone cluster metrics monitor (prints JSON).")
     parser.add_argument("--duration", type=int, default=600, help="Total seconds to run.")
-    parser.add_argument("--interval", type=int, default=2, help="Sampling interval in seconds.")
-    parser.add_argument("--livesave", action="store_true", help="Print metrics every interval window.")
-    parser.add_argument("--csv", type=str, default=None, help="CSV file path to append metrics (used with --livesave).")
+    parser.add_argument("--interval", type=float, default=2, help="Sampling interval in seconds.")
+    parser.add_argument("--livesave", action="store_true", help="Record metrics every interval window.")
+    parser.add_argument("--out", "--csv", dest="out", type=str, default=None,
+                        help="File to append metrics to (used with --livesave); *.csv is written as CSV, "
+                             "anything else in the columnar format of helpers/metric_sink.py.")
+    parser.add_argument("--print-json", action="store_true",
+                        help="Also print every window as JSON (the default when --out is not given).")
+    parser.add_argument("--flush-seconds", type=float, default=30.0,
+                        help="Write buffered rows to --out at least this often.")
+    parser.add_argument("--serve", type=int, nargs="?", const=SNAPSHOT_PORT, default=None, metavar="PORT",
+                        help=f"Serve /snapshot (JSON) and /metrics (Prometheus) on localhost (default port {SNAPSHOT_PORT}).")
+    parser.add_argument("--serve-window", type=float, default=60.0,
+                        help="Seconds of history behind the rolling stats served with --serve.")
+    parser.add_argument("--backend", choices=["threads", "async"], default="threads",
+                        help="Scrape with a worker thread pool or with asyncio/aiohttp.")
     args = parser.parse_args()
 
-    global CSV_PATH
-    CSV_PATH = args.csv
+    global SINK, PRINT_JSON
+    if args.out:
+        SINK = MetricSink(args.out, columns=["timestamp", "node"] + METRIC_FIELDS,
+                          flush_seconds=args.flush_seconds)
+    PRINT_JSON = args.print_json or not args.out
 
     m = Monitor()
-    print(f"[monitoring] Starting collection for {args.duration}s, interval={args.interval}s, livesave={args.livesave}, csv={CSV_PATH}")
-    m.collect_metrics(duration_seconds=args.duration, interval=args.interval, livesave=args.livesave)
+    if args.serve is not None:
+        print(f"[monitoring] Serving cluster snapshots at {m.serve_snapshots(args.serve, args.serve_window)}")
+    print(f"[monitoring] Starting collection for {args.duration}s, interval={args.interval}s, livesave={args.livesave}, out={args.out}")
+    try:
+        m.collect_metrics(duration_seconds=args.duration, interval=args.interval, livesave=args.livesave,
+                          backend=args.backend)
+    finally:
+        m.close()
+        if SINK is not None:
+            SINK.close()
     print("[monitoring] Done.")
 
 if __name__ == "__main__":